@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple, Union
+
+from udsoncan.client import Client
+from udsoncan.exceptions import NegativeResponseException, TimeoutException
+
+DEFAULT_TIMING_PATH = os.path.join('.flashstats', 'uds_timing.json')
+MAX_SAMPLES = 200  # 每个服务保留的最近样本数
+MIN_SAMPLES = 20  # 样本数不足时使用配置的超时
+PERCENTILE = 0.99
+SAFETY_FACTOR = 3.0  # 百分位延迟的倍数
+SAFETY_MARGIN = 0.05  # 再加的固定余量（秒），覆盖调度/总线负载抖动
+MIN_TIMEOUT = 0.1
+# 执行时间取决于子标识符的服务：样本按例程控制类型+例程ID / DID分开统计
+# （如31 01 0203检查编程条件几毫秒，31 01 FF00擦除几十秒，共用一个百分位会把擦除判为超时）
+SUB_IDENTIFIER_LENGTH = {0x31: 3, 0x22: 2, 0x2E: 2}
+
+
+def timing_key(request: Union[int, bytes]) -> str:
+    """
+    样本键：服务ID（如"0x36"），0x31/0x22/0x2E再带上子标识符（如"0x31:01FF00"、"0x22:F190"）
+    :param request: 请求报文，或不区分子标识符的服务ID
+    """
+    if isinstance(request, int):
+        return f"0x{request:02X}"
+    service_id = request[0]
+    length = SUB_IDENTIFIER_LENGTH.get(service_id, 0)
+    if length and len(request) > length:
+        return f"0x{service_id:02X}:{bytes(request[1:1 + length]).hex().upper()}"
+    return f"0x{service_id:02X}"
+
+
+def percentile(samples, fraction: float) -> float:
+    """最近秩法百分位"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.999999) - 1))
+    return ordered[index]
+
+
+class ServiceTiming:
+    """单个服务（或例程/DID）的延迟样本：p2为请求到第一个响应（含0x78），p2_star为相邻0x78之间/最后一个0x78到最终响应"""
+
+    def __init__(self, p2=(), p2_star=(), timeouts: int = 0):
+        self.p2 = deque(p2, maxlen=MAX_SAMPLES)
+        self.p2_star = deque(p2_star, maxlen=MAX_SAMPLES)
+        self.timeouts = timeouts
+
+    def timeout(self, kind: str, ceiling: Optional[float]) -> Optional[float]:
+        samples = self.p2 if kind == 'p2' else self.p2_star
+        if len(samples) < MIN_SAMPLES:
+            return None
+        value = max(MIN_TIMEOUT, percentile(samples, PERCENTILE) * SAFETY_FACTOR + SAFETY_MARGIN)
+        return min(value, ceiling) if ceiling else value
+
+    def to_dict(self) -> dict:
+        return {'p2': [round(v, 5) for v in self.p2], 'p2_star': [round(v, 5) for v in self.p2_star],
+                'timeouts': self.timeouts}
+
+
+class TimingStore:
+    """
+    按ECU和timing_key（服务ID，例程控制/按DID读写再加子标识符）学习的响应延迟，持久化到.flashstats/uds_timing.json
+
+    {ECU: {"0x36": {"p2": [...], "p2_star": [...], "timeouts": n}, "0x31:01FF00": {...}, ...}, ...}
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_TIMING_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.ecus: Dict[str, Dict[str, ServiceTiming]] = {}
+        self.dirty = False
+        self._load()
+
+    def service(self, ecu: str, key: str) -> ServiceTiming:
+        services = self.ecus.setdefault(ecu, {})
+        timing = services.get(key)
+        if timing is None:
+            timing = services[key] = ServiceTiming()
+        return timing
+
+    def record(self, ecu: str, key: str, p2: Optional[float], p2_star=()):
+        with self.lock:
+            timing = self.service(ecu, key)
+            if p2 is not None:
+                timing.p2.append(p2)
+            timing.p2_star.extend(p2_star)
+            self.dirty = True
+
+    def record_timeout(self, ecu: str, key: str):
+        """超时后丢弃该服务的样本，重新学习之前回到配置的超时"""
+        with self.lock:
+            timing = self.service(ecu, key)
+            timing.p2.clear()
+            timing.p2_star.clear()
+            timing.timeouts += 1
+            self.dirty = True
+
+    def timeouts(self, ecu: str, key: str, p2_ceiling: Optional[float],
+                 p2_star_ceiling: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+        """(P2, P2*)，样本不足的一项为None"""
+        with self.lock:
+            timing = self.ecus.get(ecu, {}).get(key)
+            if timing is None:
+                return None, None
+            return timing.timeout('p2', p2_ceiling), timing.timeout('p2_star', p2_star_ceiling)
+
+    def summary(self, ecu: str) -> str:
+        with self.lock:
+            parts = []
+            for key, timing in sorted(self.ecus.get(ecu, {}).items()):
+                p2 = timing.timeout('p2', None)
+                parts.append(f"{key}: " + (f"P2 {p2 * 1000:.0f} ms" if p2 is not None
+                                                       else f"learning ({len(timing.p2)}/{MIN_SAMPLES})"))
+        return f"{ecu} " + (', '.join(parts) if parts else 'no samples')
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        with self.lock:
+            data = {ecu: {key: timing.to_dict() for key, timing in services.items()}
+                    for ecu, services in self.ecus.items()}
+            self.dirty = False
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[TimingStore] Unable to save timing profile {self.path}: {e}")
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for ecu, services in data.items():
+            # 早期按服务ID合并统计的0x31/0x22/0x2E样本不再使用
+            legacy = {f"0x{service_id:02X}" for service_id in SUB_IDENTIFIER_LENGTH}
+            self.ecus[ecu] = {key: ServiceTiming(entry.get('p2', ()), entry.get('p2_star', ()), entry.get('timeouts', 0))
+                              for key, entry in services.items() if key not in legacy}
+
+
+class AdaptiveClient(Client):
+    """
+    按学习到的延迟设置每个请求P2/P2*的udsoncan Client
+
+    配置中的p2_timeout/p2_star_timeout（本工具为5秒）只作为上限和样本不足时的取值：
+    样本按timing_key分开统计（例程控制和按DID读写区分例程ID/DID），每个键积累MIN_SAMPLES个样本后，超时取第99百分位延迟 x SAFETY_FACTOR + SAFETY_MARGIN，
+    丢失的响应在几百毫秒而不是5秒后报超时（TransferData随后按块重传）。
+    超时后该服务的样本被清空，回到配置的超时重新学习，偶发的慢响应不会被反复判为超时。
+    学习结果在close()时写回TimingStore文件，下次运行直接使用。
+    """
+
+    def __init__(self, conn, config, store: TimingStore, ecu: str):
+        super().__init__(conn, config=config)
+        self.timing_store = store
+        self.timing_ecu = ecu
+        self._pending_marks = []
+        self.config['nrc78_callback'] = self._on_response_pending
+
+    def _on_response_pending(self):
+        self._pending_marks.append(time.monotonic())
+
+    def request_timeouts(self, request: Union[int, bytes]) -> Tuple[float, float]:
+        """
+        本次请求使用的(P2, P2*)：学习值，样本不足时为服务器声明值或配置值
+        :param request: 请求报文或服务ID，见timing_key
+        """
+        session_timing = self.session_timing
+        p2_ceiling = session_timing.p2_server_max
+        if p2_ceiling is None:
+            p2_ceiling = self.config['p2_timeout']
+        p2_star_ceiling = session_timing.p2_star_server_max
+        if p2_star_ceiling is None:
+            p2_star_ceiling = self.config['p2_star_timeout']
+        p2, p2_star = self.timing_store.timeouts(self.timing_ecu, timing_key(request), p2_ceiling, p2_star_ceiling)
+        return (p2_ceiling if p2 is None else p2), (p2_star_ceiling if p2_star is None else p2_star)
+
+    def record_latency(self, request: Union[int, bytes], start: float, pending_marks=()):
+        """start为请求发出时刻，pending_marks为收到各0x78的时刻（time.monotonic）"""
+        marks = [start, *pending_marks, time.monotonic()]
+        self.timing_store.record(self.timing_ecu, timing_key(request), marks[1] - marks[0],
+                                 [b - a for a, b in zip(marks[1:], marks[2:])])
+
+    def record_timeout(self, request: Union[int, bytes]):
+        self.timing_store.record_timeout(self.timing_ecu, timing_key(request))
+
+    def send_request(self, request, timeout: int = -1):
+        if timeout >= 0 or request.service is None:
+            return super().send_request(request, timeout)
+        payload = request.get_payload()
+        session_timing = self.session_timing
+        saved = (session_timing.p2_server_max, session_timing.p2_star_server_max)
+        session_timing.p2_server_max, session_timing.p2_star_server_max = self.request_timeouts(payload)
+        self._pending_marks = []
+        start = time.monotonic()
+        try:
+            response = super().send_request(request, timeout)
+        except TimeoutException:
+            self.record_timeout(payload)
+            raise
+        except NegativeResponseException:
+            self.record_latency(payload, start, self._pending_marks)  # 否定响应同样是有效的延迟样本
+            raise
+        finally:
+            # 会话控制响应中的服务器时序在send_request返回后才写入，这里只恢复本次请求前的值
+            session_timing.p2_server_max, session_timing.p2_star_server_max = saved
+        if response is not None:  # 抑制正响应时没有可用的延迟
+            self.record_latency(payload, start, self._pending_marks)
+        return response
+
+    def close(self) -> None:
+        super().close()
+        self.timing_store.save()
+
+
+_default_store = None
+
+
+def default_timing_store() -> TimingStore:
+    """进程内共享的TimingStore（物理/功能寻址Client共用一个文件）"""
+    global _default_store
+    if _default_store is None:
+        _default_store = TimingStore()
+    return _default_store
@@ -0,0 +1,178 @@
+import csv
+import sys
+import os
+import threading
+import time
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-can"))
+import can
+
+# CAN FD数据长度 -> 实际发送字节数（DLC对齐）
+CANFD_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+
+
+def canfd_padded_length(length: int) -> int:
+    for padded in CANFD_LENGTHS:
+        if padded >= length:
+            return padded
+    return 64
+
+
+def frame_bit_time(msg, bitrate: int, data_bitrate: Optional[int] = None) -> float:
+    """
+    估算一帧占用总线的时间（秒），含帧间隔，不含位填充（填充位约增加0~20%，结果为下限）
+    msg可以是can.Message或isotp.CanMessage（只用到arbitration_id/data/is_extended_id/is_fd/bitrate_switch）
+    经典CAN: 标准帧47 + 8*DLC位，扩展帧67 + 8*DLC位
+    CAN FD: 仲裁段和帧尾按仲裁波特率，BRS时控制段/数据/CRC按数据波特率
+    """
+    length = len(msg.data) if msg.data is not None else 0
+    if not getattr(msg, 'is_fd', False):
+        bits = (67 if msg.is_extended_id else 47) + 8 * min(length, 8)
+        return bits / bitrate
+    length = canfd_padded_length(length)
+    # SOF/ID/RRS/IDE/FDF/res/BRS + CRC定界/ACK/EOF/帧间隔
+    nominal_bits = (33 if msg.is_extended_id else 14) + 13
+    # ESI/DLC/数据/填充计数/CRC（>16字节时为CRC21）
+    data_bits = 5 + 8 * length + 4 + (21 if length > 16 else 17)
+    if getattr(msg, 'bitrate_switch', False) and data_bitrate:
+        return nominal_bits / bitrate + data_bits / data_bitrate
+    return (nominal_bits + data_bits) / bitrate
+
+
+class BusSample(NamedTuple):
+    """一个统计周期的结果，帧数/字节数为周期内计数，rate为每秒值"""
+    timestamp: float
+    interval: float
+    tx_frames: int
+    rx_frames: int
+    tx_bytes: int
+    rx_bytes: int
+    error_frames: int
+    bus_load: float  # 百分比
+
+    @property
+    def tx_rate(self) -> float:
+        return self.tx_frames / self.interval
+
+    @property
+    def rx_rate(self) -> float:
+        return self.rx_frames / self.interval
+
+    def summary(self) -> str:
+        return (f"TX {self.tx_rate:.0f} fps ({self.tx_bytes / self.interval / 1024:.1f} KB/s) | "
+                f"RX {self.rx_rate:.0f} fps ({self.rx_bytes / self.interval / 1024:.1f} KB/s) | "
+                f"Err {self.error_frames} | Load {self.bus_load:.1f}%")
+
+
+class BusMonitor(can.Listener):
+    """
+    总线帧率/负载监视
+
+    作为原始监听器挂在BusSession的Notifier上统计接收帧，BusSession上的协议栈发送时回调on_frame_sent统计发送帧。
+    每帧只累加几个计数器，后台线程每interval秒生成一个BusSample存入有限长度的历史队列，
+    可用于判断刷写吞吐受限于测试仪本身还是总线已经饱和。
+    注意：启用验收滤波器时被过滤的报文不计入RX，统计整条总线负载时应先关闭滤波器。
+    """
+
+    def __init__(self, bitrate: int = 500000, data_bitrate: Optional[int] = None,
+                 interval: float = 1.0, history: int = 3600):
+        """
+        :param bitrate: 仲裁波特率
+        :param data_bitrate: CAN FD数据段波特率，None表示与仲裁波特率相同
+        :param interval: 统计周期（秒）
+        :param history: 保留的样本数，默认1小时（interval=1时）
+        """
+        self.bitrate = bitrate
+        self.data_bitrate = data_bitrate
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.session = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.tx_frames = 0
+        self.rx_frames = 0
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self.error_frames = 0
+        self.busy_time = 0.0
+
+    def on_message_received(self, msg: can.Message) -> None:
+        with self.lock:
+            if msg.is_error_frame:
+                self.error_frames += 1
+                return
+            self.rx_frames += 1
+            self.rx_bytes += len(msg.data)
+            self.busy_time += frame_bit_time(msg, self.bitrate, self.data_bitrate)
+
+    def on_frame_sent(self, msg) -> None:
+        with self.lock:
+            self.tx_frames += 1
+            self.tx_bytes += len(msg.data)
+            self.busy_time += frame_bit_time(msg, self.bitrate, self.data_bitrate)
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, session=None):
+        """
+        开始统计
+        :param session: BusSession，挂载接收监听和发送回调；为None时由调用方自行把本对象加到Notifier上
+        """
+        if self.is_running():
+            return
+        if session is not None:
+            session.attach_monitor(self)
+            self.session = session
+        with self.lock:
+            self._reset_counters()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='bus-monitor', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        if self.session is not None:
+            self.session.detach_monitor(self)
+            self.session = None
+
+    def latest(self) -> Optional[BusSample]:
+        return self.samples[-1] if self.samples else None
+
+    def history(self) -> List[BusSample]:
+        return list(self.samples)
+
+    def export_csv(self, path: str) -> int:
+        """导出时间序列，返回样本数"""
+        samples = self.history()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'interval_s', 'tx_frames', 'rx_frames', 'tx_fps', 'rx_fps',
+                             'tx_bytes', 'rx_bytes', 'error_frames', 'bus_load_percent'])
+            for sample in samples:
+                writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sample.timestamp)),
+                                 f"{sample.interval:.3f}", sample.tx_frames, sample.rx_frames,
+                                 f"{sample.tx_rate:.1f}", f"{sample.rx_rate:.1f}",
+                                 sample.tx_bytes, sample.rx_bytes, sample.error_frames, f"{sample.bus_load:.2f}"])
+        return len(samples)
+
+    def _run(self):
+        last = time.monotonic()
+        while not self.stop_event.wait(max(0.0, last + self.interval - time.monotonic())):
+            now = time.monotonic()
+            with self.lock:
+                counters = (self.tx_frames, self.rx_frames, self.tx_bytes, self.rx_bytes, self.error_frames)
+                busy_time = self.busy_time
+                self._reset_counters()
+            elapsed = now - last
+            last = now
+            self.samples.append(BusSample(time.time(), elapsed, *counters, min(100.0, busy_time / elapsed * 100)))
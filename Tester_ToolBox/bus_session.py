@@ -0,0 +1,260 @@
+import sys
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-can"))
+sys.path.insert(0, os.path.abspath("reference_modules/python-can-isotp"))
+import can
+import isotp
+
+EXTENDED_ID_FLAG = 0x80000000
+
+# 各接口硬件验收滤波器数量上限（每种ID类型），未列出的接口不限制（内核或驱动内部过滤）
+HW_FILTER_LIMITS = {
+    'VectorBus': 1,
+}
+
+
+def build_acceptance_filters(can_ids: Iterable[Tuple[int, bool]], max_filters: Optional[int] = None) -> List[dict]:
+    """
+    由需要接收的仲裁ID生成python-can验收滤波器
+    :param can_ids: [(arbitration_id, is_extended_id)]
+    :param max_filters: 每种ID类型的滤波器数量上限，超出时合并为一个能覆盖全部ID的code/mask
+                        （硬件放行的多余帧由CanIdDispatcher丢弃）
+    """
+    filters = []
+    for extended in (False, True):
+        ids = sorted({can_id for can_id, is_extended in can_ids if is_extended == extended})
+        if not ids:
+            continue
+        full_mask = 0x1FFFFFFF if extended else 0x7FF
+        if max_filters is None or len(ids) <= max_filters:
+            filters.extend({'can_id': can_id, 'can_mask': full_mask, 'extended': extended} for can_id in ids)
+        else:
+            differing = 0
+            for can_id in ids:
+                differing |= can_id ^ ids[0]
+            mask = full_mask & ~differing
+            filters.append({'can_id': ids[0] & mask, 'can_mask': mask, 'extended': extended})
+    return filters
+
+
+class CanIdDispatcher(can.Listener):
+    """
+    按仲裁ID分发接收帧的Notifier监听器
+
+    路由表为 {仲裁ID: 回调元组}，每帧只做一次字典查找，与挂载的协议栈数量无关。
+    路由表修改时整体替换回调元组，接收线程读取无需加锁。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes: Dict[int, tuple] = {}
+        self.unrouted_frames = 0  # 没有任何路由的帧数（可用于判断验收滤波器是否生效）
+
+    @staticmethod
+    def route_key(arbitration_id: int, is_extended_id: bool = False) -> int:
+        return arbitration_id | EXTENDED_ID_FLAG if is_extended_id else arbitration_id
+
+    def on_message_received(self, msg: can.Message) -> None:
+        if msg.is_error_frame or msg.is_remote_frame:
+            return
+        handlers = self.routes.get(msg.arbitration_id | EXTENDED_ID_FLAG if msg.is_extended_id else msg.arbitration_id)
+        if handlers:
+            for handler in handlers:
+                handler(msg)
+        else:
+            self.unrouted_frames += 1
+
+    def add_route(self, arbitration_id: int, handler, is_extended_id: bool = False) -> None:
+        key = self.route_key(arbitration_id, is_extended_id)
+        with self.lock:
+            self.routes[key] = self.routes.get(key, ()) + (handler,)
+
+    def remove_route(self, arbitration_id: int, handler, is_extended_id: bool = False) -> None:
+        key = self.route_key(arbitration_id, is_extended_id)
+        with self.lock:
+            handlers = tuple(h for h in self.routes.get(key, ()) if h != handler)
+            if handlers:
+                self.routes[key] = handlers
+            else:
+                self.routes.pop(key, None)
+
+    def routed_ids(self) -> List[Tuple[int, bool]]:
+        """当前有路由的 [(arbitration_id, is_extended_id)]"""
+        return [(key & ~EXTENDED_ID_FLAG, bool(key & EXTENDED_ID_FLAG)) for key in list(self.routes)]
+
+
+class SessionCanStack(isotp.NotifierBasedCanStack):
+    """
+    挂在BusSession上的ISO-TP协议栈
+
+    不再向Notifier注册自己的监听器（否则每个协议栈都会收到总线上的每一帧），
+    而是由BusSession按接收仲裁ID只把属于自己的帧投递进来。
+    start()/stop()按次数计数：udsoncan连接每次open/close都会start/stop协议栈，
+    共享时只有最后一次stop才真正停止线程。
+    """
+
+    def __init__(self, session: 'BusSession', *args, **kwargs):
+        self.session = session
+        self.run_count = 0
+        super().__init__(session.bus, session.notifier, *args, **kwargs)
+        self.bus_txfn = self.txfn
+        self.txfn = self._send_frame
+
+    def _send_frame(self, msg) -> None:
+        self.bus_txfn(msg)
+        for monitor in self.session.tx_monitors:
+            monitor.on_frame_sent(msg)
+
+    def start(self) -> None:
+        with self.session.lock:
+            self.run_count += 1
+            if self.run_count > 1:
+                return
+            self.buffered_reader = can.BufferedReader()
+            self.session.add_route(self.rx_arbitration_id(), self._on_message_received, self.address.is_rx_29bits())
+            isotp.TransportLayer.start(self)
+
+    def stop(self) -> None:
+        with self.session.lock:
+            if self.run_count == 0:
+                return
+            self.run_count -= 1
+            if self.run_count > 0:
+                return
+            self.session.remove_route(self.rx_arbitration_id(), self._on_message_received, self.address.is_rx_29bits())
+            self.buffered_reader = None
+            isotp.TransportLayer.stop(self)
+
+    def shutdown(self) -> None:
+        """无论还有多少使用者都停止协议栈"""
+        with self.session.lock:
+            if self.run_count:
+                self.run_count = 1
+                self.stop()
+
+    def rx_arbitration_id(self) -> int:
+        return self.address.get_rx_arbitration_id(isotp.TargetAddressType.Physical)
+
+
+class BusSession:
+    """
+    共享CAN总线会话
+
+    一条总线只创建一个can.Notifier（一个读线程），各Pack通过acquire_stack按(txid, rxid)获取ISO-TP协议栈，
+    相同地址的协议栈引用计数共享，最后一个使用者release后才停止。
+    接收帧由CanIdDispatcher按仲裁ID直接投递到目标协议栈。
+    enable_acceptance_filters()后，总线验收滤波器随路由自动更新，无关报文在驱动/硬件层被丢弃。
+    """
+
+    def __init__(self, bus: can.BusABC, is_fd: bool = False):
+        self.bus = bus
+        self.is_fd = is_fd
+        self.lock = threading.RLock()
+        self.dispatcher = CanIdDispatcher()
+        self.acceptance_ids = None  # None表示不设置验收滤波器
+        self.tx_monitors = ()  # 协议栈每发送一帧回调on_frame_sent(msg)
+        self.stacks: Dict[Tuple[int, int], SessionCanStack] = {}
+        self.ref_counts: Dict[Tuple[int, int], int] = {}
+        self.notifier = can.Notifier(bus, [self.dispatcher])
+
+    def acquire_stack(self, txid: int, rxid: int, params: Optional[dict] = None,
+                      addressing_mode=isotp.AddressingMode.Normal_11bits) -> SessionCanStack:
+        """
+        获取(txid, rxid)对应的已启动ISO-TP协议栈，首次获取时创建
+        已存在的协议栈保持首次创建时的参数
+        """
+        key = (txid, rxid)
+        with self.lock:
+            stack = self.stacks.get(key)
+            if stack is None:
+                address = isotp.Address(addressing_mode, txid=txid, rxid=rxid)
+                stack = SessionCanStack(self, address=address, params=params)
+                stack.start()
+                self.stacks[key] = stack
+                self.ref_counts[key] = 0
+            else:
+                stack.start()
+            self.ref_counts[key] += 1
+            return stack
+
+    def release_stack(self, stack: SessionCanStack) -> None:
+        """释放一次引用，引用计数归零时移除并停止协议栈"""
+        with self.lock:
+            for key, candidate in self.stacks.items():
+                if candidate is stack:
+                    break
+            else:
+                return
+            self.ref_counts[key] -= 1
+            if self.ref_counts[key] > 0:
+                stack.stop()
+                return
+            del self.stacks[key]
+            del self.ref_counts[key]
+        stack.shutdown()
+
+    def add_listener(self, listener) -> None:
+        """挂载接收所有帧的原始监听器（如Trace）"""
+        self.notifier.add_listener(listener)
+
+    def remove_listener(self, listener) -> None:
+        self.notifier.remove_listener(listener)
+
+    def attach_monitor(self, monitor) -> None:
+        """挂载总线监视器（如BusMonitor）：接收帧经Notifier送达，协议栈发送帧回调on_frame_sent"""
+        with self.lock:
+            if monitor in self.tx_monitors:
+                return
+            self.tx_monitors = self.tx_monitors + (monitor,)
+        self.notifier.add_listener(monitor)
+
+    def detach_monitor(self, monitor) -> None:
+        with self.lock:
+            if monitor not in self.tx_monitors:
+                return
+            self.tx_monitors = tuple(m for m in self.tx_monitors if m is not monitor)
+        self.notifier.remove_listener(monitor)
+
+    def close(self) -> None:
+        """停止所有协议栈和Notifier（总线本身由所有者关闭）"""
+        with self.lock:
+            stacks = list(self.stacks.values())
+            self.stacks.clear()
+            self.ref_counts.clear()
+        for stack in stacks:
+            stack.shutdown()
+        self.notifier.stop()
+
+    def add_route(self, arbitration_id: int, handler, is_extended_id: bool = False) -> None:
+        """按仲裁ID挂载接收回调（在Notifier线程中调用）"""
+        with self.lock:
+            self.dispatcher.add_route(arbitration_id, handler, is_extended_id)
+            if self.acceptance_ids is not None and (arbitration_id, is_extended_id) not in self.acceptance_ids:
+                self._apply_acceptance_filters()
+
+    def remove_route(self, arbitration_id: int, handler, is_extended_id: bool = False) -> None:
+        with self.lock:
+            self.dispatcher.remove_route(arbitration_id, handler, is_extended_id)
+
+    def enable_acceptance_filters(self, can_ids: Iterable = ()) -> None:
+        """
+        启用总线验收滤波器，只接收can_ids及已挂载路由的报文
+        :param can_ids: 仲裁ID或(仲裁ID, is_extended_id)，通常为ECU映射表中的响应ID
+        """
+        with self.lock:
+            self.acceptance_ids = {can_id if isinstance(can_id, tuple) else (can_id, False) for can_id in can_ids}
+            self._apply_acceptance_filters()
+
+    def disable_acceptance_filters(self) -> None:
+        with self.lock:
+            self.acceptance_ids = None
+            self.bus.set_filters(None)
+
+    def _apply_acceptance_filters(self) -> None:
+        # 路由新增的ID并入滤波器，保证已获取的协议栈始终能收到响应
+        self.acceptance_ids.update(self.dispatcher.routed_ids())
+        filters = build_acceptance_filters(self.acceptance_ids, HW_FILTER_LIMITS.get(type(self.bus).__name__))
+        self.bus.set_filters(filters)
@@ -0,0 +1,169 @@
+import sys
+import os
+import platform
+import threading
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-can"))
+
+SOCKETCAN_NET_PATH = "/sys/class/net"
+SOCKETCAN_PREFIXES = ('can', 'vcan', 'slcan')
+ARPHRD_CAN = '280'
+
+
+def list_socketcan_interfaces() -> list:
+    """列出SocketCAN网络接口（名称前缀匹配或接口类型为ARPHRD_CAN），非Linux返回空列表"""
+    if platform.system() != 'Linux' or not os.path.exists(SOCKETCAN_NET_PATH):
+        return []
+    names = []
+    for name in sorted(os.listdir(SOCKETCAN_NET_PATH)):
+        if name.startswith(SOCKETCAN_PREFIXES):
+            names.append(name)
+            continue
+        try:
+            with open(os.path.join(SOCKETCAN_NET_PATH, name, 'type')) as f:
+                if f.read().strip() == ARPHRD_CAN:
+                    names.append(name)
+        except OSError:
+            continue
+    return names
+
+
+class DeviceRegistry:
+    """
+    CAN设备注册表
+
+    设备枚举（打开/关闭Vector XL驱动、列出/sys/class/net）在后台线程中执行，结果缓存在devices中，
+    界面只读取缓存，扫描期间不阻塞UI线程。
+    SocketCAN接口通过轮询/sys/class/net做增量热插拔检测，只有接口增减时才更新注册表，不重新打开Vector驱动。
+    注册表每次变化version加1并回调on_change（在后台线程中调用，界面需自行切回UI线程）。
+    """
+
+    def __init__(self, on_change: Optional[Callable[[Dict[str, dict]], None]] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        :param on_change: 注册表变化时回调，参数为设备字典快照 {显示名称: 通道配置}
+        :param log: 日志输出，默认print
+        """
+        self.on_change = on_change
+        self.log = log or print
+        self.devices: Dict[str, dict] = {}
+        self.version = 0
+        self.lock = threading.Lock()
+        self.scan_thread = None
+        self.last_scan_error = None
+        self.hotplug_thread = None
+        self.hotplug_stop = threading.Event()
+
+    def get_devices(self) -> Dict[str, dict]:
+        return dict(self.devices)
+
+    def is_scanning(self) -> bool:
+        return self.scan_thread is not None and self.scan_thread.is_alive()
+
+    def scan_async(self, on_done: Optional[Callable[[Dict[str, dict]], None]] = None) -> bool:
+        """
+        后台完整扫描，正在扫描时直接返回False
+        :param on_done: 扫描结束后在后台线程中回调，参数为设备字典快照
+        """
+        with self.lock:
+            if self.is_scanning():
+                return False
+            self.scan_thread = threading.Thread(target=self._scan_worker, args=(on_done,), name='device-scan', daemon=True)
+            self.scan_thread.start()
+        return True
+
+    def scan(self) -> Dict[str, dict]:
+        """同步完整扫描（SocketCAN + Vector），更新缓存并返回快照"""
+        devices = {}
+        devices.update(self.scan_socketcan())
+        devices.update(self.scan_vector())
+        self._update(devices)
+        return self.get_devices()
+
+    def scan_socketcan(self) -> Dict[str, dict]:
+        devices = {}
+        try:
+            for name in list_socketcan_interfaces():
+                devices[f"SocketCAN: {name}"] = {
+                    'type': 'socketcan',
+                    'channel': name
+                }
+        except Exception as e:
+            self.log(f"SocketCAN scan error: {str(e)}")
+        return devices
+
+    def scan_vector(self) -> Dict[str, dict]:
+        devices = {}
+        try:
+            from can.interfaces.vector import canlib
+        except Exception as e:
+            self.log(f"Vector driver unavailable: {str(e)}")
+            return devices
+        if canlib.xldriver is None:
+            return devices
+        try:
+            canlib.xldriver.xlOpenDriver()
+            for config in canlib.get_channel_configs():
+                devices[f"{config.serial_number}: {config.name}"] = {
+                    'type': 'vector',
+                    'config': config,
+                    'hw_channel': config.hw_channel
+                }
+        except Exception as e:
+            self.log(f"Vector scan error: {str(e)}")
+        finally:
+            canlib.xldriver.xlCloseDriver()
+        return devices
+
+    def start_hotplug(self, interval: float = 1.0):
+        """启动SocketCAN热插拔检测线程"""
+        if self.hotplug_thread is not None or platform.system() != 'Linux':
+            return
+        self.hotplug_stop.clear()
+        self.hotplug_thread = threading.Thread(target=self._hotplug_loop, args=(interval,),
+                                               name='device-hotplug', daemon=True)
+        self.hotplug_thread.start()
+
+    def stop_hotplug(self):
+        if self.hotplug_thread is None:
+            return
+        self.hotplug_stop.set()
+        if self.hotplug_thread is not threading.current_thread():
+            self.hotplug_thread.join()
+        self.hotplug_thread = None
+
+    def _scan_worker(self, on_done):
+        try:
+            devices = self.scan()
+            self.last_scan_error = None
+        except Exception as e:
+            self.last_scan_error = e
+            self.log(f"Device scan failed: {str(e)}")
+            devices = self.get_devices()
+        if on_done is not None:
+            on_done(devices)
+
+    def _hotplug_loop(self, interval: float):
+        while not self.hotplug_stop.wait(interval):
+            socketcan = self.scan_socketcan()
+            with self.lock:
+                current = {name: config for name, config in self.devices.items() if config['type'] == 'socketcan'}
+                if current.keys() == socketcan.keys():
+                    continue
+                for name in socketcan.keys() - current.keys():
+                    self.log(f"SocketCAN interface added: {socketcan[name]['channel']}")
+                for name in current.keys() - socketcan.keys():
+                    self.log(f"SocketCAN interface removed: {current[name]['channel']}")
+                devices = dict(socketcan)
+                devices.update((name, config) for name, config in self.devices.items() if config['type'] != 'socketcan')
+            self._update(devices)
+
+    def _update(self, devices: Dict[str, dict]):
+        with self.lock:
+            if list(devices) == list(self.devices):
+                return
+            self.devices = devices
+            self.version += 1
+        if self.on_change is not None:
+            self.on_change(self.get_devices())
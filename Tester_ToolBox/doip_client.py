@@ -0,0 +1,273 @@
+import socket
+import select
+import struct
+import threading
+import time
+import sys
+import os
+from collections import deque
+from typing import Optional, List, Dict
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
+from udsoncan.connections import BaseConnection
+from udsoncan.exceptions import TimeoutException
+
+from doip_framing import (DOIP_PORT, DOIP_HEADER, DOIP_HEADER_SIZE, DOIP_GENERIC_NACK,
+                          DOIP_VEHICLE_IDENTIFICATION_REQUEST, DOIP_VEHICLE_IDENTIFICATION_RESPONSE,
+                          DOIP_ROUTING_ACTIVATION_REQUEST, DOIP_ROUTING_ACTIVATION_RESPONSE,
+                          DOIP_ALIVE_CHECK_REQUEST, DOIP_ALIVE_CHECK_RESPONSE, DOIP_DIAGNOSTIC_MESSAGE,
+                          DOIP_DIAGNOSTIC_MESSAGE_ACK, DOIP_DIAGNOSTIC_MESSAGE_NACK,
+                          DoIPError, DoIPFrameReader, DoIPFrameWriter, pack_doip_message)
+
+ROUTING_ACTIVATION_SUCCESS = 0x10
+
+
+def discover_vehicles(broadcast_address: str = '255.255.255.255', port: int = DOIP_PORT, timeout: float = 2.0) -> List[Dict]:
+    """
+    通过UDP广播车辆识别请求(0x0001)发现DoIP实体
+    :return: [{'ip', 'vin', 'logical_address', 'eid', 'gid', 'further_action'}]
+    """
+    vehicles = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.sendto(pack_doip_message(DOIP_VEHICLE_IDENTIFICATION_REQUEST, b''), (broadcast_address, port))
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            sock.settimeout(remaining)
+            try:
+                data, addr = sock.recvfrom(4096)
+            except socket.timeout:
+                break
+            if len(data) < DOIP_HEADER_SIZE:
+                continue
+            _, _, payload_type, payload_length = DOIP_HEADER.unpack_from(data, 0)
+            payload = data[DOIP_HEADER_SIZE:DOIP_HEADER_SIZE + payload_length]
+            if payload_type != DOIP_VEHICLE_IDENTIFICATION_RESPONSE or len(payload) < 32:
+                continue
+            vehicles.append({
+                'ip': addr[0],
+                'vin': payload[0:17].decode('ascii', errors='ignore'),
+                'logical_address': struct.unpack('>H', payload[17:19])[0],
+                'eid': payload[19:25].hex().upper(),
+                'gid': payload[25:31].hex().upper(),
+                'further_action': payload[31],
+            })
+    finally:
+        sock.close()
+    return vehicles
+
+
+class DoIPTransport:
+    """
+    DoIP TCP通道：建立连接、路由激活、帧收发及诊断消息ACK处理。
+    同一通道可被物理和功能寻址的多个DoIPClientConnection共享（引用计数）。
+    """
+
+    def __init__(self, host: str, port: int = DOIP_PORT, client_logical_address: int = 0x0E80,
+                 activation_type: int = 0x00, connect_timeout: float = 2.0, ack_timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.client_logical_address = client_logical_address
+        self.activation_type = activation_type
+        self.connect_timeout = connect_timeout
+        self.ack_timeout = ack_timeout
+        self.entity_logical_address = None
+        self.sock = None
+        self.reader = None
+        self.writer = None
+        self.users = 0
+        self.lock = threading.RLock()
+        self.rx_queue = deque()
+
+    def is_open(self) -> bool:
+        return self.sock is not None
+
+    def acquire(self):
+        with self.lock:
+            if self.sock is None:
+                self._connect()
+            self.users += 1
+
+    def release(self):
+        with self.lock:
+            self.users = max(0, self.users - 1)
+            if self.users == 0:
+                self._disconnect()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.reader = DoIPFrameReader(sock)
+        self.writer = DoIPFrameWriter(sock)
+        self.rx_queue.clear()
+        try:
+            self._activate_routing()
+        except Exception:
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+            self.reader = None
+            self.writer = None
+
+    def _activate_routing(self):
+        payload = struct.pack('>HB4x', self.client_logical_address, self.activation_type)
+        self.writer.send(DOIP_ROUTING_ACTIVATION_REQUEST, payload)
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            payload_type, response = self._read_message(deadline)
+            if payload_type == DOIP_ROUTING_ACTIVATION_RESPONSE:
+                break
+            self._dispatch(payload_type, response)
+        if len(response) < 5:
+            raise DoIPError("Invalid routing activation response")
+        tester_address, entity_address, code = struct.unpack_from('>HHB', response, 0)
+        if code != ROUTING_ACTIVATION_SUCCESS:
+            raise DoIPError(f"Routing activation rejected, response code 0x{code:02X}")
+        self.entity_logical_address = entity_address
+
+    def _read_message(self, deadline: Optional[float]):
+        """
+        读取一条完整DoIP消息，超时抛出TimeoutException（已收到的部分数据保留在缓冲区中）。
+        返回的载荷是接收缓冲区的memoryview，下一次读取前有效
+        """
+        while True:
+            frame = self.reader.next_frame()
+            if frame is not None:
+                return frame
+
+            if deadline is None:
+                self.sock.settimeout(None)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 and not self._socket_readable():
+                    raise TimeoutException("DoIP message not received in time")
+                self.sock.settimeout(max(remaining, 0))
+            try:
+                received = self.reader.fill()
+            except (socket.timeout, BlockingIOError):
+                raise TimeoutException("DoIP message not received in time")
+            if not received:
+                self._disconnect()
+                raise DoIPError("DoIP connection closed by peer")
+
+    def _socket_readable(self) -> bool:
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        return bool(readable)
+
+    def _dispatch(self, payload_type: int, payload: bytes):
+        """处理与当前等待无关的消息：诊断响应入队，Alive Check立即应答"""
+        if payload_type == DOIP_DIAGNOSTIC_MESSAGE and len(payload) >= 4:
+            source_address = struct.unpack_from('>H', payload, 0)[0]
+            self.rx_queue.append((source_address, bytes(payload[4:])))
+        elif payload_type == DOIP_ALIVE_CHECK_REQUEST:
+            self.writer.send(DOIP_ALIVE_CHECK_RESPONSE, struct.pack('>H', self.client_logical_address))
+        elif payload_type == DOIP_GENERIC_NACK:
+            raise DoIPError(f"Generic DoIP header NACK, code 0x{payload[0] if payload else 0:02X}")
+
+    def send_diagnostic(self, target_address: int, user_data: bytes):
+        """发送诊断消息并等待0x8002确认，收到0x8003时抛出DoIPError"""
+        with self.lock:
+            if self.sock is None:
+                raise DoIPError("DoIP transport is not connected")
+            self.writer.send_diagnostic(self.client_logical_address, target_address, user_data)
+            deadline = time.monotonic() + self.ack_timeout
+            while True:
+                payload_type, response = self._read_message(deadline)
+                if payload_type == DOIP_DIAGNOSTIC_MESSAGE_ACK:
+                    return
+                if payload_type == DOIP_DIAGNOSTIC_MESSAGE_NACK:
+                    code = response[4] if len(response) > 4 else 0xFF
+                    raise DoIPError(f"Diagnostic message NACK from 0x{target_address:04X}, code 0x{code:02X}")
+                self._dispatch(payload_type, response)
+
+    def wait_diagnostic(self, source_address: Optional[int], timeout: Optional[float]) -> Optional[bytes]:
+        """等待来自source_address（None表示任意源）的诊断响应"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while True:
+                while self.rx_queue:
+                    source, user_data = self.rx_queue.popleft()
+                    if source_address is None or source == source_address:
+                        return user_data
+                if self.sock is None:
+                    raise DoIPError("DoIP transport is not connected")
+                payload_type, payload = self._read_message(deadline)
+                self._dispatch(payload_type, payload)
+
+    def empty_rxqueue(self):
+        """丢弃已到达（包括仍在socket缓冲区中）的诊断响应"""
+        with self.lock:
+            if self.sock is not None:
+                try:
+                    while True:
+                        payload_type, payload = self._read_message(time.monotonic())
+                        self._dispatch(payload_type, payload)
+                except TimeoutException:
+                    pass
+            self.rx_queue.clear()
+
+
+class DoIPClientConnection(BaseConnection):
+    """
+    udsoncan连接：通过DoIP (ISO 13400) 与目标ECU通信，可直接用于udsoncan.Client。
+    使用functional()创建共享同一TCP通道的功能寻址连接。
+    """
+
+    def __init__(self, host: str, ecu_logical_address: int, client_logical_address: int = 0x0E80,
+                 port: int = DOIP_PORT, activation_type: int = 0x00, name: Optional[str] = None,
+                 transport: Optional[DoIPTransport] = None, accept_any_source: bool = False):
+        BaseConnection.__init__(self, name)
+        self.transport = transport or DoIPTransport(host, port, client_logical_address, activation_type)
+        self.ecu_logical_address = ecu_logical_address
+        self.accept_any_source = accept_any_source
+        self.opened = False
+
+    def functional(self, functional_address: int, name: Optional[str] = None) -> 'DoIPClientConnection':
+        """创建功能寻址连接，响应可来自任意ECU"""
+        return DoIPClientConnection(self.transport.host, functional_address, name=name,
+                                    transport=self.transport, accept_any_source=True)
+
+    def open(self) -> 'DoIPClientConnection':
+        if not self.opened:
+            self.transport.acquire()
+            self.opened = True
+            self.logger.info(f"DoIP connection opened to {self.transport.host}:{self.transport.port}, "
+                             f"target 0x{self.ecu_logical_address:04X}")
+        return self
+
+    def close(self) -> None:
+        if self.opened:
+            self.opened = False
+            self.transport.release()
+            self.logger.info("DoIP connection closed")
+
+    def is_open(self) -> bool:
+        return self.opened and self.transport.is_open()
+
+    def __enter__(self) -> 'DoIPClientConnection':
+        return self.open()
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    def specific_send(self, payload: bytes, timeout: Optional[float] = None) -> None:
+        self.transport.send_diagnostic(self.ecu_logical_address, payload)
+
+    def specific_wait_frame(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        source = None if self.accept_any_source else self.ecu_logical_address
+        return self.transport.wait_diagnostic(source, timeout)
+
+    def empty_rxqueue(self) -> None:
+        self.transport.empty_rxqueue()
@@ -0,0 +1,220 @@
+import socket
+import struct
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+DOIP_PORT = 13400
+DOIP_HEADER = struct.Struct('>BBHI')
+DOIP_HEADER_SIZE = DOIP_HEADER.size
+DOIP_ADDRESS_PAIR = struct.Struct('>HH')
+DOIP_DIAGNOSTIC_HEADER = struct.Struct('>BBHIHH')
+DOIP_DIAGNOSTIC_HEADER_SIZE = DOIP_DIAGNOSTIC_HEADER.size
+DOIP_VERSION = 0x03
+DOIP_INVERSE_VERSION = 0xFC
+
+DOIP_GENERIC_NACK = 0x0000
+DOIP_VEHICLE_IDENTIFICATION_REQUEST = 0x0001
+DOIP_VEHICLE_IDENTIFICATION_RESPONSE = 0x0004
+DOIP_ROUTING_ACTIVATION_REQUEST = 0x0005
+DOIP_ROUTING_ACTIVATION_RESPONSE = 0x0006
+DOIP_ALIVE_CHECK_REQUEST = 0x0007
+DOIP_ALIVE_CHECK_RESPONSE = 0x0008
+DOIP_DIAGNOSTIC_MESSAGE = 0x8001
+DOIP_DIAGNOSTIC_MESSAGE_ACK = 0x8002
+DOIP_DIAGNOSTIC_MESSAGE_NACK = 0x8003
+
+
+class DoIPError(Exception):
+    """DoIP协议层错误（路由激活失败、NACK、连接断开等）"""
+    pass
+
+
+def pack_doip_message(payload_type: int, payload: bytes) -> bytes:
+    return DOIP_HEADER.pack(DOIP_VERSION, DOIP_INVERSE_VERSION, payload_type, len(payload)) + payload
+
+
+class DoIPFrameReader:
+    """
+    DoIP帧接收：recv_into直接写入可复用的接收缓冲区，帧在缓冲区内原地解析。
+    next_frame()返回的载荷是缓冲区的memoryview，只在下一次调用next_frame()/fill()之前有效，
+    需要保留时由调用方自行bytes()拷贝。
+    """
+
+    def __init__(self, sock: socket.socket, buffer_size: int = 0x2000, max_payload_length: Optional[int] = None):
+        self.sock = sock
+        self.buffer_size = buffer_size
+        self.max_payload_length = max_payload_length
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def pending(self) -> int:
+        """缓冲区中尚未解析的字节数"""
+        return self.end - self.start
+
+    def clear(self):
+        self.start = 0
+        self.end = 0
+
+    def next_frame(self) -> Optional[Tuple[int, memoryview]]:
+        """从缓冲区取出一条完整DoIP消息，数据不足时返回None"""
+        if self.end - self.start < DOIP_HEADER_SIZE:
+            if self.start == self.end:
+                self.start = self.end = 0
+            return None
+        version, inv_version, payload_type, payload_length = DOIP_HEADER.unpack_from(self.buffer, self.start)
+        if version ^ inv_version != 0xFF:
+            raise DoIPError(f"Invalid DoIP header version 0x{version:02X}/0x{inv_version:02X}")
+        if self.max_payload_length is not None and payload_length > self.max_payload_length:
+            raise DoIPError(f"DoIP payload too large ({payload_length} bytes)")
+        frame_end = self.start + DOIP_HEADER_SIZE + payload_length
+        if frame_end > self.end:
+            self._reserve(DOIP_HEADER_SIZE + payload_length)
+            return None
+        payload = self.view[self.start + DOIP_HEADER_SIZE:frame_end]
+        self.start = frame_end
+        return payload_type, payload
+
+    def fill(self) -> int:
+        """执行一次recv_into，返回收到的字节数（0表示对端关闭连接），socket超时异常原样抛出"""
+        if self.end == len(self.buffer):
+            self._reserve(self.end - self.start + 1)
+        received = self.sock.recv_into(self.view[self.end:])
+        self.end += received
+        return received
+
+    def read_frame(self) -> Optional[Tuple[int, memoryview]]:
+        """阻塞读取一条完整DoIP消息，连接关闭时返回None"""
+        while True:
+            frame = self.next_frame()
+            if frame is not None:
+                return frame
+            if not self.fill():
+                return None
+
+    def _reserve(self, frame_size: int):
+        """保证缓冲区能从start处容纳frame_size字节：先把未解析数据移到开头，不够再扩容"""
+        if self.start + frame_size <= len(self.buffer):
+            return
+        pending = self.end - self.start
+        if frame_size <= len(self.buffer):
+            self.view[:pending] = self.view[self.start:self.end]
+        else:
+            # 新建缓冲区而不是原地resize：已导出的memoryview仍然有效
+            new_buffer = bytearray(max(frame_size, len(self.buffer) * 2))
+            new_buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = new_buffer
+            self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = pending
+
+
+class DoIPFrameWriter:
+    """
+    DoIP帧发送：消息头（诊断消息含源/目标地址）打包进预分配缓冲区，
+    头和载荷通过sendmsg一次系统调用发出，不再拼接header + payload。
+    平台不支持sendmsg（Windows）时，头和载荷拷贝到预分配的发送缓冲区后整体发送。
+
+    在batch()内发送的多条消息（如诊断ACK + 响应）合并为一次sendmsg写出。
+    """
+    MAX_BATCH = 16
+
+    def __init__(self, sock: socket.socket, tx_buffer_size: int = 0x2000):
+        self.sock = sock
+        self.header_buffer = bytearray(DOIP_DIAGNOSTIC_HEADER_SIZE * self.MAX_BATCH)
+        header_view = memoryview(self.header_buffer)
+        offsets = range(0, len(self.header_buffer), DOIP_DIAGNOSTIC_HEADER_SIZE)
+        self.header_views = [header_view[offset:offset + DOIP_HEADER_SIZE] for offset in offsets]
+        self.diagnostic_header_views = [header_view[offset:offset + DOIP_DIAGNOSTIC_HEADER_SIZE] for offset in offsets]
+        self.tx_buffer = bytearray(tx_buffer_size)
+        self.tx_view = memoryview(self.tx_buffer)
+        self.use_sendmsg = hasattr(sock, 'sendmsg')
+        self.batch_depth = 0
+        self.pending = []
+        self.pending_size = 0
+
+    def send(self, payload_type: int, payload=b''):
+        slot = self._next_slot()
+        DOIP_HEADER.pack_into(self.header_buffer, slot * DOIP_DIAGNOSTIC_HEADER_SIZE,
+                              DOIP_VERSION, DOIP_INVERSE_VERSION, payload_type, len(payload))
+        self._queue(self.header_views[slot], payload)
+
+    def send_diagnostic(self, source_address: int, target_address: int, user_data=b''):
+        """发送诊断消息(0x8001)，源/目标地址与DoIP头一起打包"""
+        slot = self._next_slot()
+        DOIP_DIAGNOSTIC_HEADER.pack_into(self.header_buffer, slot * DOIP_DIAGNOSTIC_HEADER_SIZE,
+                                         DOIP_VERSION, DOIP_INVERSE_VERSION, DOIP_DIAGNOSTIC_MESSAGE,
+                                         len(user_data) + DOIP_ADDRESS_PAIR.size, source_address, target_address)
+        self._queue(self.diagnostic_header_views[slot], user_data)
+
+    @contextmanager
+    def batch(self):
+        """批量发送：块内的消息在退出时一次写出"""
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.flush()
+
+    @contextmanager
+    def corked(self):
+        """TCP_CORK包裹块内的多次发送，由内核合并成尽量少的报文段（仅Linux）"""
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        try:
+            yield self
+        finally:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            if self.use_sendmsg:
+                sent = self.sock.sendmsg(self.pending)
+                if sent < self.pending_size:
+                    self._send_remaining(sent)
+            else:
+                self._send_copied()
+        finally:
+            self.pending.clear()
+            self.pending_size = 0
+
+    def _next_slot(self) -> int:
+        """分配一个消息头槽位，批量发送的槽位用完时先写出已排队的消息"""
+        slot = len(self.pending) // 2
+        if slot == self.MAX_BATCH:
+            self.flush()
+            slot = 0
+        return slot
+
+    def _queue(self, header: memoryview, payload):
+        # 每条消息固定占两个分段（空载荷也占位），槽位号即len(pending) // 2
+        self.pending.append(header)
+        self.pending.append(payload)
+        self.pending_size += len(header) + len(payload)
+        if not self.batch_depth:
+            self.flush()
+
+    def _send_remaining(self, sent: int):
+        """发送缓冲区满时的部分发送，补发剩余数据"""
+        for chunk in self.pending:
+            size = len(chunk)
+            if sent >= size:
+                sent -= size
+                continue
+            self.sock.sendall(memoryview(chunk)[sent:] if sent else chunk)
+            sent = 0
+
+    def _send_copied(self):
+        if self.pending_size > len(self.tx_buffer):
+            self.tx_buffer = bytearray(max(self.pending_size, len(self.tx_buffer) * 2))
+            self.tx_view = memoryview(self.tx_buffer)
+        offset = 0
+        for chunk in self.pending:
+            size = len(chunk)
+            self.tx_view[offset:offset + size] = chunk
+            offset += size
+        self.sock.sendall(self.tx_view[:offset])
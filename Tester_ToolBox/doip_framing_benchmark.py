@@ -0,0 +1,106 @@
+import argparse
+import socket
+import struct
+import sys
+import time
+import tracemalloc
+
+from doip_framing import DoIPFrameReader, DoIPFrameWriter, DOIP_DIAGNOSTIC_MESSAGE
+
+
+class LegacyFraming:
+    """原DoIPServer的收发方式：header + payload拼接发送，receive_exact逐块拼接bytes"""
+
+    def __init__(self, tx_sock, rx_sock):
+        self.tx_sock = tx_sock
+        self.rx_sock = rx_sock
+
+    def send(self, source_address, target_address, user_data):
+        payload = struct.pack('>HH', source_address, target_address) + user_data
+        header = struct.pack('>BBHI', 0x03, 0xFC, DOIP_DIAGNOSTIC_MESSAGE, len(payload))
+        self.tx_sock.sendall(header + payload)
+
+    def receive(self):
+        header = self.receive_exact(8)
+        _, _, payload_type, payload_length = struct.unpack('>BBHI', header)
+        return payload_type, self.receive_exact(payload_length)
+
+    def receive_exact(self, length):
+        data = b''
+        while len(data) < length:
+            chunk = self.rx_sock.recv(length - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+class ZeroCopyFraming:
+    """doip_framing：sendmsg分段发送，recv_into写入可复用缓冲区"""
+
+    def __init__(self, tx_sock, rx_sock):
+        self.writer = DoIPFrameWriter(tx_sock)
+        self.reader = DoIPFrameReader(rx_sock)
+
+    def send(self, source_address, target_address, user_data):
+        self.writer.send_diagnostic(source_address, target_address, user_data)
+
+    def receive(self):
+        return self.reader.read_frame()
+
+
+def measure(framing, user_data, messages):
+    """返回 (每条消息耗时us, 每条消息峰值临时分配字节, 每条消息净增内存块数)"""
+    # 预热，让缓冲区/内部缓存就位
+    for _ in range(16):
+        framing.send(0x0E80, 0x0004, user_data)
+        framing.receive()
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        framing.send(0x0E80, 0x0004, user_data)
+        framing.receive()
+    elapsed_us = (time.perf_counter() - start) / messages * 1e6
+
+    tracemalloc.start()
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(messages):
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        framing.send(0x0E80, 0x0004, user_data)
+        frame = framing.receive()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - baseline
+        del frame
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+    return elapsed_us, peak_total / messages, (blocks_after - blocks_before) / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DoIP framing microbenchmark: legacy bytes concatenation vs recv_into/sendmsg')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages per measurement')
+    parser.add_argument('--sizes', default='2,64,4002', help='Comma separated user data sizes (4002 = 0x36 with 4000 byte block)')
+    args = parser.parse_args()
+
+    print(f"sendmsg available: {hasattr(socket.socket, 'sendmsg')}")
+    print(f"{'framing':<10} {'size':>6} {'us/msg':>9} {'peak bytes/msg':>15} {'net blocks/msg':>15}")
+    for size in (int(v) for v in args.sizes.split(',')):
+        user_data = bytes([0x36, 0x01]) + bytes(range(256)) * (size // 256) + bytes(size % 256)
+        user_data = user_data[:size]
+        for name, framing_class in (('legacy', LegacyFraming), ('zerocopy', ZeroCopyFraming)):
+            tx_sock, rx_sock = socket.socketpair()
+            tx_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+            rx_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            try:
+                elapsed_us, peak_bytes, net_blocks = measure(framing_class(tx_sock, rx_sock), user_data, args.messages)
+            finally:
+                tx_sock.close()
+                rx_sock.close()
+            print(f"{name:<10} {size:>6} {elapsed_us:>9.2f} {peak_bytes:>15.0f} {net_blocks:>15.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from doip_client import DoIPClientConnection
+from doip_load_generator import percentile
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'doip_server_simulate.py')
+
+
+def wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def measure_round_trips(host, port, ecu_addr, block_size, count, warmup):
+    """0x36 TransferData往返时延：发送请求 -> 收到0x8002 ACK -> 收到0x76响应"""
+    conn = DoIPClientConnection(host, ecu_addr, port=port)
+    # 模拟器启动时会先发送3次车辆公告，accept前留出足够时间
+    conn.transport.connect_timeout = 10.0
+    latencies = []
+    with conn:
+        data = bytes(block_size)
+        for i in range(warmup + count):
+            sequence = (i + 1) & 0xFF
+            start = time.perf_counter()
+            conn.send(bytes([0x36, sequence]) + data)
+            response = conn.wait_frame(timeout=2.0, exception=True)
+            elapsed = time.perf_counter() - start
+            if response[:2] != bytes([0x76, sequence]):
+                raise RuntimeError(f"Unexpected response {response.hex().upper()}")
+            if i >= warmup:
+                latencies.append(elapsed)
+    return sorted(latencies)
+
+
+def run_mode(args, tx_mode, nodelay):
+    command = [sys.executable, SERVER_SCRIPT, '--mode', 'thread', '--host', args.host, '--port', str(args.port),
+               '--tx-mode', tx_mode]
+    if not nodelay:
+        command.append('--no-nodelay')
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(args.host, args.port, 10.0):
+            raise RuntimeError("DoIP server did not start")
+        return measure_round_trips(args.host, args.port, args.ecu_addr, args.block_size, args.count, args.warmup)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DoIP 0x36 round-trip latency over loopback for each server tx mode')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=13499)
+    parser.add_argument('--ecu-addr', type=lambda v: int(v, 0), default=0x0004)
+    parser.add_argument('--block-size', type=int, default=4000, help='TransferData payload size in bytes')
+    parser.add_argument('--count', type=int, default=200, help='Measured round trips per mode')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--modes', default='separate:nagle,separate,cork,batched',
+                        help='Comma separated tx modes, suffix ":nagle" keeps Nagle enabled on the server')
+    args = parser.parse_args()
+
+    print(f"0x36 round trip, {args.block_size} byte blocks, {args.count} requests per mode")
+    print(f"{'tx mode':<16} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'blocks/s':>9}")
+    for entry in args.modes.split(','):
+        tx_mode, _, option = entry.partition(':')
+        latencies = run_mode(args, tx_mode, option != 'nagle')
+        mean = sum(latencies) / len(latencies)
+        print(f"{entry:<16} " + " ".join(f"{percentile(latencies, pct) * 1000:>8.3f}" for pct in (50, 90, 99))
+              + f" {latencies[-1] * 1000:>8.3f} {1 / mean:>9.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import asyncio
+import argparse
+import struct
+import time
+import sys
+
+DOIP_HEADER = struct.Struct('>BBHI')
+DOIP_VERSION = 0x03
+DOIP_INVERSE_VERSION = 0xFC
+
+DOIP_ROUTING_ACTIVATION_REQUEST = 0x0005
+DOIP_ROUTING_ACTIVATION_RESPONSE = 0x0006
+DOIP_DIAGNOSTIC_MESSAGE = 0x8001
+DOIP_DIAGNOSTIC_MESSAGE_ACK = 0x8002
+DOIP_DIAGNOSTIC_MESSAGE_NACK = 0x8003
+
+
+def pack_message(payload_type: int, payload: bytes) -> bytes:
+    return DOIP_HEADER.pack(DOIP_VERSION, DOIP_INVERSE_VERSION, payload_type, len(payload)) + payload
+
+
+async def read_message(reader: asyncio.StreamReader):
+    header = await reader.readexactly(DOIP_HEADER.size)
+    _, _, payload_type, payload_length = DOIP_HEADER.unpack(header)
+    payload = await reader.readexactly(payload_length) if payload_length else b''
+    return payload_type, payload
+
+
+def percentile(sorted_values, pct):
+    """最近秩法计算百分位"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class TesterResult:
+    def __init__(self):
+        self.latencies = []
+        self.nacks = 0
+        self.errors = 0
+
+
+async def run_tester(host, port, client_addr, targets, request, expect, deadline, result: TesterResult):
+    """单个Tester连接：路由激活后循环发送诊断请求并记录往返时延（以收到第expect条响应为准）"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        result.errors += 1
+        return
+
+    try:
+        writer.write(pack_message(DOIP_ROUTING_ACTIVATION_REQUEST, struct.pack('>HB4x', client_addr, 0x00)))
+        payload_type, payload = await read_message(reader)
+        if payload_type != DOIP_ROUTING_ACTIVATION_RESPONSE or len(payload) < 5 or payload[4] != 0x10:
+            result.errors += 1
+            return
+
+        index = 0
+        while time.monotonic() < deadline:
+            target = targets[index % len(targets)]
+            index += 1
+            start = time.perf_counter()
+            writer.write(pack_message(DOIP_DIAGNOSTIC_MESSAGE, struct.pack('>HH', client_addr, target) + request))
+            pending = expect
+            while True:
+                payload_type, payload = await read_message(reader)
+                if payload_type == DOIP_DIAGNOSTIC_MESSAGE:
+                    pending -= 1
+                    if pending:
+                        continue
+                    result.latencies.append(time.perf_counter() - start)
+                    break
+                if payload_type == DOIP_DIAGNOSTIC_MESSAGE_NACK:
+                    result.nacks += 1
+                    break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        result.errors += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections, duration, targets, request, expect, base_client_addr):
+    deadline = time.monotonic() + duration
+    results = [TesterResult() for _ in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_tester(host, port, base_client_addr + i, targets, request, expect, deadline, results[i])
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DoIP load generator: concurrent testers, throughput and latency percentiles')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=13400)
+    parser.add_argument('--connections', type=int, default=100, help='Number of concurrent tester connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Test duration in seconds')
+    parser.add_argument('--target', action='append', type=lambda v: int(v, 0), default=None,
+                        help='Target logical address (repeatable, requests are spread round-robin)')
+    parser.add_argument('--request', default='22F186', help='UDS request in hex')
+    parser.add_argument('--expect', type=int, default=1,
+                        help='Diagnostic responses expected per request (number of ECUs for functional addressing)')
+    parser.add_argument('--client-addr', type=lambda v: int(v, 0), default=0x0E80, help='First tester logical address')
+    args = parser.parse_args()
+
+    targets = args.target or [0x0004]
+    request = bytes.fromhex(args.request)
+
+    print(f"Load test: {args.connections} connections, {args.duration:.1f}s, request {request.hex().upper()}, "
+          f"targets {', '.join(f'0x{t:04X}' for t in targets)}")
+    results, elapsed = asyncio.run(run_load(args.host, args.port, args.connections, args.duration,
+                                            targets, request, args.expect, args.client_addr))
+
+    latencies = sorted(lat for r in results for lat in r.latencies)
+    errors = sum(r.errors for r in results)
+    nacks = sum(r.nacks for r in results)
+    print(f"Messages: {len(latencies)}, NACK: {nacks}, Connection errors: {errors}, Elapsed: {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} msg/s")
+    if latencies:
+        print("Latency (ms): " + ", ".join(
+            f"p{pct}={percentile(latencies, pct) * 1000:.3f}" for pct in (50, 90, 99)
+        ) + f", max={latencies[-1] * 1000:.3f}")
+    return 0 if latencies and not errors else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
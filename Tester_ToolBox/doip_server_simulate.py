@@ -1,547 +1,861 @@
-import socket
-import threading
-import struct
-import time
-import json
-import os
-from typing import Dict, Tuple
-import sys
-
-class DoIPServer:
-    def __init__(self, host='127.0.0.1', port=13400, server_addr=0x1001, server_addr_func=0x1FFF, client_addr=0x0E80):
-        self.host = host
-        self.port = port
-        self.server_addr = server_addr
-        self.server_addr_func = server_addr_func 
-        self.client_addr = client_addr
-        self.tcp_socket = None
-        self.udp_socket = None
-        self.running = False
-        self.clients = {}  
-        
-        # 加载响应配置
-        self.response_config = self.load_response_config()
-        
-        # DoIP消息类型定义
-        self.DOIP_HEADER_SIZE = 8
-        self.DOIP_VERSION = 0x03
-        self.DOIP_INVERSE_VERSION = 0xFC
-        
-        # DoIP消息类型
-        self.DOIP_VEHICLE_IDENTIFICATION_REQUEST = 0x0001
-        self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE = 0x0004
-        self.DOIP_ROUTING_ACTIVATION_REQUEST = 0x0005
-        self.DOIP_ROUTING_ACTIVATION_RESPONSE = 0x0006
-        self.DOIP_DIAGNOSTIC_MESSAGE = 0x8001
-        self.DOIP_DIAGNOSTIC_MESSAGE_ACK = 0x8002
-        self.DOIP_DIAGNOSTIC_MESSAGE_NACK = 0x8003
-    
-    def load_response_config(self):
-        """加载响应配置文件"""
-        config_path = os.path.join(os.path.dirname(__file__), 'config_json', 'R_ZCU_response_doip.json')
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_list = json.load(f)
-                # 将列表转换为字典，便于快速查找
-                config_dict = {}
-                for item in config_list:
-                    req_hex = item['req'].upper()
-                    res_hex = item['res'].upper()
-                    config_dict[req_hex] = res_hex
-                print(f"Loaded {len(config_dict)} response configurations from {config_path}")
-                return config_dict
-        except FileNotFoundError:
-            print(f"Warning: Response config file not found: {config_path}")
-            print("Using default response generation")
-            return {}
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON config file: {e}")
-            return {}
-        except Exception as e:
-            print(f"Error loading response config: {e}")
-            return {}
-    
-    def start_server(self):
-        """启动DoIP服务器（TCP和UDP）"""
-        try:
-            # 启动TCP服务器
-            self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.tcp_socket.bind((self.host, self.port))
-            self.tcp_socket.listen(5)
-            
-            # 启动UDP服务器
-            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            # 添加广播权限
-            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            self.udp_socket.bind((self.host, self.port))
-            
-            self.running = True
-            
-            print(f"DoIP Server started on {self.host}:{self.port}")
-            print(f"Physical Address: 0x{self.server_addr:04X}")
-            print(f"Functional Address: 0x{self.server_addr_func:04X}")
-            print(f"Expected Client Address: 0x{self.client_addr:04X}")
-            print("TCP and UDP sockets are listening...")
-            print("Waiting for connections...")
-            
-            self.send_udp_vehicle_announcements()
-            print("Waiting for connections...")
-            
-            # 创建UDP监听线程
-            udp_thread = threading.Thread(target=self.handle_udp_messages)
-            udp_thread.daemon = True
-            udp_thread.start()
-            
-            # TCP连接处理循环
-            while self.running:
-                try:
-                    client_socket, client_address = self.tcp_socket.accept()
-                    print(f"New TCP connection from {client_address}")
-                    
-                    # 为每个TCP客户端创建处理线程
-                    client_thread = threading.Thread(
-                        target=self.handle_tcp_client,
-                        args=(client_socket, client_address)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    
-                except socket.error as e:
-                    if self.running:
-                        print(f"TCP Socket error: {e}")
-                    break
-        except KeyboardInterrupt:
-            print("\nReceived keyboard interrupt")          
-        except Exception as e:
-            print(f"Server error: {e}")
-        finally:
-            self.stop_server()
-    
-    def handle_udp_messages(self):
-        """处理UDP消息"""
-        print("UDP message handler started")
-        
-        while self.running:
-            try:
-                # 接收UDP数据
-                data, client_address = self.udp_socket.recvfrom(4096)
-                print(f"Received UDP message from {client_address}, length: {len(data)}")
-                
-                if len(data) >= self.DOIP_HEADER_SIZE:
-                    # 解析DoIP头
-                    version, inv_version, payload_type, payload_length = struct.unpack('>BBHI', data[:self.DOIP_HEADER_SIZE])
-                    
-                    print(f"UDP DoIP message:")
-                    print(f"  Version: 0x{version:02X}")
-                    print(f"  Inverse Version: 0x{inv_version:02X}")
-                    print(f"  Payload Type: 0x{payload_type:04X}")
-                    print(f"  Payload Length: {payload_length}")
-                    
-                    # 获取载荷数据
-                    payload_data = data[self.DOIP_HEADER_SIZE:self.DOIP_HEADER_SIZE + payload_length]
-                    
-                    # 处理UDP DoIP消息
-                    self.process_udp_doip_message(client_address, payload_type, payload_data)
-                else:
-                    print(f"Invalid UDP DoIP message: too short ({len(data)} bytes)")
-            except socket.timeout:
-                continue
-            except socket.error as e:
-                if self.running:
-                    print(f"UDP socket error: {e}")
-                break
-            except KeyboardInterrupt:
-                print("\nReceived keyboard interrupt in UDP handler")
-                break
-            except Exception as e:
-                print(f"UDP message handling error: {e}")
-                
-        print("UDP message handler stopped")
-    
-    def process_udp_doip_message(self, client_address: Tuple[str, int], payload_type: int, payload_data: bytes):
-        """处理UDP DoIP消息"""
-        # Skip loopback address processing for UDP messages
-        # if client_address[0] == '127.0.0.1':
-        #     print(f"Skipping loopback UDP message from {client_address}")
-        #     return
-        if payload_type == self.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
-            self.handle_udp_vehicle_identification_request(client_address, payload_data)
-        else:
-            print(f"Unknown UDP DoIP message type: 0x{payload_type:04X}")
-    
-    def handle_udp_vehicle_identification_request(self, client_address: Tuple[str, int], payload_data: bytes):
-        """处理UDP车辆识别请求"""
-        print(f"Processing UDP Vehicle Identification Request from {client_address}")
-        
-        # 构造车辆识别响应
-        vin = b'1HGBH41JXMN109186'  # 示例VIN码
-        logical_address = struct.pack('>H', self.server_addr)
-        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
-        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
-        further_action = b'\x00'  # 无需进一步操作
-        
-        response_payload = vin + logical_address + eid + gid + further_action
-        
-        # 发送UDP响应
-        self.send_udp_doip_message(client_address, self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, response_payload)
-        print(f"UDP Vehicle Identification Response sent to {client_address}")
-    
-    def send_udp_doip_message(self, client_address: Tuple[str, int], payload_type: int, payload_data: bytes):
-        """发送UDP DoIP消息"""
-        # 构造DoIP头
-        header = struct.pack('>BBHI', 
-                           self.DOIP_VERSION, 
-                           self.DOIP_INVERSE_VERSION, 
-                           payload_type, 
-                           len(payload_data))
-        
-        # 发送UDP消息
-        message = header + payload_data
-        self.udp_socket.sendto(message, client_address)
-        
-        print(f"Sent UDP DoIP message to {client_address}: Type=0x{payload_type:04X}, Length={len(payload_data)}")
-        
-    def send_udp_vehicle_announcements(self):
-        """启动时发送三次车辆公告消息"""
-        print("Sending Vehicle Announcements...")
-        
-        # 构造车辆公告消息
-        vin = b'1HGBH41JXMN109186'  # 示例VIN码
-        logical_address = struct.pack('>H', self.server_addr)
-        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
-        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
-        further_action = b'\x00'  # 无需进一步操作
-        sync_status = b'\x10'  # 同步状态 - 已同步
-        
-        # DoIP Vehicle Announcement Message (0x0004) 的载荷
-        announcement_payload = vin + logical_address + eid + gid + further_action + sync_status
-        
-        # 广播地址
-        broadcast_address = ('255.255.255.255', self.port)
-        
-        # 发送三次公告，每次间隔500毫秒
-        for i in range(3):
-            try:
-                # 构造DoIP头
-                header = struct.pack('>BBHI', 
-                                   self.DOIP_VERSION, 
-                                   self.DOIP_INVERSE_VERSION, 
-                                   self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE,  # 0x0004
-                                   len(announcement_payload))
-                
-                # 发送UDP广播消息
-                message = header + announcement_payload
-                self.udp_socket.sendto(message, broadcast_address)
-                
-                print(f"Vehicle Announcement {i+1}/3 sent to broadcast address")
-                
-                # 等待500毫秒
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"Error sending vehicle announcement {i+1}: {e}")
-        
-        print("Vehicle Announcements completed")
-        
-    def handle_tcp_client(self, client_socket: socket.socket, client_address: Tuple[str, int]):
-        """处理TCP客户端连接（原handle_client方法重命名）"""
-        client_id = f"{client_address[0]}:{client_address[1]}"
-        self.clients[client_id] = {
-            'socket': client_socket,
-            'address': client_address,
-            'routing_activated': False
-        }
-        
-        try:
-            while self.running:
-                # 接收DoIP消息头
-                header_data = self.receive_exact(client_socket, self.DOIP_HEADER_SIZE)
-                if not header_data:
-                    break
-                
-                # 解析DoIP头
-                version, inv_version, payload_type, payload_length = struct.unpack('>BBHI', header_data)
-                
-                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Received TCP DoIP message: Version: 0x{version:02X}, Inverse Version: 0x{inv_version:02X}, Payload Type: 0x{payload_type:04X}, Payload Length: {payload_length}")
-                
-                # 接收载荷数据
-                payload_data = b''
-                if payload_length > 0:
-                    payload_data = self.receive_exact(client_socket, payload_length)
-                    if not payload_data:
-                        break
-                
-                # 处理不同类型的DoIP消息
-                self.process_tcp_doip_message(client_socket, payload_type, payload_data)
-                
-        except Exception as e:
-            print(f"TCP Client {client_id} error: {e}")
-        finally:
-            print(f"TCP Client {client_id} disconnected")
-            client_socket.close()
-            if client_id in self.clients:
-                del self.clients[client_id]
-    
-    def receive_exact(self, sock: socket.socket, length: int) -> bytes:
-        """接收指定长度的数据"""
-        data = b''
-        while len(data) < length:
-            chunk = sock.recv(length - len(data))
-            if not chunk:
-                return None
-            data += chunk
-        return data
-    
-    def process_tcp_doip_message(self, client_socket: socket.socket, payload_type: int, payload_data: bytes):
-        """处理TCP DoIP消息（原process_doip_message方法重命名）"""
-        if payload_type == self.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
-            self.handle_vehicle_identification_request(client_socket, payload_data)
-        elif payload_type == self.DOIP_ROUTING_ACTIVATION_REQUEST:
-            self.handle_routing_activation_request(client_socket, payload_data)
-        elif payload_type == self.DOIP_DIAGNOSTIC_MESSAGE:
-            self.handle_diagnostic_message(client_socket, payload_data)
-        else:
-            print(f"Unknown TCP DoIP message type: 0x{payload_type:04X}")
-    
-    def handle_vehicle_identification_request(self, client_socket: socket.socket, payload_data: bytes):
-        """处理车辆识别请求"""
-        print("Processing Vehicle Identification Request")
-        
-        # 构造车辆识别响应
-        vin = b'1HGBH41JXMN109186'  # 示例VIN码
-        logical_address = struct.pack('>H', self.server_addr)
-        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
-        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
-        further_action = b'\x00'  # 无需进一步操作
-        
-        response_payload = vin + logical_address + eid + gid + further_action
-        
-        self.send_doip_message(client_socket, self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, response_payload)
-        print("Vehicle Identification Response sent")
-    
-    def handle_routing_activation_request(self, client_socket: socket.socket, payload_data: bytes):
-        """处理路由激活请求"""
-        print("Processing Routing Activation Request")
-        
-        if len(payload_data) >= 4:
-            source_address = struct.unpack('>H', payload_data[0:2])[0]
-            activation_type = payload_data[2]
-            
-            print(f"  Source Address: 0x{source_address:04X}")
-            print(f"  Activation Type: 0x{activation_type:02X}")
-            
-            # 构造路由激活响应
-            client_logical_address = struct.pack('>H', source_address)
-            server_logical_address = struct.pack('>H', self.server_addr)
-            response_code = b'\x10'  # 成功激活
-            
-            response_payload = client_logical_address + server_logical_address + response_code + b'\x00\x00\x00\x00'
-            
-            self.send_doip_message(client_socket, self.DOIP_ROUTING_ACTIVATION_RESPONSE, response_payload)
-            print("Routing Activation Response sent (Success)")
-            
-            # 标记路由已激活
-            for client_info in self.clients.values():
-                if client_info['socket'] == client_socket:
-                    client_info['routing_activated'] = True
-                    break
-        else:
-            print("Invalid Routing Activation Request payload")
-    
-    def handle_diagnostic_message(self, client_socket: socket.socket, payload_data: bytes):
-        """处理诊断消息"""
-        print("Processing Diagnostic Message")
-        
-        if len(payload_data) >= 4:
-            source_address = struct.unpack('>H', payload_data[0:2])[0]
-            target_address = struct.unpack('>H', payload_data[2:4])[0]
-            user_data = payload_data[4:]
-            
-            print(f"  Source Address: 0x{source_address:04X}，Target Address: 0x{target_address:04X}， User Data: {user_data.hex().upper()}")
-
-            # 检查目标地址是否匹配物理地址或功能地址
-            if target_address == self.server_addr:
-                print(f"  Message type: Physical addressing (0x{self.server_addr:04X})")
-                address_type = "physical"
-            elif target_address == self.server_addr_func:
-                print(f"  Message type: Functional addressing (0x{self.server_addr_func:04X})")
-                address_type = "functional"
-            else:
-                print(f"  Warning: Target address 0x{target_address:04X} does not match server addresses")
-                print(f"  Expected: 0x{self.server_addr:04X} (physical) or 0x{self.server_addr_func:04X} (functional)")
-                address_type = "unknown"
-                
-            ack_payload = struct.pack('>HHB', source_address, target_address, 0x00)  # 确认码
-            self.send_doip_message(client_socket, self.DOIP_DIAGNOSTIC_MESSAGE_ACK, ack_payload)
-            
-            if user_data:
-                response_data = self.generate_diagnostic_response(user_data, address_type)
-                if response_data:
-                    # 对于功能寻址，响应时使用物理地址作为源地址
-                    response_source = self.server_addr
-                    response_payload = struct.pack('>HH', response_source, source_address) + response_data
-                    self.send_doip_message(client_socket, self.DOIP_DIAGNOSTIC_MESSAGE, response_payload)
-                    print(f"Diagnostic Response sent: {response_data.hex().upper()}")
-                    print(f"Response source address: 0x{response_source:04X} (physical)")
-        else:
-            print("Invalid Diagnostic Message payload")
-    
-    def generate_diagnostic_response(self, request_data: bytes, address_type: str = "physical") -> bytes:
-        """生成诊断响应数据"""
-        if len(request_data) == 0:
-            return None
-        
-        # 将请求数据转换为十六进制字符串
-        request_hex = request_data.hex().upper()
-        # print(f"Looking up response for request: {request_hex} (address_type: {address_type})")
-        
-        # 首先尝试从配置文件中查找完全匹配的响应
-        if request_hex in self.response_config:
-            response_hex = self.response_config[request_hex]
-            print(f"Found configured response: {response_hex}")
-            try:
-                return bytes.fromhex(response_hex)
-            except ValueError as e:
-                print(f"Error converting hex response to bytes: {e}")
-                return None
-        
-        # 如果配置文件中没有找到，使用默认的响应生成逻辑
-        # print(f"No configured response found, using default logic")
-        return self.generate_default_diagnostic_response(request_data, address_type)
-    
-    def generate_default_diagnostic_response(self, request_data: bytes, address_type: str = "physical") -> bytes:
-        """生成默认诊断响应数据（原有逻辑）"""
-        service_id = request_data[0]
-        
-        # 对于功能寻址，某些服务可能不响应或有特殊处理
-        if address_type == "functional":
-            # 功能寻址通常用于广播类服务，某些服务可能不响应
-            if service_id == 0x3E:  # TesterPresent - 功能寻址时通常不响应
-                print("TesterPresent with functional addressing - no response")
-                return None
-            elif service_id == 0x11:  # ECU Reset - 功能寻址时可能有特殊处理
-                print("ECU Reset with functional addressing")
-                # 可以添加特殊的功能寻址处理逻辑
-        elif address_type == "physical":
-            if service_id == 0x3E:
-                # print("There is no need response for 3E80")
-                return None
-        
-        if service_id == 0x10:  # DiagnosticSessionControl
-            return bytes([0x50]) + request_data[1:2] + b'\x00\x32\x01\xF4'
-        elif service_id == 0x22:  # ReadDataByIdentifier
-            if len(request_data) >= 3:
-                did = struct.unpack('>H', request_data[1:3])[0]
-                return bytes([0x62]) + request_data[1:3] + b'\x01\x02\x03\x04'  # 示例数据
-        elif service_id == 0x27:  # SecurityAccess
-            if len(request_data) >= 2:
-                level = request_data[1]
-                if level % 2 == 1:  # 请求种子
-                    return bytes([0x67, level]) + b'\x12\x34\x56\x78\x9A\xBC\xDE\xF0' * 2
-                else:  # 发送密钥
-                    return bytes([0x67, level])
-        elif service_id == 0x3E:  # TesterPresent
-            if address_type == "physical":
-                return bytes([0x7E])  # 物理寻址时响应
-            else:
-                return None  # 功能寻址时不响应
-        elif service_id == 0x11:  # ECU Reset
-            if len(request_data) >= 2:
-                reset_type = request_data[1]
-                return bytes([0x51, reset_type])
-            
-        # 处理特定条件的直接响应
-
-        if (request_data[0] == 0x31 and 
-            request_data[1] == 0x01 and request_data[2] == 0xDD and request_data[3] == 0x02):
-            response = bytes([0x71, 0x01, 0xDD, 0x02, 0x00])
-            return response
-        
-        # 36 服务处理（TransferData）
-        if len(request_data) > 0 and request_data[0] == 0x34 and len(request_data) > 1:
-            response = bytes([0x74,0x40,0x00,0x00,0x3F,0x02])  # 正响应：76 + 块序列号
-            return response
-        
-        
-        # 36 服务处理（TransferData）
-        if len(request_data) > 0 and request_data[0] == 0x36 and len(request_data) > 1:
-            response = bytes([0x76, request_data[1]])  # 正响应：76 + 块序列号
-            return response
-        
-        # 37 服务处理（RequestTransferExit）
-        if len(request_data) > 0 and request_data[0] == 0x37:
-            response = bytes([0x77])  # 正响应：77
-            return response
-        
-        if (request_data[0] == 0x31 and 
-            request_data[1] == 0x01 and request_data[2] == 0xFF and request_data[3] == 0x00):
-            response = bytes([0x71, 0x01, 0xFF, 0x00, 0x00])
-            return response
-        
-        return bytes([0x7F, service_id, 0x11])  # serviceNotSupported
-    
-    def send_doip_message(self, client_socket: socket.socket, payload_type: int, payload_data: bytes):
-        """发送DoIP消息"""
-        # 构造DoIP头
-        header = struct.pack('>BBHI', 
-                           self.DOIP_VERSION, 
-                           self.DOIP_INVERSE_VERSION, 
-                           payload_type, 
-                           len(payload_data))
-        
-        # 发送消息
-        message = header + payload_data
-        client_socket.send(message)
-        
-        # print(f"Sent DoIP message: Type=0x{payload_type:04X}, Length={len(payload_data)}")
-    
-    def stop_server(self):
-        """停止服务器"""
-        print("Stopping DoIP server...")
-        self.running = False
-        
-        # 关闭所有客户端连接
-        for client_info in self.clients.values():
-            try:
-                client_info['socket'].close()
-            except:
-                pass
-        self.clients.clear()
-        
-        # 关闭TCP服务器socket
-        if self.tcp_socket:
-            try:
-                self.tcp_socket.close()
-            except:
-                pass
-        
-        # 关闭UDP服务器socket
-        if self.udp_socket:
-            try:
-                self.udp_socket.close()
-            except:
-                pass
-        
-        print("DoIP server stopped")
-
-def main():
-    """主函数"""
-    server = DoIPServer(
-        host='127.0.0.1',
-        port=13400,
-        server_addr=0x0004,
-        server_addr_func=0xE400,
-        client_addr=0x0E80
-    )
-    
-    try:
-        server.start_server()
-    except KeyboardInterrupt:
-        print("\nReceived interrupt signal")
-    finally:
-        server.stop_server()
-
-if __name__ == '__main__':
+import socket
+import asyncio
+import argparse
+import threading
+import struct
+import time
+import os
+from typing import Dict, Tuple
+import sys
+from contextlib import nullcontext
+
+from doip_framing import DoIPFrameReader, DoIPFrameWriter
+from response_cache import ResponseConfigCache
+
+class DoIPServer:
+    TX_MODES = ('separate', 'batched', 'cork')
+
+    def __init__(self, host='127.0.0.1', port=13400, server_addr=0x1001, server_addr_func=0x1FFF, client_addr=0x0E80,
+                 tx_mode='batched', tcp_nodelay=True, config_watch_interval=1.0):
+        """
+        :param tx_mode: 诊断ACK与响应的发送方式
+                        separate - 逐条发送；batched - 合并为一次sendmsg；cork - TCP_CORK包裹逐条发送（仅Linux）
+        :param tcp_nodelay: 对Tester连接设置TCP_NODELAY，关闭Nagle算法
+        :param config_watch_interval: 响应配置文件变化检测周期（秒），变化后热加载，0表示不监视
+        """
+        if tx_mode not in self.TX_MODES:
+            raise ValueError(f"Unknown tx_mode '{tx_mode}', expected one of {', '.join(self.TX_MODES)}")
+        if tx_mode == 'cork' and not hasattr(socket, 'TCP_CORK'):
+            print("Warning: TCP_CORK is not supported on this platform, using batched tx mode")
+            tx_mode = 'batched'
+        self.host = host
+        self.port = port
+        self.server_addr = server_addr
+        self.server_addr_func = server_addr_func 
+        self.client_addr = client_addr
+        self.tcp_socket = None
+        self.udp_socket = None
+        self.running = False
+        self.clients = {}  
+        self.tcp_writers = {}  # socket -> DoIPFrameWriter
+        self.tx_mode = tx_mode
+        self.tcp_nodelay = tcp_nodelay
+        self.config_watch_interval = config_watch_interval
+        
+        # 加载响应配置
+        self.response_config = self.load_response_config()
+        
+        # DoIP消息类型定义
+        self.DOIP_HEADER_SIZE = 8
+        self.DOIP_VERSION = 0x03
+        self.DOIP_INVERSE_VERSION = 0xFC
+        
+        # DoIP消息类型
+        self.DOIP_VEHICLE_IDENTIFICATION_REQUEST = 0x0001
+        self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE = 0x0004
+        self.DOIP_ROUTING_ACTIVATION_REQUEST = 0x0005
+        self.DOIP_ROUTING_ACTIVATION_RESPONSE = 0x0006
+        self.DOIP_DIAGNOSTIC_MESSAGE = 0x8001
+        self.DOIP_DIAGNOSTIC_MESSAGE_ACK = 0x8002
+        self.DOIP_DIAGNOSTIC_MESSAGE_NACK = 0x8003
+    
+    def load_response_config(self, config_path=None) -> ResponseConfigCache:
+        """加载响应配置文件（预编译为bytes索引，文件未变化时直接使用磁盘缓存）"""
+        if config_path is None:
+            config_path = os.path.join(os.path.dirname(__file__), 'config_json', 'R_ZCU_response_doip.json')
+        response_config = ResponseConfigCache(config_path)
+        if response_config.load():
+            print(f"Loaded {len(response_config)} response configurations from {config_path}")
+        else:
+            print("Using default response generation")
+        return response_config
+    
+    def start_server(self):
+        """启动DoIP服务器（TCP和UDP）"""
+        try:
+            # 启动TCP服务器
+            self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.tcp_socket.bind((self.host, self.port))
+            self.tcp_socket.listen(5)
+            
+            # 启动UDP服务器
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # 添加广播权限
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            self.udp_socket.bind((self.host, self.port))
+            
+            self.running = True
+            self.response_config.watch(self.config_watch_interval)
+            
+            print(f"DoIP Server started on {self.host}:{self.port}")
+            print(f"Physical Address: 0x{self.server_addr:04X}")
+            print(f"Functional Address: 0x{self.server_addr_func:04X}")
+            print(f"Expected Client Address: 0x{self.client_addr:04X}")
+            print(f"TX mode: {self.tx_mode}, TCP_NODELAY: {'on' if self.tcp_nodelay else 'off'}")
+            print("TCP and UDP sockets are listening...")
+            print("Waiting for connections...")
+            
+            self.send_udp_vehicle_announcements()
+            print("Waiting for connections...")
+            
+            # 创建UDP监听线程
+            udp_thread = threading.Thread(target=self.handle_udp_messages)
+            udp_thread.daemon = True
+            udp_thread.start()
+            
+            # TCP连接处理循环
+            while self.running:
+                try:
+                    client_socket, client_address = self.tcp_socket.accept()
+                    print(f"New TCP connection from {client_address}")
+                    
+                    # 为每个TCP客户端创建处理线程
+                    client_thread = threading.Thread(
+                        target=self.handle_tcp_client,
+                        args=(client_socket, client_address)
+                    )
+                    client_thread.daemon = True
+                    client_thread.start()
+                    
+                except socket.error as e:
+                    if self.running:
+                        print(f"TCP Socket error: {e}")
+                    break
+        except KeyboardInterrupt:
+            print("\nReceived keyboard interrupt")          
+        except Exception as e:
+            print(f"Server error: {e}")
+        finally:
+            self.stop_server()
+    
+    def handle_udp_messages(self):
+        """处理UDP消息"""
+        print("UDP message handler started")
+        
+        while self.running:
+            try:
+                # 接收UDP数据
+                data, client_address = self.udp_socket.recvfrom(4096)
+                print(f"Received UDP message from {client_address}, length: {len(data)}")
+                
+                if len(data) >= self.DOIP_HEADER_SIZE:
+                    # 解析DoIP头
+                    version, inv_version, payload_type, payload_length = struct.unpack('>BBHI', data[:self.DOIP_HEADER_SIZE])
+                    
+                    print(f"UDP DoIP message:")
+                    print(f"  Version: 0x{version:02X}")
+                    print(f"  Inverse Version: 0x{inv_version:02X}")
+                    print(f"  Payload Type: 0x{payload_type:04X}")
+                    print(f"  Payload Length: {payload_length}")
+                    
+                    # 获取载荷数据
+                    payload_data = data[self.DOIP_HEADER_SIZE:self.DOIP_HEADER_SIZE + payload_length]
+                    
+                    # 处理UDP DoIP消息
+                    self.process_udp_doip_message(client_address, payload_type, payload_data)
+                else:
+                    print(f"Invalid UDP DoIP message: too short ({len(data)} bytes)")
+            except socket.timeout:
+                continue
+            except socket.error as e:
+                if self.running:
+                    print(f"UDP socket error: {e}")
+                break
+            except KeyboardInterrupt:
+                print("\nReceived keyboard interrupt in UDP handler")
+                break
+            except Exception as e:
+                print(f"UDP message handling error: {e}")
+                
+        print("UDP message handler stopped")
+    
+    def process_udp_doip_message(self, client_address: Tuple[str, int], payload_type: int, payload_data: bytes):
+        """处理UDP DoIP消息"""
+        # Skip loopback address processing for UDP messages
+        # if client_address[0] == '127.0.0.1':
+        #     print(f"Skipping loopback UDP message from {client_address}")
+        #     return
+        if payload_type == self.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
+            self.handle_udp_vehicle_identification_request(client_address, payload_data)
+        else:
+            print(f"Unknown UDP DoIP message type: 0x{payload_type:04X}")
+    
+    def handle_udp_vehicle_identification_request(self, client_address: Tuple[str, int], payload_data: bytes):
+        """处理UDP车辆识别请求"""
+        print(f"Processing UDP Vehicle Identification Request from {client_address}")
+        
+        # 构造车辆识别响应
+        vin = b'1HGBH41JXMN109186'  # 示例VIN码
+        logical_address = struct.pack('>H', self.server_addr)
+        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
+        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
+        further_action = b'\x00'  # 无需进一步操作
+        
+        response_payload = vin + logical_address + eid + gid + further_action
+        
+        # 发送UDP响应
+        self.send_udp_doip_message(client_address, self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, response_payload)
+        print(f"UDP Vehicle Identification Response sent to {client_address}")
+    
+    def send_udp_doip_message(self, client_address: Tuple[str, int], payload_type: int, payload_data: bytes):
+        """发送UDP DoIP消息"""
+        # 构造DoIP头
+        header = struct.pack('>BBHI', 
+                           self.DOIP_VERSION, 
+                           self.DOIP_INVERSE_VERSION, 
+                           payload_type, 
+                           len(payload_data))
+        
+        # 发送UDP消息
+        message = header + payload_data
+        self.udp_socket.sendto(message, client_address)
+        
+        print(f"Sent UDP DoIP message to {client_address}: Type=0x{payload_type:04X}, Length={len(payload_data)}")
+        
+    def send_udp_vehicle_announcements(self):
+        """启动时发送三次车辆公告消息"""
+        print("Sending Vehicle Announcements...")
+        
+        # 构造车辆公告消息
+        vin = b'1HGBH41JXMN109186'  # 示例VIN码
+        logical_address = struct.pack('>H', self.server_addr)
+        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
+        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
+        further_action = b'\x00'  # 无需进一步操作
+        sync_status = b'\x10'  # 同步状态 - 已同步
+        
+        # DoIP Vehicle Announcement Message (0x0004) 的载荷
+        announcement_payload = vin + logical_address + eid + gid + further_action + sync_status
+        
+        # 广播地址
+        broadcast_address = ('255.255.255.255', self.port)
+        
+        # 发送三次公告，每次间隔500毫秒
+        for i in range(3):
+            try:
+                # 构造DoIP头
+                header = struct.pack('>BBHI', 
+                                   self.DOIP_VERSION, 
+                                   self.DOIP_INVERSE_VERSION, 
+                                   self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE,  # 0x0004
+                                   len(announcement_payload))
+                
+                # 发送UDP广播消息
+                message = header + announcement_payload
+                self.udp_socket.sendto(message, broadcast_address)
+                
+                print(f"Vehicle Announcement {i+1}/3 sent to broadcast address")
+                
+                # 等待500毫秒
+                time.sleep(1)
+                
+            except Exception as e:
+                print(f"Error sending vehicle announcement {i+1}: {e}")
+        
+        print("Vehicle Announcements completed")
+        
+    def handle_tcp_client(self, client_socket: socket.socket, client_address: Tuple[str, int]):
+        """处理TCP客户端连接（原handle_client方法重命名）"""
+        client_id = f"{client_address[0]}:{client_address[1]}"
+        if self.tcp_nodelay:
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 每个连接一套预分配的收发缓冲区：recv_into原地解析，sendmsg分段发送头和载荷
+        reader = DoIPFrameReader(client_socket)
+        self.tcp_writers[client_socket] = DoIPFrameWriter(client_socket)
+        self.clients[client_id] = {
+            'socket': client_socket,
+            'address': client_address,
+            'routing_activated': False
+        }
+        
+        try:
+            while self.running:
+                # 接收一条完整DoIP消息（载荷为接收缓冲区的memoryview，处理完之前有效）
+                frame = reader.read_frame()
+                if frame is None:
+                    break
+                payload_type, payload_data = frame
+                
+                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Received TCP DoIP message: Payload Type: 0x{payload_type:04X}, Payload Length: {len(payload_data)}")
+                
+                # 处理不同类型的DoIP消息
+                self.process_tcp_doip_message(client_socket, payload_type, payload_data)
+                
+        except Exception as e:
+            print(f"TCP Client {client_id} error: {e}")
+        finally:
+            print(f"TCP Client {client_id} disconnected")
+            client_socket.close()
+            self.tcp_writers.pop(client_socket, None)
+            if client_id in self.clients:
+                del self.clients[client_id]
+    
+    def process_tcp_doip_message(self, client_socket: socket.socket, payload_type: int, payload_data: bytes):
+        """处理TCP DoIP消息（原process_doip_message方法重命名）"""
+        if payload_type == self.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
+            self.handle_vehicle_identification_request(client_socket, payload_data)
+        elif payload_type == self.DOIP_ROUTING_ACTIVATION_REQUEST:
+            self.handle_routing_activation_request(client_socket, payload_data)
+        elif payload_type == self.DOIP_DIAGNOSTIC_MESSAGE:
+            self.handle_diagnostic_message(client_socket, payload_data)
+        else:
+            print(f"Unknown TCP DoIP message type: 0x{payload_type:04X}")
+    
+    def handle_vehicle_identification_request(self, client_socket: socket.socket, payload_data: bytes):
+        """处理车辆识别请求"""
+        print("Processing Vehicle Identification Request")
+        
+        # 构造车辆识别响应
+        vin = b'1HGBH41JXMN109186'  # 示例VIN码
+        logical_address = struct.pack('>H', self.server_addr)
+        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
+        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
+        further_action = b'\x00'  # 无需进一步操作
+        
+        response_payload = vin + logical_address + eid + gid + further_action
+        
+        self.send_doip_message(client_socket, self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, response_payload)
+        print("Vehicle Identification Response sent")
+    
+    def handle_routing_activation_request(self, client_socket: socket.socket, payload_data: bytes):
+        """处理路由激活请求"""
+        print("Processing Routing Activation Request")
+        
+        if len(payload_data) >= 4:
+            source_address = struct.unpack('>H', payload_data[0:2])[0]
+            activation_type = payload_data[2]
+            
+            print(f"  Source Address: 0x{source_address:04X}")
+            print(f"  Activation Type: 0x{activation_type:02X}")
+            
+            # 构造路由激活响应
+            client_logical_address = struct.pack('>H', source_address)
+            server_logical_address = struct.pack('>H', self.server_addr)
+            response_code = b'\x10'  # 成功激活
+            
+            response_payload = client_logical_address + server_logical_address + response_code + b'\x00\x00\x00\x00'
+            
+            self.send_doip_message(client_socket, self.DOIP_ROUTING_ACTIVATION_RESPONSE, response_payload)
+            print("Routing Activation Response sent (Success)")
+            
+            # 标记路由已激活
+            for client_info in self.clients.values():
+                if client_info['socket'] == client_socket:
+                    client_info['routing_activated'] = True
+                    break
+        else:
+            print("Invalid Routing Activation Request payload")
+    
+    def handle_diagnostic_message(self, client_socket: socket.socket, payload_data: bytes):
+        """处理诊断消息"""
+        print("Processing Diagnostic Message")
+        
+        if len(payload_data) >= 4:
+            source_address = struct.unpack('>H', payload_data[0:2])[0]
+            target_address = struct.unpack('>H', payload_data[2:4])[0]
+            user_data = payload_data[4:]
+            
+            print(f"  Source Address: 0x{source_address:04X}，Target Address: 0x{target_address:04X}， User Data: {user_data.hex().upper()}")
+
+            # 检查目标地址是否匹配物理地址或功能地址
+            if target_address == self.server_addr:
+                print(f"  Message type: Physical addressing (0x{self.server_addr:04X})")
+                address_type = "physical"
+            elif target_address == self.server_addr_func:
+                print(f"  Message type: Functional addressing (0x{self.server_addr_func:04X})")
+                address_type = "functional"
+            else:
+                print(f"  Warning: Target address 0x{target_address:04X} does not match server addresses")
+                print(f"  Expected: 0x{self.server_addr:04X} (physical) or 0x{self.server_addr_func:04X} (functional)")
+                address_type = "unknown"
+                
+            ack_payload = struct.pack('>HHB', source_address, target_address, 0x00)  # 确认码
+            # ACK和响应按tx_mode合并发送，避免两个小报文段触发Nagle/延迟确认等待
+            with self._tx_context(client_socket):
+                self.send_doip_message(client_socket, self.DOIP_DIAGNOSTIC_MESSAGE_ACK, ack_payload)
+                
+                if user_data:
+                    response_data = self.generate_diagnostic_response(user_data, address_type)
+                    if response_data:
+                        # 对于功能寻址，响应时使用物理地址作为源地址
+                        response_source = self.server_addr
+                        self.send_diagnostic_message(client_socket, response_source, source_address, response_data)
+                        print(f"Diagnostic Response sent: {response_data.hex().upper()}")
+                        print(f"Response source address: 0x{response_source:04X} (physical)")
+        else:
+            print("Invalid Diagnostic Message payload")
+    
+    def generate_diagnostic_response(self, request_data: bytes, address_type: str = "physical") -> bytes:
+        """生成诊断响应数据"""
+        if len(request_data) == 0:
+            return None
+        
+        # 首先尝试从配置文件中查找完全匹配的响应（索引已预编译为bytes）
+        response = self.response_config.lookup(request_data)
+        if response is not None:
+            print(f"Found configured response: {response.hex().upper()}")
+            return response
+        
+        # 如果配置文件中没有找到，使用默认的响应生成逻辑
+        # print(f"No configured response found, using default logic")
+        return self.generate_default_diagnostic_response(request_data, address_type)
+    
+    def generate_default_diagnostic_response(self, request_data: bytes, address_type: str = "physical") -> bytes:
+        """生成默认诊断响应数据（原有逻辑）"""
+        service_id = request_data[0]
+        
+        # 对于功能寻址，某些服务可能不响应或有特殊处理
+        if address_type == "functional":
+            # 功能寻址通常用于广播类服务，某些服务可能不响应
+            if service_id == 0x3E:  # TesterPresent - 功能寻址时通常不响应
+                print("TesterPresent with functional addressing - no response")
+                return None
+            elif service_id == 0x11:  # ECU Reset - 功能寻址时可能有特殊处理
+                print("ECU Reset with functional addressing")
+                # 可以添加特殊的功能寻址处理逻辑
+        elif address_type == "physical":
+            if service_id == 0x3E:
+                # print("There is no need response for 3E80")
+                return None
+        
+        if service_id == 0x10:  # DiagnosticSessionControl
+            return bytes([0x50]) + request_data[1:2] + b'\x00\x32\x01\xF4'
+        elif service_id == 0x22:  # ReadDataByIdentifier
+            if len(request_data) >= 3:
+                did = struct.unpack('>H', request_data[1:3])[0]
+                return bytes([0x62]) + request_data[1:3] + b'\x01\x02\x03\x04'  # 示例数据
+        elif service_id == 0x27:  # SecurityAccess
+            if len(request_data) >= 2:
+                level = request_data[1]
+                if level % 2 == 1:  # 请求种子
+                    return bytes([0x67, level]) + b'\x12\x34\x56\x78\x9A\xBC\xDE\xF0' * 2
+                else:  # 发送密钥
+                    return bytes([0x67, level])
+        elif service_id == 0x3E:  # TesterPresent
+            if address_type == "physical":
+                return bytes([0x7E])  # 物理寻址时响应
+            else:
+                return None  # 功能寻址时不响应
+        elif service_id == 0x11:  # ECU Reset
+            if len(request_data) >= 2:
+                reset_type = request_data[1]
+                return bytes([0x51, reset_type])
+            
+        # 处理特定条件的直接响应
+
+        if (request_data[0] == 0x31 and 
+            request_data[1] == 0x01 and request_data[2] == 0xDD and request_data[3] == 0x02):
+            response = bytes([0x71, 0x01, 0xDD, 0x02, 0x00])
+            return response
+        
+        # 36 服务处理（TransferData）
+        if len(request_data) > 0 and request_data[0] == 0x34 and len(request_data) > 1:
+            response = bytes([0x74,0x40,0x00,0x00,0x3F,0x02])  # 正响应：76 + 块序列号
+            return response
+        
+        
+        # 36 服务处理（TransferData）
+        if len(request_data) > 0 and request_data[0] == 0x36 and len(request_data) > 1:
+            response = bytes([0x76, request_data[1]])  # 正响应：76 + 块序列号
+            return response
+        
+        # 37 服务处理（RequestTransferExit）
+        if len(request_data) > 0 and request_data[0] == 0x37:
+            response = bytes([0x77])  # 正响应：77
+            return response
+        
+        if (request_data[0] == 0x31 and 
+            request_data[1] == 0x01 and request_data[2] == 0xFF and request_data[3] == 0x00):
+            response = bytes([0x71, 0x01, 0xFF, 0x00, 0x00])
+            return response
+        
+        return bytes([0x7F, service_id, 0x11])  # serviceNotSupported
+    
+    def send_doip_message(self, client_socket: socket.socket, payload_type: int, payload_data: bytes):
+        """发送DoIP消息（头和载荷分段发送，不拼接）"""
+        self._get_writer(client_socket).send(payload_type, payload_data)
+        
+        # print(f"Sent DoIP message: Type=0x{payload_type:04X}, Length={len(payload_data)}")
+    
+    def send_diagnostic_message(self, client_socket: socket.socket, source_address: int, target_address: int, user_data: bytes):
+        """发送诊断消息(0x8001)，源/目标地址随DoIP头一起打包"""
+        self._get_writer(client_socket).send_diagnostic(source_address, target_address, user_data)
+    
+    def _tx_context(self, client_socket: socket.socket):
+        """按tx_mode返回包裹一组发送的上下文"""
+        if self.tx_mode == 'batched':
+            return self._get_writer(client_socket).batch()
+        if self.tx_mode == 'cork':
+            return self._get_writer(client_socket).corked()
+        return nullcontext()
+    
+    def _get_writer(self, client_socket: socket.socket) -> DoIPFrameWriter:
+        writer = self.tcp_writers.get(client_socket)
+        if writer is None:
+            writer = self.tcp_writers[client_socket] = DoIPFrameWriter(client_socket)
+        return writer
+    
+    def stop_server(self):
+        """停止服务器"""
+        print("Stopping DoIP server...")
+        self.running = False
+        self.response_config.stop_watching()
+        
+        # 关闭所有客户端连接
+        for client_info in self.clients.values():
+            try:
+                client_info['socket'].close()
+            except:
+                pass
+        self.clients.clear()
+        self.tcp_writers.clear()
+        
+        # 关闭TCP服务器socket
+        if self.tcp_socket:
+            try:
+                self.tcp_socket.close()
+            except:
+                pass
+        
+        # 关闭UDP服务器socket
+        if self.udp_socket:
+            try:
+                self.udp_socket.close()
+            except:
+                pass
+        
+        print("DoIP server stopped")
+
+class _AsyncDoIPTcpSession(asyncio.BufferedProtocol):
+    """单个Tester的TCP会话，接收数据直接写入预分配缓冲区并原地解析DoIP帧"""
+
+    def __init__(self, server: 'AsyncDoIPServer'):
+        self.server = server
+        self.buffer = bytearray(server.rx_buffer_size)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self.transport = None
+        self.peer = None
+        self.routing_activated = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peer = transport.get_extra_info('peername')
+        self.server.sessions.add(self)
+        self.server.stats['connections'] += 1
+        if self.server.verbose:
+            print(f"New TCP connection from {self.peer}")
+
+    def connection_lost(self, exc):
+        self.server.sessions.discard(self)
+        if self.server.verbose:
+            print(f"TCP Client {self.peer} disconnected")
+
+    def get_buffer(self, sizehint):
+        if self.filled == len(self.buffer):
+            self._grow(len(self.buffer) * 2)
+        return self.view[self.filled:]
+
+    def buffer_updated(self, nbytes):
+        self.filled += nbytes
+        header_size = self.server.DOIP_HEADER_SIZE
+        offset = 0
+        while self.filled - offset >= header_size:
+            _, _, payload_type, payload_length = self.server.HEADER_STRUCT.unpack_from(self.buffer, offset)
+            if payload_length > self.server.max_payload_length:
+                print(f"TCP Client {self.peer} payload too large ({payload_length} bytes), closing connection")
+                self.transport.close()
+                return
+            frame_end = offset + header_size + payload_length
+            if frame_end > self.filled:
+                if header_size + payload_length > len(self.buffer):
+                    self._grow(header_size + payload_length, keep_from=offset)
+                    offset = 0
+                break
+            self.server.process_async_doip_message(self, payload_type, self.view[offset + header_size:frame_end])
+            offset = frame_end
+
+        if offset:
+            remaining = self.filled - offset
+            if remaining:
+                self.view[:remaining] = self.view[offset:self.filled]
+            self.filled = remaining
+
+    def _grow(self, size, keep_from=0):
+        """扩容接收缓冲区（仅在载荷超过当前缓冲区时发生）"""
+        new_buffer = bytearray(max(size, self.server.rx_buffer_size))
+        pending = self.filled - keep_from
+        new_buffer[:pending] = self.view[keep_from:self.filled]
+        self.buffer = new_buffer
+        self.view = memoryview(self.buffer)
+        self.filled = pending
+
+    def write_messages(self, chunks):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.writelines(chunks)
+
+
+class _AsyncDoIPUdpEndpoint(asyncio.DatagramProtocol):
+    """UDP车辆识别请求处理"""
+
+    def __init__(self, server: 'AsyncDoIPServer'):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < self.server.DOIP_HEADER_SIZE:
+            return
+        _, _, payload_type, _ = self.server.HEADER_STRUCT.unpack_from(data, 0)
+        if payload_type != self.server.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
+            if self.server.verbose:
+                print(f"Unknown UDP DoIP message type: 0x{payload_type:04X}")
+            return
+        # 每个逻辑ECU各自回复一条车辆识别响应
+        for logical_address in self.server.nodes:
+            payload = self.server.build_vehicle_identification_payload(logical_address)
+            self.transport.sendto(self.server.pack_header(self.server.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, len(payload)) + payload, addr)
+
+
+class AsyncDoIPServer(DoIPServer):
+    """基于asyncio的DoIP服务器
+
+    单线程事件循环服务大量并发Tester连接，并在同一进程内模拟多个逻辑ECU地址。
+    接收路径使用asyncio.BufferedProtocol写入预分配缓冲区，不再为每条消息拼接bytes；
+    默认不逐条打印消息，改为按stats_interval周期输出统计信息。
+    """
+    HEADER_STRUCT = struct.Struct('>BBHI')
+    ADDRESS_PAIR_STRUCT = struct.Struct('>HH')
+
+    def __init__(self, host='127.0.0.1', port=13400, ecu_nodes=None, server_addr=0x1001, server_addr_func=0x1FFF,
+                 client_addr=0x0E80, rx_buffer_size=0x2000, max_payload_length=0x10000, verbose=False, stats_interval=0,
+                 config_watch_interval=1.0):
+        """
+        :param ecu_nodes: {逻辑地址: 响应配置文件路径}，路径为None时使用默认的R_ZCU_response_doip.json
+        :param rx_buffer_size: 每个连接预分配的接收缓冲区大小
+        :param stats_interval: 统计信息打印周期（秒），0表示不打印
+        """
+        super().__init__(host, port, server_addr, server_addr_func, client_addr,
+                         config_watch_interval=config_watch_interval)
+        if not ecu_nodes:
+            ecu_nodes = {server_addr: None}
+        # 第一个节点的地址作为DoIP实体地址（路由激活响应中使用）
+        self.server_addr = next(iter(ecu_nodes))
+        self.nodes = {}
+        for logical_address, config_path in ecu_nodes.items():
+            self.nodes[logical_address] = self.response_config if config_path is None else self.load_response_config(config_path)
+
+        self.rx_buffer_size = rx_buffer_size
+        self.max_payload_length = max_payload_length
+        self.verbose = verbose
+        self.stats_interval = stats_interval
+        self.sessions = set()
+        self.stats = {'connections': 0, 'rx_messages': 0, 'tx_messages': 0}
+        self.loop = None
+        self.tcp_server = None
+        self.udp_transport = None
+
+    def pack_header(self, payload_type: int, payload_length: int) -> bytes:
+        return self.HEADER_STRUCT.pack(self.DOIP_VERSION, self.DOIP_INVERSE_VERSION, payload_type, payload_length)
+
+    def build_vehicle_identification_payload(self, logical_address: int) -> bytes:
+        vin = b'1HGBH41JXMN109186'  # 示例VIN码
+        eid = b'\x01\x02\x03\x04\x05\x06'  # 示例EID
+        gid = b'\x07\x08\x09\x0A\x0B\x0C'  # 示例GID
+        return vin + struct.pack('>H', logical_address) + eid + gid + b'\x00'
+
+    async def serve(self):
+        """启动TCP/UDP端点并运行直到stop_server被调用"""
+        self.loop = asyncio.get_running_loop()
+        self.tcp_server = await self.loop.create_server(
+            lambda: _AsyncDoIPTcpSession(self), self.host, self.port, reuse_address=True, backlog=1024)
+        self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _AsyncDoIPUdpEndpoint(self), local_addr=(self.host, self.port), allow_broadcast=True)
+        self.running = True
+        for response_config in self._response_configs():
+            response_config.watch(self.config_watch_interval)
+
+        print(f"Async DoIP Server started on {self.host}:{self.port}")
+        print(f"Logical Addresses: {', '.join(f'0x{addr:04X}' for addr in self.nodes)}")
+        print(f"Functional Address: 0x{self.server_addr_func:04X}")
+
+        stats_task = None
+        if self.stats_interval:
+            stats_task = self.loop.create_task(self._report_stats())
+        try:
+            await self.tcp_server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if stats_task:
+                stats_task.cancel()
+
+    async def _report_stats(self):
+        last_rx = 0
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            rx = self.stats['rx_messages']
+            print(f"[{time.strftime('%H:%M:%S')}] active={len(self.sessions)} total_connections={self.stats['connections']} "
+                  f"rx={rx} tx={self.stats['tx_messages']} rate={(rx - last_rx) / self.stats_interval:.0f} msg/s")
+            last_rx = rx
+
+    def start_server(self):
+        """阻塞运行异步服务器"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\nReceived keyboard interrupt")
+        except Exception as e:
+            print(f"Server error: {e}")
+        finally:
+            self.stop_server()
+
+    def stop_server(self):
+        """停止服务器（可在其他线程中调用）"""
+        if not self.running:
+            return
+        self.running = False
+        for response_config in self._response_configs():
+            response_config.stop_watching()
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._close_endpoints)
+        else:
+            self._close_endpoints()
+        print("Async DoIP server stopped")
+
+    def _response_configs(self):
+        """各节点使用的响应配置（多个节点可共享同一份）"""
+        return {id(config): config for config in self.nodes.values()}.values()
+
+    def _close_endpoints(self):
+        for session in list(self.sessions):
+            if session.transport is not None:
+                session.transport.close()
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+
+    def process_async_doip_message(self, session: _AsyncDoIPTcpSession, payload_type: int, payload: memoryview):
+        self.stats['rx_messages'] += 1
+        if payload_type == self.DOIP_DIAGNOSTIC_MESSAGE:
+            self.handle_async_diagnostic_message(session, payload)
+        elif payload_type == self.DOIP_ROUTING_ACTIVATION_REQUEST:
+            self.handle_async_routing_activation_request(session, payload)
+        elif payload_type == self.DOIP_VEHICLE_IDENTIFICATION_REQUEST:
+            response_payload = self.build_vehicle_identification_payload(self.server_addr)
+            session.write_messages([self.pack_header(self.DOIP_VEHICLE_IDENTIFICATION_RESPONSE, len(response_payload)), response_payload])
+            self.stats['tx_messages'] += 1
+        elif self.verbose:
+            print(f"Unknown TCP DoIP message type: 0x{payload_type:04X}")
+
+    def handle_async_routing_activation_request(self, session: _AsyncDoIPTcpSession, payload: memoryview):
+        if len(payload) < 4:
+            print("Invalid Routing Activation Request payload")
+            return
+        source_address = struct.unpack_from('>H', payload, 0)[0]
+        response_payload = struct.pack('>HHB4x', source_address, self.server_addr, 0x10)  # 0x10: 成功激活
+        session.write_messages([self.pack_header(self.DOIP_ROUTING_ACTIVATION_RESPONSE, len(response_payload)), response_payload])
+        session.routing_activated = True
+        self.stats['tx_messages'] += 1
+        if self.verbose:
+            print(f"Routing activated for tester 0x{source_address:04X} ({session.peer})")
+
+    def handle_async_diagnostic_message(self, session: _AsyncDoIPTcpSession, payload: memoryview):
+        if len(payload) < 4:
+            print("Invalid Diagnostic Message payload")
+            return
+        source_address, target_address = self.ADDRESS_PAIR_STRUCT.unpack_from(payload, 0)
+
+        if target_address in self.nodes:
+            targets = (target_address,)
+            address_type = "physical"
+        elif target_address == self.server_addr_func:
+            targets = tuple(self.nodes)
+            address_type = "functional"
+        else:
+            # 0x03: 未知目标地址
+            nack_payload = struct.pack('>HHB', target_address, source_address, 0x03)
+            session.write_messages([self.pack_header(self.DOIP_DIAGNOSTIC_MESSAGE_NACK, len(nack_payload)), nack_payload])
+            self.stats['tx_messages'] += 1
+            return
+
+        user_data = bytes(payload[4:])
+        ack_payload = struct.pack('>HHB', target_address, source_address, 0x00)
+        chunks = [self.pack_header(self.DOIP_DIAGNOSTIC_MESSAGE_ACK, len(ack_payload)), ack_payload]
+        if user_data:
+            for logical_address in targets:
+                response_data = self.nodes[logical_address].lookup(user_data)
+                if response_data is None:
+                    response_data = self.generate_default_diagnostic_response(user_data, address_type)
+                if response_data:
+                    chunks.append(self.pack_header(self.DOIP_DIAGNOSTIC_MESSAGE, 4 + len(response_data)))
+                    chunks.append(self.ADDRESS_PAIR_STRUCT.pack(logical_address, source_address))
+                    chunks.append(response_data)
+                    if self.verbose:
+                        print(f"0x{logical_address:04X} -> 0x{source_address:04X}: {response_data.hex().upper()}")
+        # ACK与响应合并为一次写操作
+        session.write_messages(chunks)
+        self.stats['tx_messages'] += (len(chunks) + 1) // 3
+
+
+def parse_ecu_node(value: str):
+    """解析 --ecu 参数，格式为 ADDR[:CONFIG_JSON]，例如 0x0004:config_json/R_ZCU_response_doip.json"""
+    addr, _, config_path = value.partition(':')
+    return int(addr, 0), (config_path or None)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='DoIP server simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=13400)
+    parser.add_argument('--mode', default='thread', choices=['thread', 'async'],
+                        help='thread: one thread per tester (default); async: asyncio event loop')
+    parser.add_argument('--ecu', action='append', type=parse_ecu_node, default=None,
+                        help='Logical ECU address with optional response config, e.g. 0x0004:config_json/R_ZCU_response_doip.json (async mode, repeatable)')
+    parser.add_argument('--func-addr', type=lambda v: int(v, 0), default=0xE400, help='Functional address')
+    parser.add_argument('--verbose', action='store_true', help='Print every message in async mode')
+    parser.add_argument('--stats-interval', type=float, default=5.0, help='Statistics print period in seconds (async mode)')
+    parser.add_argument('--tx-mode', default='batched', choices=DoIPServer.TX_MODES,
+                        help='How diagnostic ACK and response are written (thread mode): separate sends, one batched sendmsg, or TCP_CORK around separate sends')
+    parser.add_argument('--no-nodelay', action='store_true', help='Keep Nagle enabled on tester connections (thread mode)')
+    parser.add_argument('--watch-interval', type=float, default=1.0,
+                        help='Response config polling period in seconds for hot reload, 0 disables')
+    args = parser.parse_args()
+
+    if args.mode == 'async':
+        server = AsyncDoIPServer(
+            host=args.host,
+            port=args.port,
+            ecu_nodes=dict(args.ecu) if args.ecu else {0x0004: None},
+            server_addr_func=args.func_addr,
+            client_addr=0x0E80,
+            verbose=args.verbose,
+            stats_interval=args.stats_interval,
+            config_watch_interval=args.watch_interval
+        )
+    else:
+        server = DoIPServer(
+            host=args.host,
+            port=args.port,
+            server_addr=0x0004,
+            server_addr_func=args.func_addr,
+            client_addr=0x0E80,
+            tx_mode=args.tx_mode,
+            tcp_nodelay=not args.no_nodelay,
+            config_watch_interval=args.watch_interval
+        )
+    
+    try:
+        server.start_server()
+    except KeyboardInterrupt:
+        print("\nReceived interrupt signal")
+    finally:
+        server.stop_server()
+
+if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+SREC_EXTENSIONS = ('.s19', '.s28', '.s37', '.srec', '.mot')
+# S记录类型 -> 地址字节数
+SREC_ADDRESS_LENGTHS = {'0': 2, '1': 2, '2': 3, '3': 4, '5': 2, '6': 3, '7': 4, '8': 3, '9': 2}
+
+
+class FirmwareFormatError(ValueError):
+    """固件文件格式/校验和错误，带文件名和行号"""
+
+    def __init__(self, path: str, line_number: int, message: str):
+        super().__init__(f"{os.path.basename(path)} line {line_number}: {message}")
+        self.path = path
+        self.line_number = line_number
+
+
+class FirmwareImage:
+    """
+    固件映像：按地址排列的连续数据段
+
+    解析时逐行解码记录，地址连续的记录追加到同一个bytearray段，不像intelhex.IntelHex那样每个字节一个字典项，
+    内存约等于数据本身的大小。to_binary()按段的总跨度预先分配一个填充好的bytearray，再把各段整体拷贝进去。
+    """
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self.segments: List[Tuple[int, bytearray]] = []
+        self.start_address: Optional[int] = None  # 入口地址记录（03/05、S7/S8/S9），没有时为None
+        self.record_count = 0
+
+    def add_data(self, address: int, data: bytes):
+        segments = self.segments
+        if segments:
+            last_address, last_data = segments[-1]
+            if address == last_address + len(last_data):
+                last_data += data
+                return
+        segments.append((address, bytearray(data)))
+
+    def normalize(self):
+        """按地址排序并合并相邻段，地址重叠时抛出ValueError"""
+        merged: List[Tuple[int, bytearray]] = []
+        for address, data in sorted(self.segments, key=lambda segment: segment[0]):
+            if merged:
+                last_address, last_data = merged[-1]
+                last_end = last_address + len(last_data)
+                if address < last_end:
+                    raise ValueError(f"{os.path.basename(self.path)}: data overlaps at 0x{address:08X}")
+                if address == last_end:
+                    last_data += data
+                    continue
+            merged.append((address, data))
+        self.segments = merged
+        return self
+
+    @property
+    def min_address(self) -> int:
+        return min(address for address, _ in self.segments)
+
+    @property
+    def max_address(self) -> int:
+        """最后一个数据字节的地址（与IntelHex.maxaddr()一致）"""
+        return max(address + len(data) for address, data in self.segments) - 1
+
+    @property
+    def data_size(self) -> int:
+        return sum(len(data) for _, data in self.segments)
+
+    def to_binary(self, padding: int = 0xFF) -> Tuple[bytearray, int]:
+        """
+        合并为一段连续数据，段之间的空隙填充padding
+        :return: (数据, 起始地址)
+        """
+        if not self.segments:
+            raise ValueError(f"{os.path.basename(self.path)}: no data records")
+        self.normalize()
+        start = self.min_address
+        if len(self.segments) == 1:
+            return self.segments[0][1], start
+        binary = bytearray([padding]) * (self.max_address - start + 1)
+        for address, data in self.segments:
+            offset = address - start
+            binary[offset:offset + len(data)] = data
+        return binary, start
+
+
+def _lines(f: BinaryIO) -> Iterable[Tuple[int, bytes]]:
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if line:
+            yield line_number, line
+
+
+def parse_intel_hex(path: str) -> FirmwareImage:
+    """流式解析Intel HEX，逐行校验和"""
+    image = FirmwareImage(path)
+    base = 0
+    with open(path, 'rb') as f:
+        for line_number, line in _lines(f):
+            if line[:1] != b':':
+                raise FirmwareFormatError(path, line_number, "record does not start with ':'")
+            try:
+                record = bytes.fromhex(line[1:].decode('ascii'))
+            except (ValueError, UnicodeDecodeError):
+                raise FirmwareFormatError(path, line_number, "invalid hex digits")
+            length = record[0] if record else -1
+            if len(record) != length + 5:
+                raise FirmwareFormatError(path, line_number, "record length mismatch")
+            if sum(record) & 0xFF:
+                raise FirmwareFormatError(path, line_number, f"checksum error (0x{record[-1]:02X})")
+            record_type = record[3]
+            image.record_count += 1
+            if record_type == 0x00:
+                image.add_data(base + ((record[1] << 8) | record[2]), record[4:-1])
+            elif record_type == 0x01:
+                break
+            elif record_type == 0x02:
+                base = int.from_bytes(record[4:6], 'big') << 4
+            elif record_type == 0x04:
+                base = int.from_bytes(record[4:6], 'big') << 16
+            elif record_type in (0x03, 0x05):
+                image.start_address = int.from_bytes(record[4:-1], 'big')
+            else:
+                raise FirmwareFormatError(path, line_number, f"unsupported record type 0x{record_type:02X}")
+    return image
+
+
+def parse_srec(path: str) -> FirmwareImage:
+    """流式解析Motorola S-record（S1/S2/S3数据），逐行校验和"""
+    image = FirmwareImage(path)
+    with open(path, 'rb') as f:
+        for line_number, line in _lines(f):
+            if line[:1] != b'S':
+                raise FirmwareFormatError(path, line_number, "record does not start with 'S'")
+            record_type = chr(line[1]) if len(line) > 1 else ''
+            address_length = SREC_ADDRESS_LENGTHS.get(record_type)
+            if address_length is None:
+                raise FirmwareFormatError(path, line_number, f"unsupported record type S{record_type}")
+            try:
+                record = bytes.fromhex(line[2:].decode('ascii'))
+            except (ValueError, UnicodeDecodeError):
+                raise FirmwareFormatError(path, line_number, "invalid hex digits")
+            if not record or len(record) != record[0] + 1 or record[0] < address_length + 1:
+                raise FirmwareFormatError(path, line_number, "record length mismatch")
+            if sum(record) & 0xFF != 0xFF:
+                raise FirmwareFormatError(path, line_number, f"checksum error (0x{record[-1]:02X})")
+            image.record_count += 1
+            address = int.from_bytes(record[1:1 + address_length], 'big')
+            if record_type in '123':
+                image.add_data(address, record[1 + address_length:-1])
+            elif record_type in '789':
+                image.start_address = address
+                break
+    return image
+
+
+def load_firmware(path: str) -> FirmwareImage:
+    """按扩展名（或首字符）选择Intel HEX / S-record解析器"""
+    if os.path.splitext(path)[1].lower() in SREC_EXTENSIONS:
+        return parse_srec(path)
+    with open(path, 'rb') as f:
+        first = f.read(1)
+    if first == b'S':
+        return parse_srec(path)
+    return parse_intel_hex(path)
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+TOOLBOX_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 在全新的解释器中解析，峰值内存不受其他解析器影响
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {toolbox_dir!r})
+start = time.perf_counter()
+if {parser!r} == 'intelhex':
+    import intelhex
+    ih = intelhex.IntelHex({path!r})
+    start_addr = ih.minaddr()
+    data = bytes(ih.tobinarray(start=start_addr, size=ih.maxaddr() - start_addr + 1))
+else:
+    from firmware_image import load_firmware
+    data, start_addr = load_firmware({path!r}).to_binary()
+    data = bytes(data)
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    peak = None
+import hashlib
+print(json.dumps({{'elapsed': elapsed, 'peak': peak, 'start': start_addr, 'size': len(data),
+                  'sha256': hashlib.sha256(data).hexdigest()}}))
+"""
+
+
+def write_intel_hex(path, data, address, record_size=32):
+    with open(path, 'w', newline='\n') as f:
+        upper = None
+        for offset in range(0, len(data), record_size):
+            current = address + offset
+            if current >> 16 != upper:
+                upper = current >> 16
+                record = bytes([2, 0, 0, 4]) + upper.to_bytes(2, 'big')
+                f.write(':' + (record + bytes([-sum(record) & 0xFF])).hex().upper() + '\n')
+            chunk = data[offset:offset + record_size]
+            # 记录不跨64K边界
+            chunk = chunk[:0x10000 - (current & 0xFFFF)]
+            record = bytes([len(chunk)]) + (current & 0xFFFF).to_bytes(2, 'big') + b'\x00' + chunk
+            f.write(':' + (record + bytes([-sum(record) & 0xFF])).hex().upper() + '\n')
+        f.write(':00000001FF\n')
+
+
+def write_srec(path, data, address, record_size=32):
+    with open(path, 'w', newline='\n') as f:
+        for offset in range(0, len(data), record_size):
+            chunk = data[offset:offset + record_size]
+            record = bytes([len(chunk) + 5]) + (address + offset).to_bytes(4, 'big') + chunk
+            f.write('S3' + (record + bytes([~sum(record) & 0xFF])).hex().upper() + '\n')
+        record = bytes([5]) + address.to_bytes(4, 'big')
+        f.write('S7' + (record + bytes([~sum(record) & 0xFF])).hex().upper() + '\n')
+
+
+def run_probe(parser, path):
+    result = subprocess.run([sys.executable, '-c', PROBE.format(toolbox_dir=TOOLBOX_DIR, parser=parser, path=path)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse time and peak memory: intelhex vs streaming firmware_image parser')
+    parser.add_argument('--size-mb', type=float, default=16, help='Synthetic image size in MiB')
+    parser.add_argument('--address', type=lambda v: int(v, 0), default=0x01000000)
+    parser.add_argument('--files', nargs='*', help='Parse these files instead of a synthetic image')
+    parser.add_argument('--skip-intelhex', action='store_true', help='Only run the streaming parser')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            data = os.urandom(int(args.size_mb * 1024 * 1024))
+            files = [os.path.join(tmp, 'image.hex'), os.path.join(tmp, 'image.s37')]
+            write_intel_hex(files[0], data, args.address)
+            write_srec(files[1], data, args.address)
+            print(f"synthetic image: {len(data)} bytes at 0x{args.address:08X}")
+
+        print(f"{'file':<16} {'parser':<14} {'seconds':>9} {'peak MB':>9}  result")
+        failed = False
+        for path in files:
+            parsers = ['firmware_image']
+            if not args.skip_intelhex and os.path.splitext(path)[1].lower() == '.hex':
+                parsers.insert(0, 'intelhex')
+            results = {}
+            for name in parsers:
+                result = run_probe(name, path)
+                results[name] = result
+                peak = f"{result['peak'] / 1024 / 1024:>9.1f}" if result['peak'] else f"{'n/a':>9}"
+                print(f"{os.path.basename(path):<16} {name:<14} {result['elapsed']:>9.3f} {peak}  "
+                      f"0x{result['start']:08X} +{result['size']} sha256 {result['sha256'][:16]}")
+            if 'intelhex' in results:
+                reference, streaming = results['intelhex'], results['firmware_image']
+                if (reference['start'], reference['sha256']) != (streaming['start'], streaming['sha256']):
+                    print(f"{os.path.basename(path):<16} MISMATCH between parsers")
+                    failed = True
+                else:
+                    print(f"{os.path.basename(path):<16} speedup {reference['elapsed'] / streaming['elapsed']:.1f}x")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
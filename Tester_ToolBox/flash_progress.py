@@ -0,0 +1,200 @@
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_HISTORY_PATH = os.path.join('.flashstats', 'flash_history.json')
+DEFAULT_STEP_SECONDS = 0.5  # 没有历史记录的非传输步骤的估计耗时
+DEFAULT_THROUGHPUT = 20 * 1024  # 没有历史记录时的传输速率估计（字节/秒）
+TRANSFER_STEP_PREFIX = 'Transfer '
+
+
+class ProgressModel:
+    """
+    刷写进度/ETA模型
+
+    - 每个分区按确认（收到0x76正响应）的字节数统计，sliding window内的字节增量给出瞬时速率，
+      分区传输开始以来的总量给出平均速率
+    - ETA覆盖整个序列：传输步骤按剩余字节/速率估算，擦除、签名校验、复位等步骤按历史耗时估算
+    - 成功结束后，各步骤耗时和传输速率以指数加权平均记入历史文件（按zone区分），下次刷写用于估算
+
+    bytes_acked()每块只做一次deque追加和过期弹出，不会拖慢传输循环。
+    """
+
+    def __init__(self, history_path: Optional[str] = DEFAULT_HISTORY_PATH, window: float = 2.0,
+                 smoothing: float = 0.3):
+        """
+        :param history_path: 历史耗时文件，None表示不读写历史
+        :param window: 瞬时速率的滑动窗口长度（秒）
+        :param smoothing: 历史更新的指数加权系数（新样本权重）
+        """
+        self.history_path = history_path
+        self.window = window
+        self.smoothing = smoothing
+        self.history = self._load_history()
+        self.zone = ''
+        self.step_names: List[str] = []
+        self.partition_sizes: Dict[str, int] = {}
+        self.partition_acked: Dict[str, int] = {}
+        self.partition_start: Dict[str, float] = {}
+        self.partition_end: Dict[str, float] = {}
+        self.samples = deque()  # (time, 累计确认字节数)
+        self.step = 0
+        self.step_start = None
+        self.step_durations: Dict[str, float] = {}
+        self.sequence_start = None
+
+    # ---------------- 状态更新 ----------------
+
+    def plan(self, zone: str, step_names: List[str], partition_sizes: Dict[str, int], now: Optional[float] = None):
+        self.zone = zone
+        self.step_names = list(step_names)
+        self.partition_sizes = {name: size or 0 for name, size in partition_sizes.items()}
+        self.partition_acked = {name: 0 for name in self.partition_sizes}
+        self.partition_start.clear()
+        self.partition_end.clear()
+        self.samples.clear()
+        self.step = 0
+        self.step_start = None
+        self.step_durations.clear()
+        self.sequence_start = time.monotonic() if now is None else now
+
+    def step_started(self, step: int, now: Optional[float] = None):
+        """step从1开始"""
+        now = time.monotonic() if now is None else now
+        self._close_step(now)
+        self.step = step
+        self.step_start = now
+
+    def bytes_acked(self, partition: str, bytes_sent: int, now: Optional[float] = None):
+        """分区内已确认的累计字节数"""
+        now = time.monotonic() if now is None else now
+        if partition not in self.partition_start:
+            self.partition_start[partition] = self.step_start if self.step_start is not None else now
+        self.partition_acked[partition] = bytes_sent
+        if bytes_sent >= self.partition_sizes.get(partition, 0):
+            self.partition_end[partition] = now
+        samples = self.samples
+        samples.append((now, self.bytes_sent))
+        while len(samples) > 2 and now - samples[1][0] >= self.window:
+            samples.popleft()
+
+    def finish(self, success: bool, now: Optional[float] = None):
+        """序列结束，成功时更新并保存历史"""
+        now = time.monotonic() if now is None else now
+        self._close_step(now)
+        if not success or self.history_path is None:
+            return
+        zone_history = self.history.setdefault(self.zone or 'default', {'steps': {}, 'throughput': None})
+        for name, seconds in self.step_durations.items():
+            if name.startswith(TRANSFER_STEP_PREFIX):
+                continue
+            zone_history['steps'][name] = self._blend(zone_history['steps'].get(name), seconds)
+        rate = self.average_rate()
+        if rate:
+            zone_history['throughput'] = self._blend(zone_history.get('throughput'), rate)
+        self._save_history()
+
+    # ---------------- 查询 ----------------
+
+    @property
+    def bytes_sent(self) -> int:
+        return sum(self.partition_acked.values())
+
+    @property
+    def bytes_total(self) -> int:
+        return sum(self.partition_sizes.values())
+
+    def instantaneous_rate(self) -> float:
+        """滑动窗口内的确认速率（字节/秒）"""
+        if len(self.samples) < 2:
+            return 0.0
+        (t0, b0), (t1, b1) = self.samples[0], self.samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def average_rate(self) -> float:
+        """所有分区传输期间的平均速率（只计传输步骤的时间）"""
+        elapsed = 0.0
+        acked = 0
+        for partition, start in self.partition_start.items():
+            end = self.partition_end.get(partition)
+            if end is None:
+                end = self.samples[-1][0] if self.samples else start
+            elapsed += end - start
+            acked += self.partition_acked.get(partition, 0)
+        return acked / elapsed if elapsed > 0 else 0.0
+
+    def partition_rate(self, partition: str) -> float:
+        start = self.partition_start.get(partition)
+        if start is None:
+            return 0.0
+        end = self.partition_end.get(partition) or (self.samples[-1][0] if self.samples else start)
+        return self.partition_acked.get(partition, 0) / (end - start) if end > start else 0.0
+
+    def learned_throughput(self) -> Optional[float]:
+        return self.history.get(self.zone or 'default', {}).get('throughput')
+
+    def learned_step_seconds(self, name: str) -> Optional[float]:
+        return self.history.get(self.zone or 'default', {}).get('steps', {}).get(name)
+
+    def eta(self, now: Optional[float] = None) -> Optional[float]:
+        """整个序列的剩余时间估计（秒），尚未plan时为None"""
+        if not self.step_names:
+            return None
+        now = time.monotonic() if now is None else now
+        rate = self.instantaneous_rate() or self.average_rate() or self.learned_throughput() or DEFAULT_THROUGHPUT
+        remaining = 0.0
+        first = max(self.step, 1)
+        for index in range(first, len(self.step_names) + 1):
+            name = self.step_names[index - 1]
+            partition = self._transfer_partition(name)
+            if partition is not None:
+                remaining += max(0, self.partition_sizes.get(partition, 0) - self.partition_acked.get(partition, 0)) / rate
+                continue
+            estimate = self.learned_step_seconds(name)
+            if estimate is None:
+                estimate = DEFAULT_STEP_SECONDS
+            if index == self.step and self.step_start is not None:
+                estimate = max(0.0, estimate - (now - self.step_start))
+            remaining += estimate
+        return remaining
+
+    # ---------------- 内部 ----------------
+
+    @staticmethod
+    def _transfer_partition(step_name: str) -> Optional[str]:
+        if step_name.startswith(TRANSFER_STEP_PREFIX) and step_name != 'Transfer exit':
+            return step_name[len(TRANSFER_STEP_PREFIX):].lower()
+        return None
+
+    def _close_step(self, now: float):
+        if self.step and self.step_start is not None and self.step <= len(self.step_names):
+            name = self.step_names[self.step - 1]
+            # 同名步骤（如多次Transfer exit）取平均
+            previous = self.step_durations.get(name)
+            duration = now - self.step_start
+            self.step_durations[name] = duration if previous is None else (previous + duration) / 2
+        self.step_start = None
+
+    def _blend(self, old: Optional[float], new: float) -> float:
+        return new if old is None else old + (new - old) * self.smoothing
+
+    def _load_history(self) -> dict:
+        if self.history_path is None:
+            return {}
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_history(self):
+        tmp_path = f"{self.history_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.history_path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.history, f, indent=2)
+            os.replace(tmp_path, self.history_path)
+        except OSError as e:
+            print(f"[ProgressModel] Unable to save flash history {self.history_path}: {e}")
@@ -0,0 +1,313 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from flash_progress import ProgressModel, DEFAULT_HISTORY_PATH
+from uds_session import UdsSession
+
+# 事件类型
+EVENT_STARTED = 'started'
+EVENT_STEP = 'step'
+EVENT_PROGRESS = 'progress'
+EVENT_LOG = 'log'
+EVENT_FINISHED = 'finished'
+EVENT_TESTER_PRESENT = 'tester_present'
+EVENT_REPORT = 'report'
+
+DEFAULT_REPORT_PATH = os.path.join('.flashstats', 'flash_report.json')
+
+
+class FlashEvent(NamedTuple):
+    """刷写进度事件，bytes_*为整个刷写序列（所有分区）的累计值"""
+    kind: str
+    timestamp: float
+    step: int = 0
+    step_count: int = 0
+    step_name: str = ''
+    partition: str = ''
+    bytes_sent: int = 0
+    bytes_total: int = 0
+    rate: float = 0.0  # 滑动窗口内的瞬时速率（字节/秒）
+    average_rate: float = 0.0  # 传输步骤的平均速率（字节/秒）
+    eta: Optional[float] = None  # 整个序列的剩余时间（秒，含擦除/签名等步骤），未知时为None
+    retries: int = 0  # 本次刷写0x36数据块的重传次数
+    message: str = ''
+    success: Optional[bool] = None
+    report: Optional[dict] = None  # report事件：刷写报告（各分区地址/长度/CRC32/SHA-256）
+
+    @property
+    def percent(self) -> float:
+        return self.bytes_sent * 100.0 / self.bytes_total if self.bytes_total else 0.0
+
+    def remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """按事件时间戳倒数的ETA，UI在两次事件之间（如长时间擦除）刷新显示用"""
+        if self.eta is None:
+            return None
+        return max(0.0, self.eta - ((now or time.time()) - self.timestamp))
+
+    def summary(self, now: Optional[float] = None) -> str:
+        text = f"[{self.step}/{self.step_count}] {self.step_name}"
+        if self.bytes_total:
+            text += f" | {self.percent:.1f}% ({self.bytes_sent // 1024}/{self.bytes_total // 1024} KB)"
+        if self.rate or self.average_rate:
+            text += f" | {self.rate / 1024:.1f} KB/s (avg {self.average_rate / 1024:.1f})"
+        eta = self.remaining(now) if now is not None else self.eta
+        if eta is not None:
+            text += f" | ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        if self.retries:
+            text += f" | {self.retries} retries"
+        return text
+
+
+class FlashingService:
+    """
+    与界面无关的刷写服务
+
+    在工作线程中执行FlashingProcess刷写序列和TesterPresent保活，通过事件流（FlashEvent）发布
+    步骤、已发送字节数、速率、ETA、日志和结果，Tk/PySide6/CLI等前端订阅事件自行刷新界面。
+    订阅回调在工作线程中调用，界面前端应使用subscribe_queue()在UI线程中取事件，不要在回调里直接操作控件。
+    进度事件按progress_interval节流，订阅者再慢也不会拖慢传输循环。
+    速率和ETA由ProgressModel给出（滑动窗口速率 + 历史步骤耗时）。
+    persistent=True时刷写步骤和保活共用一个UdsSession长连接，不再每个步骤都打开/关闭连接。
+    """
+
+    def __init__(self, uds_client, uds_client_func, progress_interval: float = 0.2,
+                 history_path: Optional[str] = DEFAULT_HISTORY_PATH, persistent: bool = True,
+                 report_path: Optional[str] = DEFAULT_REPORT_PATH):
+        """
+        :param uds_client: 物理寻址udsoncan Client
+        :param uds_client_func: 功能寻址udsoncan Client
+        :param progress_interval: 进度事件最小发布间隔（秒），分区传输完成时总会发布
+        :param history_path: 步骤耗时/速率历史文件，None表示不学习
+        :param persistent: 使用长连接会话（连接只在首次使用和断开后打开）
+        :param report_path: 每次刷写结束后写入的报告文件，None表示不写
+        """
+        self.session = UdsSession(uds_client, uds_client_func) if persistent else None
+        self.uds_client = self.session.client if persistent else uds_client
+        self.uds_client_func = self.session.client_func if persistent else uds_client_func
+        self.progress_interval = progress_interval
+        self.history_path = history_path
+        self.report_path = report_path
+        self.report = None
+        self.progress = ProgressModel(history_path)
+        self.subscribers: tuple = ()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.result: Optional[bool] = None
+        self.is_flashing = False
+        self.tester_present_thread = None
+        self.tester_present_stop = threading.Event()
+        self._reset_progress()
+
+    def _reset_progress(self):
+        self.step = 0
+        self.step_count = 0
+        self.step_name = ''
+        self.zone_type = ''
+        self.bytes_total = 0
+        self.retries = 0
+        self.last_progress_time = 0.0
+
+    # ---------------- 订阅 ----------------
+
+    def subscribe(self, callback: Callable[[FlashEvent], None]) -> None:
+        with self.lock:
+            self.subscribers = self.subscribers + (callback,)
+
+    def unsubscribe(self, callback: Callable[[FlashEvent], None]) -> None:
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s != callback)
+
+    def subscribe_queue(self, maxsize: int = 0) -> queue.Queue:
+        """
+        订阅到队列，供UI线程定时取出；队列满时丢弃进度事件，其他事件阻塞等待
+        取消订阅：unsubscribe(events.callback)
+        """
+        events = queue.Queue(maxsize)
+
+        def put(event: FlashEvent):
+            if event.kind == EVENT_PROGRESS:
+                try:
+                    events.put_nowait(event)
+                except queue.Full:
+                    pass
+            else:
+                events.put(event)
+
+        self.subscribe(put)
+        events.callback = put
+        return events
+
+    def publish(self, kind: str, **fields) -> FlashEvent:
+        event = FlashEvent(kind, time.time(), step=self.step, step_count=self.step_count, step_name=self.step_name,
+                           bytes_total=self.bytes_total, **fields)
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                # 订阅者出错不能中断刷写
+                print(f"[FlashingService] Subscriber error: {e}")
+        return event
+
+    # ---------------- 刷写 ----------------
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, zone_type: str, cal_is_must: bool, flash_config: dict) -> bool:
+        """在后台线程中执行刷写序列，已在刷写时返回False"""
+        if self.is_running():
+            return False
+        self.thread = threading.Thread(target=self.run, args=(zone_type, cal_is_must, flash_config),
+                                       name='flashing', daemon=True)
+        self.thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.result
+
+    def run(self, zone_type: str, cal_is_must: bool, flash_config: dict) -> bool:
+        """在当前线程中执行刷写序列，返回是否成功"""
+        from BootloaderPackFlash import FlashingProcess
+        self._reset_progress()
+        self.zone_type = zone_type
+        self.result = None
+        self.report = None
+        self.is_flashing = True
+        if self.session is not None:
+            self.session.reset_stats()
+        self.publish(EVENT_STARTED, message=f"Flashing {zone_type}")
+        try:
+            process = FlashingProcess(self.uds_client, self.uds_client_func,
+                                      trace_handler=self._on_log, event_handler=self._on_process_event)
+            success = bool(process.execute_flashing_sequence(zone_type=zone_type, cal_is_must=cal_is_must,
+                                                             flash_config=flash_config))
+            message = "Flashing complete" if success else "Flashing failed"
+        except Exception as e:
+            success = False
+            message = f"Flashing error: {str(e)}"
+        finally:
+            self.is_flashing = False
+            if self.session is not None:
+                self._on_log(f"UDS session: {self.session.stats()}")
+                if self.tester_present_thread is None:
+                    self.session.close()
+        self.progress.finish(success)
+        self.result = success
+        state = self._transfer_state()
+        state['eta'] = 0.0 if success else None
+        self.publish(EVENT_FINISHED, success=success, message=message, **state)
+        return success
+
+    def _on_log(self, message: str):
+        self.publish(EVENT_LOG, message=message)
+
+    def _on_process_event(self, kind: str, **info):
+        if kind == 'plan':
+            self.progress.plan(self.zone_type, info['step_names'], info['partition_sizes'])
+            self.step_count = len(info['step_names'])
+            self.bytes_total = self.progress.bytes_total
+        elif kind == 'step':
+            if self.session is not None and self.step_name == 'ECU reset':
+                # ECU复位后原连接（DoIP TCP、ECU侧ISO-TP状态）不再有效，下一步使用时重新打开
+                self.session.close()
+            self.step = info['step']
+            self.step_count = info['step_count']
+            self.step_name = info['step_name']
+            self.progress.step_started(self.step)
+            self.publish(EVENT_STEP, **self._transfer_state())
+        elif kind == 'progress':
+            now = time.monotonic()
+            partition = info['partition']
+            self.progress.bytes_acked(partition, info['bytes_sent'], now)
+            done = info['bytes_sent'] >= info['bytes_total']
+            if done or now - self.last_progress_time >= self.progress_interval:
+                self.last_progress_time = now
+                self.publish(EVENT_PROGRESS, partition=partition, **self._transfer_state(now))
+        elif kind == 'retry':
+            self.retries += 1
+        elif kind == 'report':
+            self._on_report(info['report'])
+
+    def _on_report(self, report: dict):
+        report = dict(report, finished=time.strftime('%Y-%m-%d %H:%M:%S'))
+        self.report = report
+        for partition, entry in report['partitions'].items():
+            if 'sha256' in entry:
+                self._on_log(f"Report {partition.upper()}: {entry['start_address']} +{entry['length']} bytes, "
+                             f"CRC32 {entry['crc32']}, SHA-256 {entry['sha256']} ({entry['digest_source']}), "
+                             f"{entry['retries']} retries, signature {entry['signature']}")
+        if self.report_path is not None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.report_path)), exist_ok=True)
+                with open(self.report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+            except OSError as e:
+                self._on_log(f"Unable to write flash report {self.report_path}: {str(e)}")
+        self.publish(EVENT_REPORT, report=report, message=self.report_path or '')
+
+    def _transfer_state(self, now: Optional[float] = None) -> dict:
+        """累计确认字节数、瞬时/平均速率和整个序列的ETA"""
+        progress = self.progress
+        return {'bytes_sent': progress.bytes_sent, 'rate': progress.instantaneous_rate(),
+                'average_rate': progress.average_rate(), 'eta': progress.eta(now), 'retries': self.retries}
+
+    # ---------------- TesterPresent保活 ----------------
+
+    def start_tester_present(self, interval: float = 3.0):
+        """后台周期发送3E 80（刷写期间暂停），每次发送结果以tester_present事件发布"""
+        if self.tester_present_thread is not None:
+            return
+        self.tester_present_stop.clear()
+        self.tester_present_thread = threading.Thread(target=self._tester_present_loop, args=(interval,),
+                                                      name='tester-present', daemon=True)
+        self.tester_present_thread.start()
+
+    def stop_tester_present(self):
+        if self.tester_present_thread is None:
+            return
+        self.tester_present_stop.set()
+        if self.tester_present_thread is not threading.current_thread():
+            self.tester_present_thread.join()
+        self.tester_present_thread = None
+
+    def _tester_present_loop(self, interval: float):
+        while not self.tester_present_stop.is_set():
+            if not self.is_flashing:
+                try:
+                    with self.uds_client as client:
+                        client.conn.send(bytes.fromhex("3E80"))
+                    self.publish(EVENT_TESTER_PRESENT, success=True)
+                except Exception as e:
+                    self.publish(EVENT_TESTER_PRESENT, success=False, message=f"TesterPresent error: {str(e)}")
+            self.tester_present_stop.wait(interval)
+
+    def ecu_reset(self, reset_type: int = 1):
+        """刷写序列之外的ECU复位（界面按钮），复位后连接不再有效，由会话关闭并在下次使用时重新打开"""
+        try:
+            with self.uds_client as client:
+                return client.ecu_reset(reset_type=reset_type)
+        finally:
+            if self.session is not None:
+                self.session.close()
+
+    def close(self):
+        self.stop_tester_present()
+        if self.session is not None and not self.is_running():
+            self.session.close()
+
+
+def drain_events(events: queue.Queue, limit: int = 200) -> List[FlashEvent]:
+    """取出队列中已有的事件（UI定时器中调用，单次最多limit个）"""
+    drained = []
+    while len(drained) < limit:
+        try:
+            drained.append(events.get_nowait())
+        except queue.Empty:
+            break
+    return drained
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import zlib
+from typing import NamedTuple, Optional
+
+DEFAULT_CACHE_PATH = os.path.join('.flashstats', 'digest_cache.json')
+
+
+class ImageDigest(NamedTuple):
+    """分区摘要：CRC32（zlib/IEEE）和SHA-256，覆盖实际传输给ECU的数据"""
+    length: int
+    crc32: int
+    sha256: str
+
+    def summary(self) -> str:
+        return f"{self.length} bytes, CRC32 0x{self.crc32:08X}, SHA-256 {self.sha256}"
+
+
+class IncrementalDigest:
+    """传输过程中逐块更新的CRC32/SHA-256，不需要对映像再做一遍计算"""
+
+    def __init__(self):
+        self.crc32 = 0
+        self.sha256 = hashlib.sha256()
+        self.length = 0
+
+    def update(self, data: bytes):
+        self.crc32 = zlib.crc32(data, self.crc32)
+        self.sha256.update(data)
+        self.length += len(data)
+
+    def result(self) -> ImageDigest:
+        return ImageDigest(self.length, self.crc32, self.sha256.hexdigest())
+
+
+class DigestCache:
+    """
+    映像文件 -> 摘要 的持久缓存
+
+    以文件绝对路径 + 大小 + 修改时间（ns）为键，文件被替换或修改后自动失效。
+    命中时刷写过程不再计算摘要，结果直接进入刷写报告。
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = self._load()
+
+    @staticmethod
+    def image_key(image_path: str) -> str:
+        stat = os.stat(image_path)
+        return f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def get(self, image_path: str) -> Optional[ImageDigest]:
+        try:
+            entry = self.entries.get(self.image_key(image_path))
+        except OSError:
+            return None
+        if entry is None:
+            return None
+        return ImageDigest(entry['length'], entry['crc32'], entry['sha256'])
+
+    def put(self, image_path: str, digest: ImageDigest):
+        try:
+            key = self.image_key(image_path)
+        except OSError:
+            return
+        # 同一文件的旧条目（修改前）一并删除
+        prefix = key.rsplit('|', 2)[0] + '|'
+        for old_key in [k for k in self.entries if k.startswith(prefix)]:
+            del self.entries[old_key]
+        self.entries[key] = digest._asdict()
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+        self._save()
+
+    def _load(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[DigestCache] Unable to save digest cache {self.path}: {e}")
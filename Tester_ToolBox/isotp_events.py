@@ -0,0 +1,58 @@
+import threading
+from typing import Callable, Optional
+
+
+class IsoTpReceiver:
+    """
+    事件驱动的ISO-TP接收
+
+    专用线程阻塞在协议栈接收队列上（recv(block=True)），报文重组完成后立即回调on_message，
+    空闲时线程挂起在队列的条件变量上，不再以10ms周期轮询。
+    响应时延只取决于总线和协议栈，stop_interval只影响stop()的返回时间。
+    """
+
+    def __init__(self, stack, on_message: Callable[[bytes], None],
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 name: str = 'isotp-rx', stop_interval: float = 0.2):
+        """
+        :param stack: isotp.TransportLayer/NotifierBasedCanStack 或提供recv(block, timeout)的对象
+        :param on_message: 收到完整报文时在接收线程中回调
+        :param on_error: on_message或recv抛出异常时回调，默认忽略
+        :param stop_interval: 阻塞等待的最长时间，用于检查停止请求
+        """
+        self.stack = stack
+        self.on_message = on_message
+        self.on_error = on_error
+        self.name = name
+        self.stop_interval = stop_interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+        self.thread = None
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                payload = self.stack.recv(block=True, timeout=self.stop_interval)
+                if payload is not None and not self.stop_event.is_set():
+                    self.on_message(payload)
+            except Exception as e:
+                if self.stop_event.is_set():
+                    break
+                if self.on_error is not None:
+                    self.on_error(e)
+
@@ -0,0 +1,238 @@
+import logging
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+FLOW_STATUS_CTS = 0
+FLOW_STATUS_WAIT = 1
+FLOW_STATUS_OVERFLOW = 2
+
+
+class PrebuiltFrames(NamedTuple):
+    """一个ISO-TP报文分好的CAN帧（can.Message，已填充），单帧报文时consecutive为空"""
+    first: object
+    consecutive: Tuple[object, ...]
+
+
+class FrameTransmitError(Exception):
+    pass
+
+
+def stmin_seconds(value: int) -> float:
+    """流控帧STmin：0x00-0x7F毫秒，0xF1-0xF9为100-900微秒，其余保留值按127毫秒处理"""
+    if value <= 0x7F:
+        return value / 1000.0
+    if 0xF1 <= value <= 0xF9:
+        return (value - 0xF0) / 10000.0
+    return 0.127
+
+
+class _IdleFlowControlFilter(logging.Filter):
+    """预分帧发送期间，协议栈空闲时收到的流控帧是发给本模块的，不记录协议栈的告警"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return 'FlowControl message while transmission was Idle' not in record.getMessage()
+
+
+class IsoTpFrameSender:
+    """
+    ISO-TP预分帧发送
+
+    刷写数据块提前（可在后台线程中）按协议栈的参数分成首帧/连续帧并生成can.Message，
+    包括依赖块序列号的0x36请求头、PCI、填充和DLC；发送时只按接收方流控帧（BS/STmin）把这些帧推到总线上，
+    不再在发送路径上逐帧分段、填充和构造消息。
+    响应（单帧76 xx）仍由原ISO-TP协议栈接收，udsoncan连接的wait_frame不受影响。
+    只支持Normal/29位Normal寻址（没有地址扩展字节），其他寻址方式supports()返回False，使用协议栈发送。
+    """
+
+    def __init__(self, stack):
+        import can
+        self._message_class = can.Message
+        self.stack = stack
+        self.params = stack.params
+        self.address = stack.address
+        self.bus = stack.bus
+        session = getattr(stack, 'session', None)
+        # BusSession上的协议栈：按仲裁ID挂路由，发送帧通知tx_monitors
+        self.session = session if hasattr(session, 'add_route') else None
+        self.rx_id = self.address.get_rx_arbitration_id()
+        self.rx_extended = self.address.is_rx_29bits()
+        self.flow_control = queue.Queue()
+        self.log_filter = _IdleFlowControlFilter()
+        self.attached = False
+        self.frames_sent = 0
+
+    @staticmethod
+    def supports(conn) -> bool:
+        """
+        udsoncan PythonIsoTpConnection（isotp 2.x协议栈，Normal寻址），且能收到流控帧：
+        BusSession上的协议栈（按仲裁ID挂路由）或NotifierBasedCanStack（在notifier上加监听）。
+        自己轮询总线的CanStack/TransportLayer无法旁听流控帧，使用协议栈发送
+        """
+        stack = getattr(getattr(conn, 'subconn', None), 'isotp_layer', None)
+        if stack is None or not hasattr(stack, 'bus') or not hasattr(stack, '_make_tx_msg'):
+            return False
+        session = getattr(stack, 'session', None)
+        if not hasattr(session, 'add_route') and not hasattr(stack, 'notifier'):
+            return False
+        return not stack.address.requires_tx_extension_byte()
+
+    @classmethod
+    def for_connection(cls, conn) -> 'IsoTpFrameSender':
+        return cls(conn.subconn.isotp_layer)
+
+    # ---------------- 分帧 ----------------
+
+    def build(self, payload) -> PrebuiltFrames:
+        """按协议栈参数（tx_data_length、tx_padding、tx_data_min_length、CAN FD）分帧"""
+        frame_length = self.params.tx_data_length
+        length = len(payload)
+        if length <= 7:
+            return PrebuiltFrames(self._message(bytes([length]) + bytes(payload)), ())
+        if frame_length > 8 and length <= frame_length - 2:
+            return PrebuiltFrames(self._message(bytes([0x00, length]) + bytes(payload)), ())
+        if length <= 0xFFF:
+            header = bytes([0x10 | (length >> 8), length & 0xFF])
+        else:
+            header = bytes([0x10, 0x00]) + length.to_bytes(4, 'big')
+        offset = frame_length - len(header)
+        first = self._message(header + bytes(payload[:offset]))
+        chunk = frame_length - 1
+        consecutive = []
+        sequence = 1
+        for start in range(offset, length, chunk):
+            consecutive.append(self._message(bytes([0x20 | sequence]) + bytes(payload[start:start + chunk])))
+            sequence = (sequence + 1) & 0x0F
+        return PrebuiltFrames(first, tuple(consecutive))
+
+    def _message(self, data: bytes):
+        msg = self.stack._make_tx_msg(self.address.get_tx_arbitration_id(), data)
+        return self._message_class(arbitration_id=msg.arbitration_id, data=msg.data, is_extended_id=msg.is_extended_id,
+                                   is_fd=msg.is_fd, bitrate_switch=msg.bitrate_switch)
+
+    def prebuild(self, items: Iterable[Tuple[object, bytes]], lookahead: int = 16) -> Iterator[Tuple[object, PrebuiltFrames]]:
+        """
+        后台线程按顺序分帧，最多提前lookahead个报文，分帧与等待ECU响应重叠
+        :param items: [(键, 报文)]，按相同顺序产出(键, PrebuiltFrames)
+        """
+        ready = queue.Queue(maxsize=max(1, lookahead))
+        stop = threading.Event()
+        done = object()
+
+        def worker():
+            try:
+                for key, payload in items:
+                    if stop.is_set():
+                        return
+                    ready.put((key, self.build(payload)))
+            except Exception as e:
+                ready.put(e)
+            finally:
+                ready.put(done)
+
+        thread = threading.Thread(target=worker, name='isotp-prebuild', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            while thread.is_alive():
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    thread.join(0.01)
+
+    # ---------------- 发送 ----------------
+
+    def attach(self):
+        """开始接收发给本模块的流控帧"""
+        if self.attached:
+            return
+        if self.session is not None:
+            self.session.add_route(self.rx_id, self._on_frame, self.rx_extended)
+        else:
+            self.stack.notifier.add_listener(self._on_message)
+        self.stack.logger.addFilter(self.log_filter)
+        self.attached = True
+
+    def detach(self):
+        if not self.attached:
+            return
+        if self.session is not None:
+            self.session.remove_route(self.rx_id, self._on_frame, self.rx_extended)
+        else:
+            self.stack.notifier.remove_listener(self._on_message)
+        self.stack.logger.removeFilter(self.log_filter)
+        self.attached = False
+
+    def _on_message(self, msg):
+        if msg.arbitration_id == self.rx_id and msg.is_extended_id == self.rx_extended:
+            self._on_frame(msg)
+
+    def _on_frame(self, msg):
+        data = msg.data
+        if data and data[0] >> 4 == 3:
+            self.flow_control.put(bytes(data[:3]))
+
+    def _send(self, msg):
+        self.bus.send(msg)
+        self.frames_sent += 1
+        if self.session is not None:
+            for monitor in self.session.tx_monitors:
+                monitor.on_frame_sent(msg)
+
+    def _wait_flow_control(self) -> Tuple[int, float]:
+        """等待CTS流控帧，返回(BS, STmin秒)"""
+        timeout = self.params.rx_flowcontrol_timeout / 1000.0
+        waits = 0
+        while True:
+            try:
+                data = self.flow_control.get(timeout=timeout)
+            except queue.Empty:
+                raise FrameTransmitError(f"No flow control frame within {timeout * 1000:.0f} ms")
+            status = data[0] & 0x0F
+            if status == FLOW_STATUS_CTS:
+                block_size = data[1] if len(data) > 1 else 0
+                stmin = self.params.override_receiver_stmin
+                if stmin is None:
+                    stmin = stmin_seconds(data[2] if len(data) > 2 else 0)
+                return block_size, stmin
+            if status == FLOW_STATUS_WAIT:
+                waits += 1
+                if waits > self.params.wftmax:
+                    raise FrameTransmitError(f"Flow control WAIT received {waits} times (wftmax {self.params.wftmax})")
+                continue
+            if status == FLOW_STATUS_OVERFLOW:
+                raise FrameTransmitError("Flow control overflow, receiver buffer too small")
+            raise FrameTransmitError(f"Invalid flow status {status}")
+
+    def send(self, frames: PrebuiltFrames):
+        """按流控推送预先分好的帧，流控超时/溢出时抛出FrameTransmitError"""
+        if not self.attached:
+            self.attach()
+        while not self.flow_control.empty():
+            self.flow_control.get_nowait()
+        self._send(frames.first)
+        consecutive = frames.consecutive
+        index = 0
+        count = len(consecutive)
+        while index < count:
+            block_size, stmin = self._wait_flow_control()
+            end = count if block_size == 0 else min(count, index + block_size)
+            while index < end:
+                self._send(consecutive[index])
+                index += 1
+                if stmin and index < count:
+                    time.sleep(stmin)
+
+
+def isotp_frame_sender(conn) -> Optional[IsoTpFrameSender]:
+    """连接支持预分帧时返回发送器，否则为None（DoIP等不分帧的传输）"""
+    return IsoTpFrameSender.for_connection(conn) if IsoTpFrameSender.supports(conn) else None
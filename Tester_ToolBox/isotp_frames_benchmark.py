@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-can"))
+sys.path.insert(0, os.path.abspath("reference_modules/python-can-isotp"))
+sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
+
+from isotp_frames import IsoTpFrameSender
+from transfer_codec import TransferDataCodec
+
+# 与BootloaderPack的CAN FD参数一致
+ISOTP_PARAMS = {
+    'stmin': 0,
+    'blocksize': 10,
+    'tx_padding': 0x00,
+    'wftmax': 4,
+    'tx_data_length': 64,
+    'tx_data_min_length': 8,
+    'rx_flowcontrol_timeout': 1000,
+    'rx_consecutive_frame_timeout': 100,
+    'can_fd': True,
+    'max_frame_size': 4095,
+    'blocking_send': False,
+}
+
+
+def can_fd_client(block_size: int):
+    """
+    虚拟CAN FD总线上的测试仪Client和一个TransferData ECU
+    ECU检查每块的序列号和数据长度，回76 xx
+    """
+    import can
+    import isotp
+    import udsoncan.configs
+    from udsoncan.client import Client
+    from udsoncan.connections import PythonIsoTpConnection
+    channel = f"isotp-frames-benchmark-{os.getpid()}"
+    tester_bus = can.Bus(interface='virtual', channel=channel, fd=True)
+    ecu_bus = can.Bus(interface='virtual', channel=channel, fd=True)
+    notifier = can.Notifier(tester_bus, [])
+    ecu_notifier = can.Notifier(ecu_bus, [])
+    stack = isotp.NotifierBasedCanStack(tester_bus, notifier, address=isotp.Address(txid=0x736, rxid=0x7B6),
+                                        params=ISOTP_PARAMS)
+    ecu_stack = isotp.NotifierBasedCanStack(ecu_bus, ecu_notifier, address=isotp.Address(txid=0x7B6, rxid=0x736),
+                                            params=ISOTP_PARAMS)
+    stop = threading.Event()
+    errors = []
+
+    def ecu():
+        expected = 1
+        while not stop.is_set():
+            request = ecu_stack.recv(block=True, timeout=0.1)
+            if not request:
+                continue
+            if request[0] != 0x36 or request[1] != expected or len(request) != block_size + 2:
+                errors.append(f"unexpected request {request[:4].hex().upper()}... ({len(request)} bytes)")
+            expected = (request[1] + 1) & 0xFF
+            ecu_stack.send(bytes([0x76, request[1]]))
+
+    ecu_stack.start()
+    thread = threading.Thread(target=ecu, daemon=True)
+    thread.start()
+
+    def cleanup():
+        stop.set()
+        thread.join()
+        ecu_stack.stop()
+        notifier.stop()
+        ecu_notifier.stop()
+        tester_bus.shutdown()
+        ecu_bus.shutdown()
+
+    config = udsoncan.configs.default_client_config.copy()
+    config['request_timeout'] = 2
+    return Client(PythonIsoTpConnection(stack), config=config), errors, cleanup
+
+
+def run(prebuilt: bool, blocks: int, block_size: int):
+    client, errors, cleanup = can_fd_client(block_size)
+    codec = TransferDataCodec(block_size)
+    data = [os.urandom(block_size) for _ in range(min(blocks, 64))]
+    try:
+        with client:
+            sender = IsoTpFrameSender.for_connection(client.conn) if prebuilt else None
+            codec.frame_sender = sender
+            items = ((((index + 1) & 0xFF), TransferDataCodec.request((index + 1) & 0xFF, data[index % len(data)]))
+                     for index in range(blocks))
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            if sender is not None:
+                for index, (sequence_number, frames) in enumerate(sender.prebuild(items)):
+                    codec.transfer(client, sequence_number, data[index % len(data)], frames)
+                sender.detach()
+            else:
+                for index, (sequence_number, _) in enumerate(items):
+                    codec.transfer(client, sequence_number, data[index % len(data)])
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+    finally:
+        cleanup()
+    if errors:
+        raise RuntimeError(errors[0])
+    return wall / blocks * 1000, cpu / blocks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TransferData over virtual CAN FD: ISO-TP stack segmentation vs prebuilt frames')
+    parser.add_argument('--blocks', type=int, default=300)
+    parser.add_argument('--block-size', type=int, default=4088, help='Data bytes per 0x36 block')
+    args = parser.parse_args()
+
+    print(f"{args.blocks} blocks x {args.block_size} bytes, CAN FD 64-byte frames, BS {ISOTP_PARAMS['blocksize']}")
+    print(f"{'path':<10} {'ms/block':>9} {'CPU ms/block':>13}")
+    results = {}
+    for name, prebuilt in (('stack', False), ('prebuilt', True)):
+        results[name] = run(prebuilt, args.blocks, args.block_size)
+        print(f"{name:<10} {results[name][0]:>9.2f} {results[name][1]:>13.2f}")
+    print(f"speedup    {results['stack'][0] / results['prebuilt'][0]:>9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
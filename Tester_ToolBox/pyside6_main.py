@@ -3,9 +3,9 @@ import os
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QGroupBox, QLabel, QComboBox, QPushButton, QLineEdit, QCheckBox,
-    QMessageBox, QTextEdit, QFrame
+    QMessageBox, QTextEdit, QFrame, QFileDialog, QProgressBar
 )
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, Signal, QTimer
 from PySide6.QtGui import QIcon
 
 # 添加模块路径
@@ -15,16 +15,34 @@ sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
 
 import can
 from can.interfaces.vector import canlib
+from bus_session import BusSession
+from bus_monitor import BusMonitor
+from device_registry import DeviceRegistry
 
 class ConnectionWidget(QWidget):
+    # 设备注册表在后台线程中变化/扫描结束，通过信号切回UI线程
+    devices_changed = Signal()
+    scan_finished = Signal()
+    registry_log = Signal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.can_bus = None
+        self.bus_session = None
+        self.bus_monitor = None
+        self.bus_bitrate = (500000, None)
         self.connected = False
         self.channel_configs = {}
         self.fdcan = False
         self.trace_handler = None
+        self.device_registry = DeviceRegistry(on_change=lambda devices: self.devices_changed.emit(),
+                                              log=self.registry_log.emit)
         self.init_ui()
+        self.devices_changed.connect(self.refresh_device_list)
+        self.scan_finished.connect(self.on_scan_finished)
+        self.registry_log.connect(self.log)
+        self.device_registry.scan_async()
+        self.device_registry.start_hotplug()
         
     def init_ui(self):
         layout = QVBoxLayout()
@@ -84,61 +102,51 @@ class ConnectionWidget(QWidget):
         controls_layout.addWidget(operation_group)
         
         layout.addWidget(controls_frame)
+
+        # 总线监视部分
+        monitor_layout = QHBoxLayout()
+        self.monitor_check = QCheckBox("Bus Monitor")
+        self.monitor_check.toggled.connect(self.on_monitor_toggle)
+        self.monitor_label = QLabel("Bus monitor stopped")
+        self.monitor_export_button = QPushButton("Export CSV")
+        self.monitor_export_button.setMaximumWidth(100)
+        self.monitor_export_button.clicked.connect(self.export_bus_monitor)
+        monitor_layout.addWidget(self.monitor_check)
+        monitor_layout.addWidget(self.monitor_label, 1)
+        monitor_layout.addWidget(self.monitor_export_button)
+        layout.addLayout(monitor_layout)
+
+        self.monitor_timer = QTimer(self)
+        self.monitor_timer.setInterval(500)
+        self.monitor_timer.timeout.connect(self.update_monitor_display)
+
         self.setLayout(layout)
         
     def scan_can_device(self):
-        try:
-            self.channel_configs.clear()
-            channel_list = []
-
-            # 扫描SocketCAN接口（Linux）
-            try:
-                import platform
-                self.log(f"platform.system(): {platform.system()}")
-                if platform.system() == 'Linux':
-                    self.log("Scanning SocketCAN interfaces...")
-                    net_path = "/sys/class/net"
-                    if os.path.exists(net_path):
-                        for name in os.listdir(net_path):
-                            if name.startswith(('can', 'vcan', 'slcan')):
-                                channel_name = f"SocketCAN: {name}"
-                                channel_list.append(channel_name)
-                                self.channel_configs[channel_name] = {
-                                    'type': 'socketcan',
-                                    'channel': name
-                                }
-                                self.log(f"Found SocketCAN interface: {name}")
-            except Exception as e:
-                self.log(f"SocketCAN scan error: {str(e)}")
+        """后台完整扫描，扫描结束后通过信号回到UI线程刷新列表"""
+        if not self.device_registry.scan_async(on_done=lambda devices: self.scan_finished.emit()):
+            return
+        self.scan_button.setEnabled(False)
+        self.scan_button.setText("Scanning...")
 
-            # 扫描Vector设备
-            if canlib.xldriver is not None:
-                try:
-                    canlib.xldriver.xlOpenDriver()
-                    vector_configs = canlib.get_channel_configs()
-                    
-                    for config in vector_configs:
-                        channel_name = f"{config.serial_number}: {config.name}"
-                        channel_list.append(channel_name)
-                        self.channel_configs[channel_name] = {
-                            'type': 'vector',
-                            'config': config,
-                            'hw_channel': config.hw_channel
-                        }
-                except Exception as e:
-                    self.log(f"Vector scan error: {str(e)}")
-                finally:
-                    canlib.xldriver.xlCloseDriver()
+    def on_scan_finished(self):
+        self.scan_button.setText("Scan")
+        self.scan_button.setEnabled(self.can_bus is None)
+        self.refresh_device_list()
+        if not self.channel_configs:
+            self.show_error("No CAN devices found")
 
-            # 更新UI
-            if channel_list:
-                self.hardware_combo.clear()
-                self.hardware_combo.addItems(channel_list)
-            else:
-                self.show_error("No CAN devices found")
-
-        except Exception as e:
-            self.show_error(f"Device scan failed: {str(e)}")
+    def refresh_device_list(self):
+        self.channel_configs = self.device_registry.get_devices()
+        selected_channel = self.hardware_combo.currentText()
+        self.hardware_combo.blockSignals(True)
+        self.hardware_combo.clear()
+        self.hardware_combo.addItems(list(self.channel_configs))
+        if selected_channel in self.channel_configs:
+            self.hardware_combo.setCurrentText(selected_channel)
+        elif self.can_bus and selected_channel:
+            self.log(f"Device of initialized channel is no longer present: {selected_channel}")
+        self.hardware_combo.blockSignals(False)
 
     def show_error(self, message):
         msg_box = QMessageBox()
@@ -191,6 +199,7 @@ class ConnectionWidget(QWidget):
                 return
             
             if self.can_bus:
+                self.close_bus_session()
                 self.can_bus.shutdown()
             
             self.log(f"channel_config['type']: {channel_config['type']}")
@@ -200,6 +209,7 @@ class ConnectionWidget(QWidget):
                     channel=channel_config['hw_channel'],
                     **params
                 )
+                self.bus_bitrate = (params.get('bitrate', 500000), params.get('data_bitrate') if params.get('fd') else None)
             elif channel_config['type'] == 'socketcan':
                 self.log(f"channel_config['channel']: {channel_config['channel']}")
                 self.can_bus = can.Bus(
@@ -208,6 +218,10 @@ class ConnectionWidget(QWidget):
                     bitrate=500000,
                     fd=False,
                 )
+                self.bus_bitrate = (500000, None)
+
+            if self.can_bus:
+                self.bus_session = BusSession(self.can_bus, self.fdcan)
                 
             # 禁用连接框架中的所有控件
             self.hardware_combo.setEnabled(False)
@@ -225,6 +239,7 @@ class ConnectionWidget(QWidget):
         """Release CAN channel"""
         try:
             if self.can_bus:
+                self.close_bus_session()
                 self.can_bus.shutdown()
                 self.can_bus = None
                 
@@ -239,6 +254,61 @@ class ConnectionWidget(QWidget):
         except Exception as e:
             self.show_error(f"Failed to release CAN channel: {str(e)}")
 
+    def close_bus_session(self):
+        self.stop_bus_monitor()
+        if self.bus_session:
+            self.bus_session.close()
+            self.bus_session = None
+
+    def on_monitor_toggle(self, checked):
+        if checked:
+            if not self.bus_session:
+                self.monitor_check.setChecked(False)
+                self.show_error("Please initialize CAN channel first")
+                return
+            self.start_bus_monitor()
+        else:
+            self.stop_bus_monitor()
+
+    def start_bus_monitor(self):
+        """统计共享Notifier上每秒的收发帧数、错误帧和估算的总线负载"""
+        if self.bus_monitor and self.bus_monitor.is_running():
+            return
+        bitrate, data_bitrate = self.bus_bitrate
+        self.bus_monitor = BusMonitor(bitrate=bitrate, data_bitrate=data_bitrate)
+        self.bus_monitor.start(self.bus_session)
+        self.monitor_label.setText("Collecting...")
+        self.monitor_timer.start()
+        self.log(f"Bus monitor started (bitrate {bitrate}, data bitrate {data_bitrate or bitrate})")
+
+    def stop_bus_monitor(self):
+        if not self.bus_monitor or not self.bus_monitor.is_running():
+            return
+        self.monitor_timer.stop()
+        self.bus_monitor.stop()
+        self.monitor_check.setChecked(False)
+        self.monitor_label.setText("Bus monitor stopped")
+        self.log("Bus monitor stopped")
+
+    def update_monitor_display(self):
+        sample = self.bus_monitor.latest() if self.bus_monitor else None
+        if sample:
+            self.monitor_label.setText(sample.summary())
+
+    def export_bus_monitor(self):
+        """导出每秒统计的时间序列为CSV"""
+        if not self.bus_monitor or not self.bus_monitor.history():
+            self.show_error("No bus monitor data to export")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Bus Monitor", "", "CSV files (*.csv);;All files (*.*)")
+        if not file_path:
+            return
+        try:
+            count = self.bus_monitor.export_csv(file_path)
+            self.log(f"Exported {count} bus monitor samples to {file_path}")
+        except OSError as e:
+            self.show_error(f"Failed to export bus monitor data: {str(e)}")
+
     def parse_baudrate_parameters(self):
         params = {}
         try:
@@ -285,6 +355,58 @@ class ConnectionWidget(QWidget):
     def set_trace_handler(self, handler):
         self.trace_handler = handler
 
+class FlashProgressWidget(QWidget):
+    """
+    订阅FlashingService事件流显示刷写进度（事件经信号切回UI线程）
+    Bootloader面板实现后，由面板在创建FlashingService时attach并加入布局
+    """
+    flash_event = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.service = None
+        self.trace_handler = None
+        self.callback = self.flash_event.emit  # 保存同一个对象，unsubscribe时才能匹配
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_label = QLabel("Status: Ready")
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.progress_label, 1)
+        self.flash_event.connect(self.on_flash_event)
+
+    def attach(self, service):
+        """订阅刷写服务，替换之前订阅的服务"""
+        self.detach()
+        self.service = service
+        service.subscribe(self.callback)
+
+    def detach(self):
+        if self.service is not None:
+            self.service.unsubscribe(self.callback)
+            self.service = None
+
+    def on_flash_event(self, event):
+        from flash_service import EVENT_LOG, EVENT_STARTED, EVENT_FINISHED, EVENT_TESTER_PRESENT, EVENT_REPORT
+        if event.kind == EVENT_LOG:
+            if self.trace_handler:
+                self.trace_handler(event.message)
+            return
+        if event.kind in (EVENT_TESTER_PRESENT, EVENT_REPORT):
+            # 报告事件不带进度（bytes_sent为0），不能用来刷新进度条
+            return
+        if event.kind == EVENT_STARTED:
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("Flashing Ongoing")
+            return
+        self.progress_bar.setValue(int(event.percent * 10))
+        if event.kind == EVENT_FINISHED:
+            self.progress_label.setText(f"{event.message} - {event.summary()}")
+        else:
+            self.progress_label.setText(event.summary())
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -0,0 +1,163 @@
+import json
+import os
+import struct
+import threading
+from typing import Dict, Optional
+
+
+class ResponseConfigCache:
+    """
+    模拟器响应配置：JSON [{"req": "...", "res": "..."}] 预编译为 {请求bytes: 响应bytes} 索引。
+
+    编译结果按源文件mtime/size缓存到磁盘，文件未变化时直接加载二进制缓存，不再解析JSON和fromhex。
+    watch()启动后台线程监视配置文件，变化时重新编译并整体替换索引（单次属性赋值，查询线程无需加锁），
+    长时间运行的仿真可以在不断开连接的情况下修改响应。
+    """
+    CACHE_MAGIC = b'RSPC'
+    CACHE_VERSION = 2  # 2: 重复请求以最后一条为准，旧缓存需要重新编译
+    CACHE_HEADER = struct.Struct('>4sHqqI')  # magic, version, 源文件mtime_ns, 源文件大小, 条目数
+    ENTRY_HEADER = struct.Struct('>II')  # 请求长度, 响应长度
+
+    def __init__(self, config_path: str, cache_dir: Optional[str] = None):
+        """
+        :param config_path: 响应配置JSON文件
+        :param cache_dir: 二进制缓存目录，默认为配置文件所在目录下的.respcache
+        """
+        self.config_path = config_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(config_path)), '.respcache')
+        self.index: Dict[bytes, bytes] = {}
+        self.signature = None
+        self.watch_thread = None
+        self.watch_stop = threading.Event()
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(self.cache_dir, os.path.basename(self.config_path) + '.bin')
+
+    def lookup(self, request) -> Optional[bytes]:
+        """查询请求对应的响应，request可以是bytes/bytearray/memoryview"""
+        if type(request) is not bytes:
+            request = bytes(request)
+        return self.index.get(request)
+
+    def load(self) -> bool:
+        """加载配置（优先使用二进制缓存），失败时保留当前索引并返回False"""
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            print(f"[ResponseCache] Response config file not found: {self.config_path}")
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        index = self._read_cache(signature)
+        if index is None:
+            try:
+                index = self.compile(self.config_path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # json.JSONDecodeError是ValueError的子类
+                print(f"[ResponseCache] Error parsing response config {self.config_path}: {e}")
+                return False
+            self._write_cache(signature, index)
+
+        self.index = index
+        self.signature = signature
+        return True
+
+    @staticmethod
+    def compile(config_path: str) -> Dict[bytes, bytes]:
+        """解析JSON并转换为bytes索引，同一请求重复配置时与原来的字典查找一致，以最后一条为准"""
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config_list = json.load(f)
+        index = {}
+        for item in config_list:
+            try:
+                request = bytes.fromhex(item['req'])
+                response = bytes.fromhex(item['res'])
+            except ValueError as e:
+                print(f"[ResponseCache] Skip invalid response config {item['req']} -> {item['res']}: {e}")
+                continue
+            index[request] = response
+        return index
+
+    def _read_cache(self, signature) -> Optional[Dict[bytes, bytes]]:
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < self.CACHE_HEADER.size:
+            return None
+        magic, version, mtime_ns, size, count = self.CACHE_HEADER.unpack_from(data, 0)
+        if magic != self.CACHE_MAGIC or version != self.CACHE_VERSION or (mtime_ns, size) != signature:
+            return None
+
+        index = {}
+        offset = self.CACHE_HEADER.size
+        try:
+            for _ in range(count):
+                req_len, res_len = self.ENTRY_HEADER.unpack_from(data, offset)
+                offset += self.ENTRY_HEADER.size
+                request = data[offset:offset + req_len]
+                offset += req_len
+                response = data[offset:offset + res_len]
+                offset += res_len
+                index[request] = response
+        except struct.error:
+            return None
+        if offset != len(data):
+            return None
+        return index
+
+    def _write_cache(self, signature, index: Dict[bytes, bytes]):
+        chunks = [self.CACHE_HEADER.pack(self.CACHE_MAGIC, self.CACHE_VERSION, signature[0], signature[1], len(index))]
+        for request, response in index.items():
+            chunks.append(self.ENTRY_HEADER.pack(len(request), len(response)))
+            chunks.append(request)
+            chunks.append(response)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(chunks))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            # 缓存只是加速手段，写入失败不影响使用
+            print(f"[ResponseCache] Unable to write response cache {self.cache_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def watch(self, interval: float = 1.0):
+        """启动后台线程，按interval秒轮询配置文件，变化后热替换索引"""
+        if self.watch_thread is not None or interval <= 0:
+            return
+        self.watch_stop.clear()
+        self.watch_thread = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True)
+        self.watch_thread.start()
+
+    def stop_watching(self):
+        if self.watch_thread is None:
+            return
+        self.watch_stop.set()
+        if self.watch_thread is not threading.current_thread():
+            self.watch_thread.join()
+        self.watch_thread = None
+
+    def _watch_loop(self, interval: float):
+        while not self.watch_stop.wait(interval):
+            try:
+                stat = os.stat(self.config_path)
+            except OSError:
+                continue
+            if (stat.st_mtime_ns, stat.st_size) == self.signature:
+                continue
+            if self.load():
+                print(f"[ResponseCache] Reloaded {len(self.index)} responses from {self.config_path}")
+            else:
+                # 保留旧索引，记录新签名避免对同一个错误文件反复报错
+                self.signature = (stat.st_mtime_ns, stat.st_size)
+                print(f"[ResponseCache] Keeping previous responses for {self.config_path}")
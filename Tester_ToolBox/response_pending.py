@@ -0,0 +1,139 @@
+import time
+from collections import deque
+from typing import List, NamedTuple, Optional, Tuple
+
+RESPONSE_PENDING = 0x78
+DEFAULT_P2 = 0.15  # 没有会话时序参数时的P2（秒）
+DEFAULT_P2_STAR = 5.0  # 没有会话时序参数时的P2*（秒）
+P2_STAR_MARGIN = 1.2  # 服务器声明的P2*之上留的余量（倍数）
+DEFAULT_MAX_PENDING = 120.0  # 一个请求连续pending的上限（秒），超过按超时失败
+
+
+class PendingRecord(NamedTuple):
+    """一次请求的等待情况：收到的每个0x78相对请求发出的时间，以及最终响应耗时"""
+    label: str
+    service_id: int
+    pending_times: Tuple[float, ...]
+    duration: float
+    p2_star: float
+    response_code: Optional[int]  # 最终否定响应码，正响应为None，超时为-1
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.pending_times)
+
+    @property
+    def max_pending_gap(self) -> float:
+        """相邻两次0x78（或请求到第一个0x78）的最大间隔，接近p2_star说明余量不足"""
+        previous = 0.0
+        gap = 0.0
+        for moment in self.pending_times:
+            gap = max(gap, moment - previous)
+            previous = moment
+        return gap
+
+    def summary(self) -> str:
+        if self.response_code is None:
+            status = 'positive'
+        elif self.response_code < 0:
+            status = 'timeout'
+        else:
+            status = f"NRC 0x{self.response_code:02X}"
+        text = f"{self.label or f'SID 0x{self.service_id:02X}'}: {status} after {self.duration:.3f} s"
+        if self.pending_times:
+            text += (f", {self.pending_count} x 0x78 (max gap {self.max_pending_gap:.3f} s"
+                     f" of P2* {self.p2_star:.3f} s)")
+        return text
+
+
+class ResponsePendingEngine:
+    """
+    NRC 0x78（requestCorrectlyReceived-ResponsePending）处理
+
+    udsoncan Client.send_request把request_timeout当作整个请求的上限，服务器连续回0x78也会在request_timeout
+    （本工具为5秒）到期时失败，长时间擦除因此要么报超时，要么只能把所有请求的超时都放大。
+    这里直接在连接上收发：发出请求后按P2等待，每收到一个0x78就把期限延长P2*（从会话控制响应的
+    P2*_server_max加余量，没有时用Client配置的p2_star_timeout），只在一直pending超过max_pending时失败；
+    最终响应一到立即返回，后续请求（如下一个擦除区域）可以马上发出。
+    AdaptiveClient按该请求（例程ID）学到的P2/P2*等待，并把延迟/超时记回TimingStore。
+    其他服务迟到的正/否定响应被忽略，继续等待本请求的响应。
+    每次请求的0x78时刻和总耗时记录在records中，用于报告擦除耗时和P2*余量。
+    """
+
+    def __init__(self, max_pending: float = DEFAULT_MAX_PENDING, history: int = 64):
+        self.max_pending = max_pending
+        self.records = deque(maxlen=history)
+
+    @staticmethod
+    def timing(client, payload: bytes) -> Tuple[float, float]:
+        """(P2, P2*)：AdaptiveClient给出学习值，否则优先使用服务器在会话控制响应中声明的值"""
+        learned = getattr(client, 'request_timeouts', None)
+        if learned is not None:
+            return learned(payload)
+        config = getattr(client, 'config', {}) or {}
+        session_timing = getattr(client, 'session_timing', None)
+        p2 = config.get('p2_timeout') or DEFAULT_P2
+        p2_star = config.get('p2_star_timeout') or DEFAULT_P2_STAR
+        if session_timing is not None:
+            if session_timing.p2_server_max is not None:
+                p2 = max(p2, session_timing.p2_server_max)
+            if session_timing.p2_star_server_max is not None:
+                p2_star = session_timing.p2_star_server_max * P2_STAR_MARGIN
+        return p2, p2_star
+
+    def request(self, client, payload: bytes, label: str = ''):
+        """
+        发送原始请求并等待最终响应
+        :return: (udsoncan Response, PendingRecord)
+        :raises TimeoutException: P2/P2*到期或pending超过max_pending
+        """
+        from udsoncan import Response
+        from udsoncan.exceptions import InvalidResponseException, TimeoutException
+        p2, p2_star = self.timing(client, payload)
+        service_id = payload[0]
+        conn = client.conn
+        pending_times: List[float] = []
+
+        def record(code):
+            entry = PendingRecord(label, service_id, tuple(pending_times), time.monotonic() - start, p2_star, code)
+            self.records.append(entry)
+            return entry
+
+        conn.empty_rxqueue()
+        start = time.monotonic()
+        conn.send(payload)
+        deadline = start + p2
+        while True:
+            remaining = deadline - time.monotonic()
+            frame = conn.wait_frame(timeout=max(remaining, 0.0), exception=False) if remaining > 0 else None
+            if frame is None:
+                record_timeout = getattr(client, 'record_timeout', None)
+                if record_timeout is not None:
+                    record_timeout(payload)
+                entry = record(-1)
+                raise TimeoutException(f"{entry.summary()} - no response within "
+                                       f"{'P2*' if pending_times else 'P2'}")
+            response = Response.from_payload(frame)
+            if not response.valid:
+                record(-1)
+                raise InvalidResponseException(response)
+            if (not response.positive and response.code == RESPONSE_PENDING
+                    and frame[1:2] == bytes([service_id])):
+                now = time.monotonic()
+                pending_times.append(now - start)
+                if now - start > self.max_pending:
+                    entry = record(-1)
+                    raise TimeoutException(f"{entry.summary()} - pending longer than {self.max_pending:.0f} s")
+                deadline = now + p2_star
+                continue
+            if response.positive:
+                own = frame[0] == (service_id | 0x40)
+            else:
+                own = frame[1:2] == bytes([service_id])
+            if not own:
+                # 其他服务迟到的正/否定响应，继续等待本请求的响应
+                continue
+            record_latency = getattr(client, 'record_latency', None)
+            if record_latency is not None:
+                record_latency(payload, start, [start + moment for moment in pending_times])
+            return response, record(None if response.positive else response.code)
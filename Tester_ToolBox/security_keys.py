@@ -0,0 +1,303 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ecu_config import READ_ECU_MAP
+
+# zone -> {种子请求等级: AES-128密钥}
+AES128_SECURITY_KEYS = {
+    'RZCU': {
+        0x01: bytes([
+            0x27, 0xBB, 0x7B, 0x9F, 0xAA, 0x4D, 0xEC, 0x13,
+            0x32, 0x7A, 0x7C, 0x2F, 0xF7, 0xFA, 0xA1, 0x9A
+        ]),
+        0x11: bytes([
+            0xA7, 0x34, 0xD1, 0x55, 0xA9, 0x6A, 0xA4, 0x09,
+            0xDB, 0x93, 0x3F, 0x74, 0x75, 0xF9, 0x35, 0xE9
+        ]),
+    },
+    'LZCU': {
+        0x01: bytes([
+            0x96, 0xCB, 0x1B, 0xBF, 0x02, 0xDF, 0x05, 0x10,
+            0xF5, 0x21, 0x9C, 0xCE, 0x67, 0x9B, 0x98, 0xFA
+        ]),
+        0x11: bytes([
+            0x1A, 0xF0, 0x69, 0xCD, 0x52, 0x1B, 0xF9, 0x70,
+            0xE8, 0xDC, 0x8E, 0xC6, 0xBB, 0x24, 0x62, 0x8D
+        ]),
+    },
+}
+
+
+class KeyDerivationService:
+    """
+    安全访问（0x27）种子->密钥计算服务（AES-128 CMAC）
+
+    每个zone/等级的CMAC对象（含AES密钥扩展）只在首次使用时创建一次，之后每个种子只copy()已初始化的上下文，
+    不再重复查表和密钥扩展。compute_batch()一次计算多个ECU的密钥。
+    可选的有界LRU缓存用于模拟器测试等种子会重复出现的场景；真实ECU的种子是随机数，默认不缓存。
+    线程安全，可在多个刷写线程间共享。
+    """
+
+    def __init__(self, keys: Optional[Dict[str, Dict[int, bytes]]] = None, cache_size: int = 0):
+        """
+        :param keys: {zone: {等级: AES密钥}}，默认AES128_SECURITY_KEYS
+        :param cache_size: 种子/密钥缓存条数，0表示不缓存
+        """
+        self.keys = {zone.upper(): dict(levels) for zone, levels in (keys or AES128_SECURITY_KEYS).items()}
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.contexts = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, zones: Optional[Iterable[str]] = None):
+        """预先创建CMAC上下文（例如在连接ECU之前），zones为None时准备所有zone/等级"""
+        for zone in (zones or self.keys):
+            for level in self.keys.get(zone.upper(), {}):
+                self._context(zone, level)
+
+    def compute(self, zone: str, level: int, seed: bytes) -> bytes:
+        """
+        :param zone: 'RZCU'/'LZCU'
+        :param level: 请求种子的等级（0x01/0x11）
+        :param seed: ECU返回的种子
+        :return: 16字节密钥
+        """
+        seed = bytes(seed)
+        cache_key = (zone.upper(), level, seed)
+        if self.cache_size:
+            with self.lock:
+                key = self.cache.get(cache_key)
+                if key is not None:
+                    self.cache.move_to_end(cache_key)
+                    self.hits += 1
+                    return key
+                self.misses += 1
+        context = self._context(zone, level)
+        with self.lock:
+            c = context.copy()
+        c.update(seed)
+        key = c.finalize()
+        if self.cache_size:
+            with self.lock:
+                self.cache[cache_key] = key
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return key
+
+    def compute_hex(self, zone: str, level: int, seed: bytes) -> str:
+        return self.compute(zone, level, seed).hex().upper()
+
+    def compute_batch(self, requests: Iterable[Tuple[str, int, bytes]]) -> List[bytes]:
+        """批量计算，requests为(zone, 等级, 种子)序列，按顺序返回密钥"""
+        return [self.compute(zone, level, seed) for zone, level, seed in requests]
+
+    def clear_cache(self):
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _context(self, zone: str, level: int):
+        context_key = (zone.upper(), level)
+        context = self.contexts.get(context_key)
+        if context is not None:
+            return context
+        levels = self.keys.get(zone.upper())
+        if levels is None:
+            raise ValueError(f"Invalid ZCU type: {zone}")
+        if level not in levels:
+            raise ValueError(f"Invalid security level for {zone.upper()}: {level}")
+        from cryptography.hazmat.primitives import cmac
+        from cryptography.hazmat.primitives.ciphers import algorithms
+        context = cmac.CMAC(algorithms.AES(levels[level]))
+        with self.lock:
+            # 并发首次使用时保留先创建的上下文
+            return self.contexts.setdefault(context_key, context)
+
+
+_default_service = None
+
+
+def default_key_service() -> KeyDerivationService:
+    """进程内共享的默认服务（不缓存）"""
+    global _default_service
+    if _default_service is None:
+        _default_service = KeyDerivationService()
+    return _default_service
+
+
+# ---------------- 种子/密钥算法注册表 ----------------
+
+# 刷写目标zone -> ECU映射表（DiagnosticPack_EcuMap.json）中的名称
+ZONE_ECU_NAMES = {'RZCU': 'ZCU-R', 'LZCU': 'ZCU-L'}
+# ECU映射表未配置SecurityAlgorithm时按zone选择的算法
+ZONE_DEFAULT_ALGORITHMS = {'RZCU': 'AES128_CMAC_RZCU', 'LZCU': 'AES128_CMAC_LZCU'}
+DEFAULT_PROGRAMMING_LEVEL = 0x11
+
+
+class SeedKeyAlgorithm:
+    """种子->密钥算法接口，level为请求种子的等级（奇数）"""
+    name = ''
+    seed_length = 16
+
+    def levels(self) -> Tuple[int, ...]:
+        return ()
+
+    def compute(self, seed: bytes, level: int) -> bytes:
+        raise NotImplementedError
+
+    def compute_batch(self, seeds: Iterable[bytes], level: int) -> List[bytes]:
+        return [self.compute(seed, level) for seed in seeds]
+
+
+class AesCmacAlgorithm(SeedKeyAlgorithm):
+    """AES-128 CMAC（RZCU/LZCU），委托给KeyDerivationService"""
+    seed_length = 16
+
+    def __init__(self, zone: str, service: Optional[KeyDerivationService] = None):
+        self.zone = zone.upper()
+        self.name = f"AES128_CMAC_{self.zone}"
+        self.service = service
+
+    def levels(self) -> Tuple[int, ...]:
+        return tuple(self._service().keys.get(self.zone, {}))
+
+    def compute(self, seed: bytes, level: int) -> bytes:
+        return self._service().compute(self.zone, level, seed)
+
+    def compute_batch(self, seeds: Iterable[bytes], level: int) -> List[bytes]:
+        service = self._service()
+        return service.compute_batch((self.zone, level, seed) for seed in seeds)
+
+    def _service(self) -> KeyDerivationService:
+        return self.service or default_key_service()
+
+
+class Shift32Algorithm(SeedKeyAlgorithm):
+    """
+    32位种子的32轮移位算法（BootloaderPackFlash.SecurityKeyAlgorithm.compute_level2/compute_level4）
+
+    - level2：每轮右移1位，按最低位异或seed或keyk。每轮的选择依赖上一轮结果，只能逐轮计算，
+      这里只去掉逐轮的掩码和属性查找
+    - level4：每轮循环左移7位再异或keyk。7与32互质，32轮后循环移位恰好回到原位，
+      keyk的32个旋转各异或一次，结果为seed ^ keyk ^ (keyk位数为奇数时全1，否则0)，与轮数无关地O(1)计算
+    """
+    name = 'SHIFT32'
+    seed_length = 4
+    SECURITY_KKEY_L2 = 0x0000CDCA
+    SECURITY_KKEY_L4 = 0x00001D5C
+
+    def __init__(self, level_modes: Optional[Dict[int, str]] = None, keyk_l2: int = SECURITY_KKEY_L2,
+                 keyk_l4: int = SECURITY_KKEY_L4):
+        """
+        :param level_modes: {请求种子等级: 'level2'/'level4'}，默认0x01->level2，0x03->level4
+        """
+        self.level_modes = level_modes or {0x01: 'level2', 0x03: 'level4'}
+        self.keyk_l2 = keyk_l2 & 0xFFFFFFFF
+        self.keyk_l4 = keyk_l4 & 0xFFFFFFFF
+        self.level4_mask = self.keyk_l4 ^ (0xFFFFFFFF if bin(self.keyk_l4).count('1') & 1 else 0)
+
+    def levels(self) -> Tuple[int, ...]:
+        return tuple(self.level_modes)
+
+    def compute(self, seed: bytes, level: int) -> bytes:
+        return self.compute_batch((seed,), level)[0]
+
+    def compute_batch(self, seeds: Iterable[bytes], level: int) -> List[bytes]:
+        mode = self.level_modes.get(level)
+        if mode is None:
+            raise ValueError(f"Invalid security level for {self.name}: {level}")
+        values = [int.from_bytes(bytes(seed[:4]), 'big') for seed in seeds]
+        if mode == 'level4':
+            mask = self.level4_mask
+            keys = [value ^ mask for value in values]
+        else:
+            keys = [self.level2(value, self.keyk_l2) for value in values]
+        return [key.to_bytes(4, 'big') for key in keys]
+
+    @staticmethod
+    def level2(seed: int, keyk: int) -> int:
+        # seed/keyk均为32位，右移不会超出32位，不需要逐轮掩码
+        temp_key = seed ^ keyk
+        for _ in range(32):
+            temp_key = (temp_key >> 1) ^ (seed if temp_key & 1 else keyk)
+        return temp_key
+
+
+SEED_KEY_ALGORITHMS: Dict[str, SeedKeyAlgorithm] = {}
+
+
+def register_seed_key_algorithm(algorithm: SeedKeyAlgorithm, name: Optional[str] = None) -> SeedKeyAlgorithm:
+    """注册算法，ECU映射表中的SecurityAlgorithm按名称选择"""
+    SEED_KEY_ALGORITHMS[(name or algorithm.name).upper()] = algorithm
+    return algorithm
+
+
+def get_seed_key_algorithm(name: str) -> SeedKeyAlgorithm:
+    algorithm = SEED_KEY_ALGORITHMS.get(name.upper())
+    if algorithm is None:
+        raise ValueError(f"Unknown seed/key algorithm: {name} (available: {', '.join(SEED_KEY_ALGORITHMS)})")
+    return algorithm
+
+
+def security_profile(zone: str, ecu_map: Optional[dict] = None) -> Tuple[SeedKeyAlgorithm, int]:
+    """
+    按ECU映射表选择刷写用的算法和种子等级
+    映射表条目可配置 "SecurityAlgorithm": "SHIFT32", "SecurityLevel": "0x01"，未配置时按zone默认AES CMAC/0x11
+    :return: (算法, 请求种子等级)
+    """
+    ecu_map = READ_ECU_MAP if ecu_map is None else ecu_map
+    entry = ecu_map.get(ZONE_ECU_NAMES.get(zone.upper(), zone), None) or {}
+    name = entry.get('SecurityAlgorithm') or ZONE_DEFAULT_ALGORITHMS.get(zone.upper())
+    if name is None:
+        raise ValueError(f"No seed/key algorithm configured for {zone}")
+    level = entry.get('SecurityLevel', DEFAULT_PROGRAMMING_LEVEL)
+    if isinstance(level, str):
+        level = int(level, 0)
+    return get_seed_key_algorithm(name), level
+
+
+register_seed_key_algorithm(AesCmacAlgorithm('RZCU'))
+register_seed_key_algorithm(AesCmacAlgorithm('LZCU'))
+register_seed_key_algorithm(Shift32Algorithm())
+
+
+# ---------------- 校验 ----------------
+
+# cmac_test.py中的种子及其结果
+CMAC_TEST_VECTORS = (
+    ('AES128_CMAC_RZCU', 0x01, '004F18B01EAE78130E7676C12627466F', '9D12F8EE1770B98B27C4AAA822FC2DDC'),
+    ('AES128_CMAC_RZCU', 0x11, '004F18B01EAE78130E7676C12627466F', 'D86F535AA8AE350303876C671EB3EA2E'),
+)
+
+
+def verify_seed_key_algorithms(samples: int = 256) -> List[str]:
+    """
+    校验注册的算法：AES CMAC对照cmac_test.py向量，SHIFT32对照原逐位实现（随机种子）
+    :return: 不一致项的描述，空列表表示全部通过
+    """
+    import random
+    from BootloaderPackFlash import SecurityKeyAlgorithm
+    failures = []
+    for name, level, seed_hex, expected in CMAC_TEST_VECTORS:
+        key = get_seed_key_algorithm(name).compute(bytes.fromhex(seed_hex), level).hex().upper()
+        if key != expected:
+            failures.append(f"{name} level 0x{level:02X} seed {seed_hex}: {key} != {expected}")
+    rng = random.Random(0)
+    seeds = [0, 0xFFFFFFFF] + [rng.getrandbits(32) for _ in range(samples)]
+    for algorithm in SEED_KEY_ALGORITHMS.values():
+        if not isinstance(algorithm, Shift32Algorithm):
+            continue
+        reference = {'level2': lambda seed: SecurityKeyAlgorithm.compute_level2(seed, algorithm.keyk_l2),
+                     'level4': lambda seed: SecurityKeyAlgorithm.compute_level4(seed, algorithm.keyk_l4)}
+        for level, mode in algorithm.level_modes.items():
+            keys = algorithm.compute_batch([seed.to_bytes(4, 'big') for seed in seeds], level)
+            for seed, key in zip(seeds, keys):
+                expected = reference[mode](seed)
+                if int.from_bytes(key, 'big') != expected:
+                    failures.append(f"{algorithm.name} {mode} seed 0x{seed:08X}: 0x{key.hex().upper()} != 0x{expected:08X}")
+                    break
+    return failures
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+
+from security_keys import (KeyDerivationService, SEED_KEY_ALGORITHMS, Shift32Algorithm, AesCmacAlgorithm,
+                           verify_seed_key_algorithms)
+
+
+def time_per_key(func, count):
+    """返回每个密钥的耗时（us）"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def legacy_cmac(key_bytes, seeds):
+    """原SecurityKeyAlgorithm_Chery的方式：每次调用新建CMAC对象"""
+    from cryptography.hazmat.primitives import cmac
+    from cryptography.hazmat.primitives.ciphers import algorithms
+    from cryptography.hazmat.backends import default_backend
+    for seed in seeds:
+        c = cmac.CMAC(algorithms.AES(key_bytes), backend=default_backend())
+        c.update(seed)
+        c.finalize().hex().upper()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed/key algorithm verification and micro benchmark')
+    parser.add_argument('--keys', type=int, default=20000, help='Seeds per measurement')
+    parser.add_argument('--verify-only', action='store_true', help='Only check the algorithms against reference vectors')
+    args = parser.parse_args()
+
+    failures = verify_seed_key_algorithms()
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    print(f"verification: {'FAILED' if failures else 'OK'} ({len(SEED_KEY_ALGORITHMS)} algorithms)")
+    if failures or args.verify_only:
+        return 1 if failures else 0
+
+    from BootloaderPackFlash import SecurityKeyAlgorithm
+    count = args.keys
+    seeds16 = [os.urandom(16) for _ in range(count)]
+    seeds4 = [os.urandom(4) for _ in range(count)]
+    ints4 = [int.from_bytes(seed, 'big') for seed in seeds4]
+
+    rows = []
+    service = KeyDerivationService()
+    key_bytes = service.keys['RZCU'][0x11]
+    rows.append(('AES128 CMAC', 'new CMAC per call', time_per_key(lambda: legacy_cmac(key_bytes, seeds16), count)))
+    rows.append(('AES128 CMAC', 'service compute()',
+                 time_per_key(lambda: [service.compute('RZCU', 0x11, seed) for seed in seeds16], count)))
+    cmac_algorithm = AesCmacAlgorithm('RZCU', service)
+    rows.append(('AES128 CMAC', 'compute_batch()',
+                 time_per_key(lambda: cmac_algorithm.compute_batch(seeds16, 0x11), count)))
+    cached = KeyDerivationService(cache_size=64)
+    repeated = seeds16[:16] * (count // 16)
+    rows.append(('AES128 CMAC', 'cache, 16 seeds repeating',
+                 time_per_key(lambda: [cached.compute('RZCU', 0x11, seed) for seed in repeated], len(repeated))))
+
+    shift32 = Shift32Algorithm()
+    for mode, level, keyk, reference in (('level2', 0x01, shift32.keyk_l2, SecurityKeyAlgorithm.compute_level2),
+                                         ('level4', 0x03, shift32.keyk_l4, SecurityKeyAlgorithm.compute_level4)):
+        rows.append((f"SHIFT32 {mode}", 'bit loop (reference)',
+                     time_per_key(lambda: [reference(seed, keyk) for seed in ints4], count)))
+        rows.append((f"SHIFT32 {mode}", 'compute_batch()',
+                     time_per_key(lambda: shift32.compute_batch(seeds4, level), count)))
+
+    print(f"{'algorithm':<16} {'implementation':<28} {'us/key':>10} {'keys/s':>12}")
+    for algorithm, implementation, us in rows:
+        print(f"{algorithm:<16} {implementation:<28} {us:>10.2f} {1e6 / us:>12.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+DEFAULT_KEYS_PATH = os.path.join('config_json', 'SignatureKeys.json')  # 格式见config_json/SignatureKeys.example.json
+SIGNATURE_LENGTH = 512
+PLACEHOLDER_SIGNATURE = bytes([0xAA] * SIGNATURE_LENGTH)  # 缺少.rsa时刷写流程使用的填充签名
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class PartitionCheck(NamedTuple):
+    partition: str
+    path: str
+    ok: bool
+    message: str
+    seconds: float
+    verified: bool = False  # 签名已用公钥验证；ok且未验证表示没有配置公钥，只做了结构检查
+
+    @property
+    def status(self) -> str:
+        if not self.ok:
+            return 'failed'
+        return 'verified' if self.verified else 'not verified'
+
+    def summary(self) -> str:
+        status = 'FAILED' if not self.ok else ('OK' if self.verified else 'NOT VERIFIED')
+        return f"[{self.partition.upper()}] {status} ({self.seconds * 1000:.0f} ms) {os.path.basename(self.path)}: {self.message}"
+
+
+def load_signature_keys(zone: str, path: str = DEFAULT_KEYS_PATH) -> Dict[str, dict]:
+    """
+    读取签名公钥配置，文件不存在时返回空字典（只做结构检查）
+    格式：{"RZCU": {"app": {"public_key": "keys/rzcu_app.pem", "padding": "pkcs1v15", "hash": "sha256"}, ...}, ...}
+    padding: pkcs1v15 / pss（RSA），EC公钥忽略padding（签名可以是DER或r||s原始格式）
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return config.get(zone.upper(), config.get('default', {}))
+
+
+def read_signature(path: str) -> bytes:
+    """.rsa文本（0x..逗号/空格分隔的十六进制），与FlashingProcess.read_signature_file格式一致"""
+    with open(path, 'r') as f:
+        content = f.read()
+    data = bytes.fromhex(content.replace('0x', '').replace(',', '').replace(' ', '').strip())
+    if len(data) != SIGNATURE_LENGTH:
+        raise ValueError(f"signature is {len(data)} bytes, expected {SIGNATURE_LENGTH}")
+    return data
+
+
+def _image_chunks(path: str):
+    """
+    返回(签名覆盖的数据分段迭代器, 描述, 映像自带签名)
+    HEX/S-record为0xFF填充后的连续映像，VBF为各数据块按顺序拼接（与传输的数据一致）
+    """
+    if path.lower().endswith('.vbf'):
+        from vbf_file import VbfFile
+        vbf = VbfFile(path)
+        errors = vbf.verify()
+        if errors:
+            raise ValueError('; '.join(errors))
+        chunks = (chunk for block in vbf.blocks for chunk in vbf.iter_block(block, HASH_CHUNK_SIZE))
+        return chunks, f"{len(vbf.blocks)} VBF blocks, {vbf.data_length} bytes", vbf.signature
+    from firmware_image import load_firmware
+    data, start = load_firmware(path).to_binary()
+    view = memoryview(data)
+    chunks = (view[offset:offset + HASH_CHUNK_SIZE] for offset in range(0, len(data), HASH_CHUNK_SIZE))
+    return chunks, f"0x{start:08X} +{len(data)} bytes", None
+
+
+def _verify(public_key_path: str, padding_name: str, signature: bytes, digest: bytes, hash_algorithm):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa, utils
+    with open(public_key_path, 'rb') as f:
+        key_data = f.read()
+    if b'-----BEGIN' in key_data:
+        public_key = serialization.load_pem_public_key(key_data)
+    else:
+        public_key = serialization.load_der_public_key(key_data)
+    prehashed = utils.Prehashed(hash_algorithm)
+    if isinstance(public_key, rsa.RSAPublicKey):
+        signature = signature[:public_key.key_size // 8]
+        if padding_name == 'pss':
+            scheme = padding.PSS(mgf=padding.MGF1(hash_algorithm), salt_length=padding.PSS.AUTO)
+        else:
+            scheme = padding.PKCS1v15()
+        public_key.verify(signature, digest, scheme, prehashed)
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        # .rsa文件固定512字节：DER签名后面是填充；否则按r||s原始格式处理
+        size = (public_key.curve.key_size + 7) // 8
+        if signature[:1] == b'\x30':
+            signature = signature[:signature[1] + 2]
+        else:
+            signature = utils.encode_dss_signature(int.from_bytes(signature[:size], 'big'),
+                                                   int.from_bytes(signature[size:2 * size], 'big'))
+        public_key.verify(signature, digest, ec.ECDSA(prehashed))
+    else:
+        raise ValueError(f"unsupported public key type {type(public_key).__name__}")
+
+
+def check_partition(task: dict) -> PartitionCheck:
+    """
+    在工作进程中执行：解析映像、读取签名、流式计算摘要并用公钥验签
+    task: {'partition', 'path', 'key': 公钥配置或None}
+    """
+    start = time.perf_counter()
+    partition, path, key = task['partition'], task['path'], task.get('key')
+
+    def result(ok, message, verified=False):
+        return PartitionCheck(partition, path, ok, message, time.perf_counter() - start, verified)
+
+    try:
+        if not path or not os.path.exists(path):
+            return result(False, "image file not found")
+        chunks, description, signature = _image_chunks(path)
+        if signature is None:
+            sig_path = path.rsplit('.', 1)[0] + '.rsa'
+            if os.path.exists(sig_path):
+                signature = read_signature(sig_path)
+        if key is None:
+            # 没有配置公钥：只检查映像可以解析、签名文件存在
+            for _ in chunks:
+                pass
+            if signature is None:
+                return result(True, f"{description}, no signature file (placeholder will be sent), no public key configured")
+            return result(True, f"{description}, signature present, no public key configured")
+        if signature is None or signature == PLACEHOLDER_SIGNATURE:
+            return result(False, "signature missing")
+
+        from cryptography.hazmat.primitives import hashes
+        hash_algorithm = {'sha256': hashes.SHA256, 'sha384': hashes.SHA384, 'sha512': hashes.SHA512}[
+            key.get('hash', 'sha256').lower()]()
+        digest = hashes.Hash(hash_algorithm)
+        for chunk in chunks:
+            digest.update(chunk)
+        try:
+            _verify(key['public_key'], key.get('padding', 'pkcs1v15').lower(), signature, digest.finalize(),
+                    hash_algorithm)
+        except Exception as e:
+            from cryptography.exceptions import InvalidSignature
+            if isinstance(e, InvalidSignature):
+                return result(False, f"{description}, signature does not match image")
+            raise
+        return result(True, f"{description}, signature valid ({os.path.basename(key['public_key'])})", True)
+    except Exception as e:
+        return result(False, str(e) or type(e).__name__)
+
+
+def preverify_partitions(paths: Dict[str, str], zone: str, keys_path: str = DEFAULT_KEYS_PATH,
+                         workers: Optional[int] = None) -> List[PartitionCheck]:
+    """
+    刷写前离线校验所有分区，各分区在独立进程中并行（解析HEX和计算摘要都受GIL限制）
+    :param paths: {分区: 映像文件路径}
+    :param workers: 进程数，默认min(分区数, CPU数)；1表示在当前进程中依次执行
+    """
+    keys = load_signature_keys(zone, keys_path)
+    # 公钥路径与其他配置文件一样相对于工作目录
+    tasks = [{'partition': partition, 'path': path, 'key': keys.get(partition)} for partition, path in paths.items()]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        return [check_partition(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check_partition, tasks))
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+TOOLBOX_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 冷启动时不允许加载的重量级模块：只有在首次使用对应功能（初始化通道/UDS客户端、开始刷写）时才导入
+HEAVY_MODULES = ('can', 'isotp', 'udsoncan', 'cryptography', 'intelhex', 'can.interfaces.vector', 'cgitb')
+
+# 入口 -> (冷启动需要导入的模块, 预算ms, 允许加载的重量级模块)
+TARGETS = {
+    # MainWindow创建的所有Pack
+    'gui': (('MainUI', 'ConnectionPack', 'BootloaderPack', 'TracePack'), 60, ()),
+    # 解析命令行之前的导入
+    'cli': (('Bootloader_CLI',), 40, ()),
+}
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {toolbox_dir!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+WINDOW_PROBE = """
+import sys, time, json
+sys.path.insert(0, {toolbox_dir!r})
+start = time.perf_counter()
+import MainUI
+app = MainUI.MainWindow()
+app.update()
+elapsed = time.perf_counter() - start
+app.destroy()
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_probe(code, cwd):
+    """在全新的解释器中执行探测脚本（冷启动），返回(耗时秒, 已加载的重量级模块)"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data['elapsed'], data['loaded']
+
+
+def import_profile(modules, cwd, top):
+    """-X importtime 按累计耗时排序的前top个模块"""
+    code = "import " + ", ".join(modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start import time of the Tk GUI and the bootloader CLI against budgets')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreter runs per target (median is reported)')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='Comma separated targets: ' + ', '.join(TARGETS))
+    parser.add_argument('--window', action='store_true', help='Also measure creating the Tk MainWindow (needs a display)')
+    parser.add_argument('--profile', type=int, default=0, metavar='N', help='Show the N slowest imports of each target')
+    args = parser.parse_args()
+
+    # reference_modules路径相对于工作目录，与正常启动保持一致
+    cwd = os.getcwd()
+    failed = False
+    print(f"{'target':<8} {'median ms':>10} {'min ms':>8} {'budget ms':>10}  heavy modules loaded")
+    for target in args.targets.split(','):
+        modules, budget_ms, allowed = TARGETS[target]
+        samples = []
+        loaded = []
+        for _ in range(args.runs):
+            elapsed, loaded = run_probe(PROBE.format(toolbox_dir=TOOLBOX_DIR, modules=modules, heavy=HEAVY_MODULES), cwd)
+            samples.append(elapsed * 1000)
+        median = statistics.median(samples)
+        unexpected = [m for m in loaded if m not in allowed]
+        status = 'OK'
+        if median > budget_ms or unexpected:
+            status = 'OVER BUDGET'
+            failed = True
+        print(f"{target:<8} {median:>10.1f} {min(samples):>8.1f} {budget_ms:>10}  {', '.join(loaded) or '-'}  {status}")
+        if args.profile:
+            for cumulative_us, self_us, name in import_profile(modules, cwd, args.profile):
+                print(f"    {cumulative_us / 1000:>8.1f} ms cumulative {self_us / 1000:>7.1f} ms self  {name}")
+
+    if args.window:
+        try:
+            elapsed, loaded = run_probe(WINDOW_PROBE.format(toolbox_dir=TOOLBOX_DIR, heavy=HEAVY_MODULES), cwd)
+            print(f"{'window':<8} {elapsed * 1000:>10.1f} {'':>8} {'':>10}  {', '.join(loaded) or '-'}")
+            if loaded:
+                failed = True
+        except RuntimeError as e:
+            print(f"window   skipped: {str(e).splitlines()[-1] if str(e) else 'no display'}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import time
+from typing import Optional, Tuple
+
+TRANSFER_DATA = 0x36
+TRANSFER_DATA_RESPONSE = 0x76
+NEGATIVE_RESPONSE = 0x7F
+RESPONSE_PENDING = 0x78
+
+
+def request_timeouts(client, request) -> Tuple[float, float]:
+    """
+    (P2, P2*)：AdaptiveClient给出学习值，普通Client按udsoncan的规则（服务器声明值优先于配置值）
+    :param request: 服务ID或请求报文（AdaptiveClient按例程ID/DID区分样本，见adaptive_timing.timing_key）
+    """
+    learned = getattr(client, 'request_timeouts', None)
+    if learned is not None:
+        return learned(request)
+    session_timing = client.session_timing
+    p2 = session_timing.p2_server_max
+    if p2 is None:
+        p2 = client.config['p2_timeout']
+    p2_star = session_timing.p2_star_server_max
+    if p2_star is None:
+        p2_star = client.config['p2_star_timeout']
+    return p2, p2_star
+
+
+class TransferDataCodec:
+    """
+    0x36 TransferData / 0x76快速路径
+
+    client.transfer_data每块都要构造Request/Response对象、做通用的服务解析，BaseConnection.send/wait_frame
+    还会把整个4 KB负载转成十六进制字符串写debug日志（不论日志级别）。这里：
+    - 请求头36 xx预先写在复用的bytearray中，每块只把数据拷贝到头部之后，再生成一次bytes发送
+      （ISO-TP栈在后台线程中分帧，发送的对象不能再被修改）
+    - 直接调用连接的specific_send/specific_wait_frame，响应只比较前两个字节76 xx
+    - 只有上一块没有正常结束（超时、否定响应等）时才在发送前清空接收队列，丢弃迟到的旧响应
+    其他任何情况（0x78、否定响应、序列号不符、格式错误、超时）交给与udsoncan Client相同的处理：
+    0x78按P2*继续等待，其余抛出udsoncan的对应异常（exception_on_negative_response为False时返回否定Response），
+    BootloaderPackFlash.transfer_block的重传策略不需要区分两条路径。
+    """
+
+    def __init__(self, max_block_size: int = 0):
+        self.buffer = bytearray(2 + max_block_size)
+        self.buffer[0] = TRANSFER_DATA
+        self.view = memoryview(self.buffer)
+        self.clean = False  # 上一次交换是否以76 xx正常结束
+        self.frame_sender = None  # IsoTpFrameSender：传入预分帧时按流控直接推送CAN帧
+        self.fast_count = 0
+        self.slow_count = 0
+
+    @staticmethod
+    def request(sequence_number: int, data) -> bytes:
+        """独立的请求报文（预分帧时在后台线程中使用，不共享缓冲区）"""
+        return bytes((TRANSFER_DATA, sequence_number)) + bytes(data)
+
+    def encode(self, sequence_number: int, data) -> bytes:
+        length = len(data)
+        if len(self.buffer) < length + 2:
+            self.view.release()
+            self.buffer.extend(bytes(length + 2 - len(self.buffer)))
+            self.view = memoryview(self.buffer)
+        self.buffer[1] = sequence_number
+        self.view[2:length + 2] = data
+        return bytes(self.view[:length + 2])
+
+    def transfer(self, client, sequence_number: int, data, frames=None):
+        """
+        发送一块数据
+        :param frames: IsoTpFrameSender预先分好的帧（与request(sequence_number, data)对应），None表示由连接发送
+        :return: None表示收到76 + 序列号回显（快速路径），否则为udsoncan Response（否定响应且未启用异常时）
+        """
+        conn = client.conn
+        if not conn.is_open():
+            raise RuntimeError(f"{conn.__class__.__name__} is not opened")
+        if not self.clean:
+            conn.empty_rxqueue()
+        self.clean = False
+        p2, p2_star = request_timeouts(client, TRANSFER_DATA)
+        overall = client.config.get('request_timeout')
+        if frames is not None and self.frame_sender is not None:
+            start = time.monotonic()
+            self.frame_sender.send(frames)
+        else:
+            payload = self.encode(sequence_number, data)
+            start = time.monotonic()
+            conn.specific_send(payload)
+        frame = self._wait(conn, start, p2, overall)
+        if frame is not None and len(frame) == 2 and frame[0] == TRANSFER_DATA_RESPONSE and frame[1] == sequence_number:
+            self.clean = True
+            self.fast_count += 1
+            record = getattr(client, 'record_latency', None)
+            if record is not None:
+                record(TRANSFER_DATA, start)
+            return None
+        self.slow_count += 1
+        return self._slow_path(client, sequence_number, frame, start, p2, p2_star, overall)
+
+    @staticmethod
+    def _wait(conn, start: float, timeout: float, overall: Optional[float]) -> Optional[bytes]:
+        if overall is not None:
+            timeout = min(timeout, max(start + overall - time.monotonic(), 0.0))
+        try:
+            return conn.specific_wait_frame(timeout=timeout)
+        except Exception as e:
+            from udsoncan.exceptions import TimeoutException
+            if isinstance(e, TimeoutException):
+                return None
+            raise
+
+    def _slow_path(self, client, sequence_number: int, frame: Optional[bytes], start: float, p2: float,
+                   p2_star: float, overall: Optional[float]):
+        from udsoncan import Response
+        from udsoncan.exceptions import (InvalidResponseException, NegativeResponseException, TimeoutException,
+                                         UnexpectedResponseException)
+        pending_marks = []
+        while True:
+            if frame is None:
+                record_timeout = getattr(client, 'record_timeout', None)
+                if record_timeout is not None:
+                    record_timeout(TRANSFER_DATA)
+                raise TimeoutException(f"Did not receive TransferData response in time "
+                                       f"({'P2*' if pending_marks else 'P2'} timeout={p2_star if pending_marks else p2:.3f} sec)")
+            response = Response.from_payload(frame)
+            if not response.valid:
+                raise InvalidResponseException(response)
+            if frame[0] == NEGATIVE_RESPONSE and frame[1:2] == bytes([TRANSFER_DATA]) and response.code == RESPONSE_PENDING:
+                pending_marks.append(time.monotonic())
+                frame = self._wait(client.conn, start, p2_star, overall)
+                continue
+            record = getattr(client, 'record_latency', None)
+            if record is not None:
+                record(TRANSFER_DATA, start, pending_marks)
+            if frame[0] == NEGATIVE_RESPONSE:
+                if frame[1:2] != bytes([TRANSFER_DATA]):
+                    raise UnexpectedResponseException(response, f"Negative response for service 0x{frame[1]:02X}")
+                if client.config['exception_on_negative_response']:
+                    raise NegativeResponseException(response)
+                return response
+            if frame[0] != TRANSFER_DATA_RESPONSE:
+                raise UnexpectedResponseException(response, f"Response service 0x{frame[0]:02X} to TransferData")
+            if len(frame) < 2 or frame[1] != sequence_number:
+                echo = f"0x{frame[1]:02X}" if len(frame) > 1 else 'missing'
+                raise UnexpectedResponseException(response, f"Block sequence counter echo {echo}, "
+                                                            f"expected 0x{sequence_number:02X}")
+            # 76 xx后带transferResponseParameterRecord，同样是正确的响应
+            self.clean = True
+            return None
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
+
+from udsoncan.connections import BaseConnection
+
+from transfer_codec import TransferDataCodec
+
+
+class LoopbackConnection(BaseConnection):
+    """
+    进程内回环连接：发送的0x36请求立即在接收队列中生成76 xx响应，不涉及传输层，
+    测得的耗时只包含测试仪一侧的编码、解析和udsoncan开销
+    pending_every > 0时每N块先回一个7F 36 78，覆盖0x78慢速路径
+    """
+
+    def __init__(self, pending_every: int = 0):
+        super().__init__('loopback')
+        self.rx = deque()
+        self.opened = False
+        self.pending_every = pending_every
+        self.requests = 0
+        self.bytes = 0
+
+    def open(self):
+        self.opened = True
+        return self
+
+    def close(self):
+        self.opened = False
+
+    def is_open(self):
+        return self.opened
+
+    def empty_rxqueue(self):
+        self.rx.clear()
+
+    def specific_send(self, payload, timeout=None):
+        self.requests += 1
+        self.bytes += len(payload) - 2
+        if self.pending_every and self.requests % self.pending_every == 0:
+            self.rx.append(b'\x7F\x36\x78')
+        self.rx.append(bytes([0x76, payload[1]]))
+
+    def specific_wait_frame(self, timeout=None):
+        return self.rx.popleft() if self.rx else None
+
+
+def make_client(conn):
+    import udsoncan.configs
+    from udsoncan.client import Client
+    config = udsoncan.configs.default_client_config.copy()
+    config['p2_timeout'] = 5
+    config['p2_star_timeout'] = 5
+    config['request_timeout'] = 5
+    return Client(conn, config=config)
+
+
+def run(path: str, blocks: int, block_size: int, pending_every: int) -> float:
+    """:return: 每块CPU时间（微秒）"""
+    conn = LoopbackConnection(pending_every)
+    client = make_client(conn)
+    codec = TransferDataCodec(block_size)
+    data = os.urandom(block_size)
+    with client:
+        start = time.process_time()
+        for index in range(blocks):
+            sequence_number = (index + 1) & 0xFF
+            if path == 'udsoncan':
+                client.transfer_data(sequence_number=sequence_number, data=data)
+            else:
+                codec.transfer(client, sequence_number, data)
+        elapsed = time.process_time() - start
+    if conn.bytes != blocks * block_size:
+        raise RuntimeError(f"{path}: sent {conn.bytes} bytes, expected {blocks * block_size}")
+    if path == 'codec' and codec.fast_count + codec.slow_count != blocks:
+        raise RuntimeError(f"codec: {codec.fast_count} + {codec.slow_count} responses for {blocks} blocks")
+    return elapsed / blocks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TransferData per-block CPU cost: udsoncan Client vs TransferDataCodec')
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--block-size', type=int, default=4088, help='Data bytes per 0x36 block')
+    parser.add_argument('--pending-every', type=int, default=0,
+                        help='Answer every Nth block with NRC 0x78 first (exercises the slow path)')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of N runs')
+    args = parser.parse_args()
+
+    print(f"{args.blocks} blocks x {args.block_size} bytes, loopback connection")
+    results = {}
+    for path in ('udsoncan', 'codec'):
+        results[path] = min(run(path, args.blocks, args.block_size, args.pending_every) for _ in range(args.repeat))
+        print(f"{path:<10} {results[path]:>8.1f} us/block CPU")
+    print(f"speedup    {results['udsoncan'] / results['codec']:>8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
+import udsoncan
+
+
+class FlexRawData(udsoncan.DidCodec):
+    """
+    定长原始数据DID编解码（不做任何转换）
+    独立于BootloaderPack，CLI和无界面的刷写流程使用时不需要加载tkinter
+    """
+    def __init__(self, length: int):
+        self.data_length = length
+    def encode(self, val):
+        if not isinstance(val, (bytes, bytearray)):
+            raise ValueError("Input data must be bytes or bytearray type")
+        
+        if len(val) != self.data_length:
+            raise ValueError(f'Data length must be {self.data_length} bytes')
+            
+        return val  # Return raw data directly
+    def decode(self, payload):
+        if len(payload) != self.data_length:
+            raise ValueError(f'Received data length must be {self.data_length} bytes')
+            
+        return payload  # Return raw data directly
+    def __len__(self):
+        return self.data_length
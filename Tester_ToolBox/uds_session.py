@@ -0,0 +1,117 @@
+import threading
+import time
+
+
+class SharedClient:
+    """
+    udsoncan Client的共享代理
+
+    `with shared as client:` 只获取会话锁并确保连接已打开，退出时不关闭连接，
+    因此FlashingProcess各步骤和TesterPresent保活原有的`with self.client as client:`写法不需要修改。
+    其他属性直接转发给原Client。
+    """
+
+    def __init__(self, session: 'UdsSession', client):
+        self._session = session
+        self._client = client
+
+    def __enter__(self):
+        self._session.lock.acquire()
+        try:
+            self._session.ensure_open(self._client)
+        except Exception:
+            self._session.lock.release()
+            raise
+        return self._client
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is not None and not self._session.is_protocol_error(exc_type):
+                # 传输层异常（连接断开、超时等）后关闭连接，下一次使用时重新打开，与原来每步重新打开的行为一致
+                self._session.close()
+        finally:
+            self._session.lock.release()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class UdsSession:
+    """
+    长连接UDS会话
+
+    物理/功能寻址Client的连接在首次使用时打开，之后在整个刷写序列和保活期间保持打开，
+    不再每个步骤都启动/停止ISO-TP工作线程（CAN）或重新建立TCP连接和路由激活（DoIP）。
+    所有请求通过同一把锁串行，刷写线程和TesterPresent线程可以安全共享。
+    """
+
+    def __init__(self, uds_client, uds_client_func):
+        self.lock = threading.RLock()
+        self.raw_clients = (uds_client, uds_client_func)
+        self.client = SharedClient(self, uds_client)
+        self.client_func = SharedClient(self, uds_client_func)
+        self.opened = set()
+        self.open_count = 0
+        self.open_seconds = 0.0
+        self.close_seconds = 0.0
+
+    def __enter__(self) -> 'UdsSession':
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def open(self) -> 'UdsSession':
+        with self.lock:
+            for client in self.raw_clients:
+                self.ensure_open(client)
+        return self
+
+    def ensure_open(self, client):
+        if id(client) in self.opened:
+            if client.conn.is_open():
+                return
+            # 底层已断开（如DoIP对端关闭TCP）：先关闭释放再重新打开
+            self.opened.discard(id(client))
+            try:
+                client.close()
+            except Exception:
+                pass
+        start = time.perf_counter()
+        client.open()
+        self.open_seconds += time.perf_counter() - start
+        self.open_count += 1
+        self.opened.add(id(client))
+
+    def close(self):
+        """关闭已打开的连接（例如ECU复位后DoIP连接会被断开），下次使用时重新打开"""
+        with self.lock:
+            start = time.perf_counter()
+            for client in self.raw_clients:
+                if id(client) in self.opened:
+                    self.opened.discard(id(client))
+                    try:
+                        client.close()
+                    except Exception as e:
+                        print(f"[UdsSession] Close error: {e}")
+            self.close_seconds += time.perf_counter() - start
+
+    def is_open(self) -> bool:
+        return bool(self.opened)
+
+    @staticmethod
+    def is_protocol_error(exc_type) -> bool:
+        """ECU给出的否定/异常响应不影响连接本身"""
+        from udsoncan.exceptions import NegativeResponseException, InvalidResponseException, UnexpectedResponseException
+        return issubclass(exc_type, (NegativeResponseException, InvalidResponseException, UnexpectedResponseException))
+
+    def reset_stats(self):
+        self.open_count = 0
+        self.open_seconds = 0.0
+        self.close_seconds = 0.0
+
+    def stats(self) -> str:
+        return (f"{self.open_count} connection open(s), {self.open_seconds * 1000:.1f} ms opening, "
+                f"{self.close_seconds * 1000:.1f} ms closing")
@@ -0,0 +1,141 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath("reference_modules/python-can"))
+sys.path.insert(0, os.path.abspath("reference_modules/python-can-isotp"))
+sys.path.insert(0, os.path.abspath("reference_modules/python-udsoncan"))
+
+from uds_session import UdsSession
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'doip_server_simulate.py')
+TESTER_PRESENT = bytes.fromhex('3E00')
+
+
+def make_client(conn):
+    import udsoncan.configs
+    from udsoncan.client import Client
+    config = udsoncan.configs.default_client_config.copy()
+    config['request_timeout'] = 2
+    return Client(conn, config=config)
+
+
+def run_steps(client, steps):
+    """
+    模拟刷写步骤：每步一个`with client`块内发送一次3E 00
+    :return: 每步耗时列表（秒）
+    """
+    durations = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        with client as c:
+            c.conn.send(TESTER_PRESENT)
+            response = c.conn.wait_frame(timeout=2, exception=True)
+        durations.append(time.perf_counter() - start)
+        if response[:1] != b'\x7E':
+            raise RuntimeError(f"Unexpected response {response.hex().upper()}")
+    return durations
+
+
+def can_clients():
+    """虚拟CAN总线上的测试仪Client（物理/功能）和一个只应答3E的ECU"""
+    import can
+    import isotp
+    from udsoncan.connections import PythonIsoTpConnection
+    channel = f"uds-session-benchmark-{os.getpid()}"
+    tester_bus = can.Bus(interface='virtual', channel=channel)
+    ecu_bus = can.Bus(interface='virtual', channel=channel)
+    notifier = can.Notifier(tester_bus, [])
+    ecu_notifier = can.Notifier(ecu_bus, [])
+    params = {'blocking_send': False}
+    stack = isotp.NotifierBasedCanStack(tester_bus, notifier, address=isotp.Address(txid=0x736, rxid=0x7B6),
+                                        params=params)
+    stack_func = isotp.NotifierBasedCanStack(tester_bus, notifier, address=isotp.Address(txid=0x7DF, rxid=0x7B6),
+                                             params=params)
+    ecu_stack = isotp.NotifierBasedCanStack(ecu_bus, ecu_notifier, address=isotp.Address(txid=0x7B6, rxid=0x736),
+                                            params=params)
+    stop = threading.Event()
+
+    def ecu():
+        while not stop.is_set():
+            request = ecu_stack.recv(block=True, timeout=0.1)
+            if request and request[0] == 0x3E:
+                ecu_stack.send(bytes([0x7E, request[1]]))
+
+    ecu_stack.start()
+    thread = threading.Thread(target=ecu, daemon=True)
+    thread.start()
+
+    def cleanup():
+        stop.set()
+        thread.join()
+        ecu_stack.stop()
+        notifier.stop()
+        ecu_notifier.stop()
+        tester_bus.shutdown()
+        ecu_bus.shutdown()
+
+    return make_client(PythonIsoTpConnection(stack)), make_client(PythonIsoTpConnection(stack_func)), cleanup
+
+
+def doip_clients(args):
+    """在子进程中启动DoIP模拟器"""
+    import socket
+    from doip_client import DoIPClientConnection
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPT, '--mode', 'thread', '--host', args.host,
+                               '--port', str(args.port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection((args.host, args.port), timeout=0.2).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                server.terminate()
+                raise RuntimeError("DoIP server did not start")
+            time.sleep(0.05)
+    conn = DoIPClientConnection(args.host, args.ecu_addr, port=args.port)
+    conn.transport.connect_timeout = 10.0
+
+    def cleanup():
+        server.terminate()
+        server.wait()
+
+    return make_client(conn), make_client(conn.functional(0xE400)), cleanup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-step connection overhead: open/close per step vs persistent UdsSession')
+    parser.add_argument('--transport', default='can,doip', help='Comma separated: can (virtual bus), doip (simulator)')
+    parser.add_argument('--steps', type=int, default=50, help='Simulated flashing steps per mode')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=13498)
+    parser.add_argument('--ecu-addr', type=lambda v: int(v, 0), default=0x0004)
+    args = parser.parse_args()
+
+    print(f"{'transport':<10} {'mode':<22} {'median ms/step':>15} {'total ms':>10}  connection opens")
+    for transport in args.transport.split(','):
+        client, client_func, cleanup = can_clients() if transport == 'can' else doip_clients(args)
+        try:
+            run_steps(client, 2)  # 预热
+            per_step = run_steps(client, args.steps)
+            print(f"{transport:<10} {'open/close per step':<22} {statistics.median(per_step) * 1000:>15.3f} "
+                  f"{sum(per_step) * 1000:>10.1f}  {args.steps}")
+            with UdsSession(client, client_func) as session:
+                persistent = run_steps(session.client, args.steps)
+                opens = session.open_count
+            print(f"{transport:<10} {'persistent session':<22} {statistics.median(persistent) * 1000:>15.3f} "
+                  f"{sum(persistent) * 1000:>10.1f}  {opens}")
+            saved = (statistics.median(per_step) - statistics.median(persistent)) * 1000
+            print(f"{transport:<10} {'setup overhead/step':<22} {saved:>15.3f}")
+        finally:
+            cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import binascii
+import hashlib
+import os
+import re
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+# 头部中的注释和词法单元：字符串、大括号、逗号、分号、等号、其他值（数字/标识符）
+_COMMENT_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+_TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|[{},;=]|[^\s{},;="]+')
+BLOCK_HEADER_SIZE = 8  # 4字节地址 + 4字节长度
+BLOCK_CRC_SIZE = 2
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class VbfFormatError(ValueError):
+    pass
+
+
+class VbfBlock(NamedTuple):
+    """数据块在文件中的位置，数据本身不读入内存"""
+    address: int
+    length: int
+    offset: int  # 数据在文件中的偏移
+    crc16: int  # VBF块校验（CRC-16/CCITT，初值0xFFFF）
+
+
+class HexInt(int):
+    """0x前缀的十六进制数，保留书写的位数：签名/哈希字段的前导0x00字节转回bytes时不能丢掉"""
+
+    def __new__(cls, token: str):
+        value = super().__new__(cls, token, 16)
+        value.digits = len(token) - 2
+        return value
+
+
+def _parse_value(tokens: List[str], index: int):
+    token = tokens[index]
+    if token == '{':
+        values = []
+        index += 1
+        while tokens[index] != '}':
+            value, index = _parse_value(tokens, index)
+            values.append(value)
+            if tokens[index] == ',':
+                index += 1
+        return values, index + 1
+    if token.startswith('"'):
+        return token[1:-1], index + 1
+    try:
+        if token[:2].lower() == '0x':
+            return HexInt(token), index + 1
+        return int(token, 0), index + 1
+    except ValueError:
+        return token, index + 1
+
+
+def parse_vbf_header(text: str) -> dict:
+    """解析 header { key = value; ... } 部分，值为整数、字符串、标识符或嵌套列表"""
+    tokens = _TOKEN_PATTERN.findall(_COMMENT_PATTERN.sub('', text))
+    try:
+        index = tokens.index('header') + 1
+    except ValueError:
+        raise VbfFormatError("VBF header not found")
+    if tokens[index] != '{':
+        raise VbfFormatError("VBF header does not start with '{'")
+    header = {}
+    index += 1
+    try:
+        while tokens[index] != '}':
+            key = tokens[index]
+            if tokens[index + 1] != '=':
+                raise VbfFormatError(f"VBF header: expected '=' after {key}")
+            value, index = _parse_value(tokens, index + 2)
+            if tokens[index] != ';':
+                raise VbfFormatError(f"VBF header: expected ';' after {key}")
+            header[key] = value
+            index += 1
+    except IndexError:
+        raise VbfFormatError("VBF header is not terminated")
+    return header
+
+
+def _hex_bytes(value) -> Optional[bytes]:
+    """签名/哈希字段：0x前缀的十六进制数或字符串"""
+    if value is None:
+        return None
+    if isinstance(value, HexInt):
+        return value.to_bytes((value.digits + 1) // 2, 'big')
+    if isinstance(value, int):
+        return value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    text = str(value).replace('0x', '').replace(' ', '')
+    return bytes.fromhex(text)
+
+
+class VbfFile:
+    """
+    VBF（Versatile Binary Format）容器读取
+
+    打开时只解析ASCII头部并扫描各数据块的地址/长度/文件偏移，数据块按需分段读取（iter_block），
+    传输流水线边读边发，不会把整个映像读入内存。
+    data_format_identifier非0（压缩/加密）时数据块按原样传输，由ECU根据RequestDownload中的格式标识解压。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = {}
+        self.blocks: List[VbfBlock] = []
+        self.data_offset = 0
+        self._scan()
+
+    @property
+    def data_format_identifier(self) -> int:
+        return self.header.get('data_format_identifier', 0)
+
+    @property
+    def erase_regions(self) -> List[Tuple[int, int]]:
+        """[(起始地址, 长度)]，头部没有erase字段时为空"""
+        regions = self.header.get('erase', [])
+        return [(region[0], region[1]) for region in regions]
+
+    @property
+    def signature(self) -> Optional[bytes]:
+        return _hex_bytes(self.header.get('sw_signature', self.header.get('sw_signature_dev')))
+
+    @property
+    def start_address(self) -> int:
+        return self.blocks[0].address
+
+    @property
+    def data_length(self) -> int:
+        return sum(block.length for block in self.blocks)
+
+    def iter_block(self, block: VbfBlock, chunk_size: int) -> Iterator[bytes]:
+        """按chunk_size分段读取块数据"""
+        with open(self.path, 'rb') as f:
+            f.seek(block.offset)
+            remaining = block.length
+            while remaining:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise VbfFormatError(f"{os.path.basename(self.path)}: truncated block at 0x{block.address:08X}")
+                remaining -= len(chunk)
+                yield chunk
+
+    def verify(self) -> List[str]:
+        """
+        流式校验：各块CRC16、file_checksum（头部之后全部内容的CRC32）、verification_block_root_hash（校验块的SHA-256）
+        :return: 错误描述，空列表表示通过
+        """
+        errors = []
+        for block in self.blocks:
+            crc = 0xFFFF
+            for chunk in self.iter_block(block, READ_CHUNK_SIZE):
+                crc = binascii.crc_hqx(chunk, crc)
+            if crc != block.crc16:
+                errors.append(f"block 0x{block.address:08X}: CRC16 0x{crc:04X} != 0x{block.crc16:04X}")
+
+        expected = self.header.get('file_checksum')
+        if expected is not None:
+            crc = 0
+            with open(self.path, 'rb') as f:
+                f.seek(self.data_offset)
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                    crc = zlib.crc32(chunk, crc)
+            if crc != expected:
+                errors.append(f"file checksum 0x{crc:08X} != 0x{expected:08X}")
+
+        root_hash = _hex_bytes(self.header.get('verification_block_root_hash'))
+        verification_start = self.header.get('verification_block_start')
+        if root_hash is not None and verification_start is not None:
+            block = next((b for b in self.blocks if b.address == verification_start), None)
+            if block is None:
+                errors.append(f"verification block 0x{verification_start:08X} not found")
+            else:
+                digest = hashlib.sha256()
+                for chunk in self.iter_block(block, READ_CHUNK_SIZE):
+                    digest.update(chunk)
+                if digest.digest() != root_hash:
+                    errors.append("verification block root hash mismatch")
+        return errors
+
+    def _scan(self):
+        name = os.path.basename(self.path)
+        with open(self.path, 'rb') as f:
+            head = b''
+            # 头部结束于header块的右大括号；块数据是二进制，只在头部范围内查找
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    raise VbfFormatError(f"{name}: VBF header is not terminated")
+                head += chunk
+                end = self._header_end(head)
+                if end is not None:
+                    break
+            self.header = parse_vbf_header(head[:end].decode('latin-1'))
+            self.data_offset = end
+
+            size = os.fstat(f.fileno()).st_size
+            offset = end
+            while offset < size:
+                f.seek(offset)
+                block_header = f.read(BLOCK_HEADER_SIZE)
+                if len(block_header) < BLOCK_HEADER_SIZE:
+                    raise VbfFormatError(f"{name}: truncated block header at offset {offset}")
+                address = int.from_bytes(block_header[:4], 'big')
+                length = int.from_bytes(block_header[4:], 'big')
+                data_offset = offset + BLOCK_HEADER_SIZE
+                if data_offset + length + BLOCK_CRC_SIZE > size:
+                    raise VbfFormatError(f"{name}: block 0x{address:08X} exceeds file size")
+                f.seek(data_offset + length)
+                crc16 = int.from_bytes(f.read(BLOCK_CRC_SIZE), 'big')
+                self.blocks.append(VbfBlock(address, length, data_offset, crc16))
+                offset = data_offset + length + BLOCK_CRC_SIZE
+        if not self.blocks:
+            raise VbfFormatError(f"{name}: no data blocks")
+
+    @staticmethod
+    def _header_end(data: bytes) -> Optional[int]:
+        """header { ... } 右大括号之后的偏移，跳过字符串和注释"""
+        start = data.find(b'header')
+        if start < 0:
+            return None
+        depth = 0
+        index = start
+        length = len(data)
+        while index < length:
+            char = data[index:index + 1]
+            if char == b'"':
+                index = data.find(b'"', index + 1)
+                if index < 0:
+                    return None
+            elif data.startswith(b'//', index):
+                index = data.find(b'\n', index)
+                if index < 0:
+                    return None
+            elif data.startswith(b'/*', index):
+                index = data.find(b'*/', index + 2)
+                if index < 0:
+                    return None
+                index += 1
+            elif char == b'{':
+                depth += 1
+            elif char == b'}':
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            index += 1
+        return None
+
+
+def write_vbf(path: str, blocks: List[Tuple[int, bytes]], header: Optional[dict] = None):
+    """生成VBF文件（测试/模拟器用），自动计算块CRC16和file_checksum"""
+    body = bytearray()
+    for address, data in blocks:
+        body += address.to_bytes(4, 'big') + len(data).to_bytes(4, 'big') + data
+        body += binascii.crc_hqx(data, 0xFFFF).to_bytes(2, 'big')
+    lines = ['vbf_version = 2.6;', '', 'header {']
+    for key, value in (header or {}).items():
+        if key == 'erase':
+            value = '{ ' + ', '.join(f"{{ 0x{a:08X}, 0x{n:08X} }}" for a, n in value) + ' }'
+        elif isinstance(value, bytes):
+            value = '0x' + value.hex().upper()
+        elif isinstance(value, int):
+            value = f"0x{value:X}"
+        lines.append(f"    {key} = {value};")
+    lines.append(f"    file_checksum = 0x{zlib.crc32(bytes(body)):08X};")
+    lines.append('}')
+    with open(path, 'wb') as f:
+        f.write('\n'.join(lines).encode('ascii'))
+        f.write(body)